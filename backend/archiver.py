@@ -0,0 +1,61 @@
+"""
+Moves finished tasks to the archive database in the background.
+
+Every INTERVAL_S the thread archives batches of old finished tasks until
+none are left. Each batch is two short transactions, so writers are never
+held up for long, and database.archive_tasks is safe to run from several
+processes at once.
+"""
+
+import logging
+import threading
+
+import database as db
+
+log = logging.getLogger("clawd.archiver")
+
+INTERVAL_S = 600
+PAUSE_S = 0.05  # between batches, so a large backlog doesn't hog the write lock
+
+
+class Archiver:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="clawd-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def run_once(self):
+        """Archive everything that's due; returns the number of tasks moved."""
+        total = 0
+        while not self._stop.is_set():
+            _, count = db.archive_tasks()
+            total += count
+            if count < db.ARCHIVE_BATCH:
+                break
+            self._stop.wait(PAUSE_S)
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                moved = self.run_once()
+                if moved:
+                    log.info("Archived %d tasks", moved)
+            except Exception:
+                log.exception("Archiving failed; retrying in %ss", INTERVAL_S)
+            self._stop.wait(INTERVAL_S)
+
+
+archiver = Archiver()
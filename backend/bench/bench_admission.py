@@ -0,0 +1,121 @@
+"""
+Task-update latency for a well-behaved bot while a runaway bot and a crowd
+of dashboards flood the API, with admission limits off and on.
+
+Usage (from backend/):
+    python bench/bench_admission.py [seconds] [runaway] [dashboards]   # default 5 32 64
+
+Each party has its own key. The bot sends 50 task updates and logs a
+second; `runaway` connections POST logs and `dashboards` connections fetch
+/api/state as fast as they can, from a separate process. The second run
+uses the default RATE_* and READ_MAX_INFLIGHT limits.
+"""
+
+import http.client
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_batch import API_KEY, Client, free_port, start_server
+from bench_polling import percentile
+
+BOT_RATE = 50
+LIMITS = {"RATE_INGEST": "200", "RATE_INGEST_BURST": "400", "RATE_READ": "20",
+          "RATE_READ_BURST": "40", "READ_MAX_INFLIGHT": "16"}
+
+
+def flood(port, key, method, path, body, stop, counts):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"X-API-Key": key, "Content-Type": "application/json", "Accept-Encoding": "br, gzip"}
+    data = json.dumps(body) if body is not None else None
+    while time.time() < stop:
+        conn.request(method, path, data, headers)
+        resp = conn.getresponse()
+        resp.read()
+        with counts.get_lock():
+            counts[resp.status == 429] += 1
+
+
+def flooders(port, stop, runaway, dashboards, writes, reads):
+    threads = [threading.Thread(target=flood, args=(port, "runaway", "POST", "/api/logs",
+                                                    {"level": "info", "msg": "spam"}, stop, writes))
+               for _ in range(runaway)]
+    threads += [threading.Thread(target=flood, args=(port, "dashboard", "GET", "/api/state",
+                                                     None, stop, reads))
+                for _ in range(dashboards)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def bot(port, task_id, stop):
+    c = Client(port)
+    latencies = []
+    i = 0
+    t_next = time.perf_counter()
+    while time.time() < stop:
+        t_next += 1 / BOT_RATE
+        time.sleep(max(0.0, t_next - time.perf_counter()))
+        t0 = time.perf_counter()
+        if i % 2:
+            c.call("POST", "/api/logs", {"level": "info", "task_id": task_id, "msg": f"line {i}"})
+        else:
+            c.call("PATCH", f"/api/tasks/{task_id}",
+                   {"current_step": f"step {i}", "status": "running"})
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+    return latencies
+
+
+def run_mode(label, limits, seconds, runaway, dashboards):
+    saved = {k: os.environ.get(k) for k in limits}
+    os.environ.update(limits, EXTRA_API_KEYS="runaway,dashboard")
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_server(os.path.join(tmp, "bench.db"), port)
+        try:
+            c = Client(port)
+            for start in range(0, 2000, 100):
+                c.call("POST", "/api/batch", {"ops": [
+                    {"op": "create_task", "name": f"seed {i}", "type": "research",
+                     "subtype": "bench", "steps": ["a", "b"]}
+                    for i in range(start, start + 100)
+                ]})
+            task_id = c.call("POST", "/api/tasks", {
+                "name": "bench", "type": "research", "subtype": "bench", "steps": ["a"],
+            })["task_id"]
+
+            stop = time.time() + seconds
+            writes = multiprocessing.Array("q", 2)
+            reads = multiprocessing.Array("q", 2)
+            flood_proc = multiprocessing.Process(
+                target=flooders, args=(port, stop, runaway, dashboards, writes, reads))
+            flood_proc.start()
+            time.sleep(0.2)  # let them connect
+            latencies = bot(port, task_id, stop)
+            flood_proc.join()
+            print(f"{label:>10}: bot p50 {percentile(latencies, 0.5):6.1f} ms | "
+                  f"p99 {percentile(latencies, 0.99):6.1f} ms | "
+                  f"max {max(latencies) * 1000:6.1f} ms | "
+                  f"runaway {writes[0] / seconds:5.0f} ok/s {writes[1] / seconds:5.0f} 429/s | "
+                  f"dashboards {reads[0] / seconds:4.0f} ok/s {reads[1] / seconds:5.0f} 429/s")
+        finally:
+            proc.terminate()
+            proc.wait()
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    seconds, runaway, dashboards = args + [5, 32, 64][len(args):]
+    run_mode("no limits", {}, seconds, runaway, dashboards)
+    run_mode("limits", LIMITS, seconds, runaway, dashboards)
@@ -0,0 +1,126 @@
+"""
+Archiving old finished tasks: throughput, hot-table size and read cost
+before and after, storage per task, and archive read latency.
+
+Usage (from backend/):
+    python bench/bench_archive.py [tasks] [days]     # default 100,000 over 180 days
+
+Seeds tasks spread over `days` days (finished apart from the last day's),
+then archives everything older than ARCHIVE_AFTER_DAYS (30 unless set) and
+checks that analytics, and a rollup rebuild, come out the same.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+from archiver import Archiver  # noqa: E402
+
+DAY_MS = 24 * 3600 * 1000
+TYPES = list(db.TYPE_LABELS)
+STEPS_PER_TASK = 4
+
+
+def seed(n, days):
+    now = db.now_ms()
+    tasks, steps = [], []
+    for i in range(n):
+        task_id = f"tsk_{i:08x}"
+        created = now - int((n - i) / n * days * DAY_MS)
+        recent = now - created < DAY_MS
+        status = random.choice(["running", "pending"] if recent else
+                               ["completed", "completed", "completed", "failed", "cancelled"])
+        started = created + 1000
+        done = started + random.randint(5_000, 600_000) if status in db.TERMINAL_STATUSES else None
+        tasks.append((
+            task_id, f"Task {i}", random.choice(TYPES), "bench", status, "medium",
+            100 if done else 0, None, 0, started, done, None, 0,
+            "E_BENCH" if status == "failed" else None, None, '["bench"]', created,
+        ))
+        for seq in range(STEPS_PER_TASK):
+            steps.append((task_id, f"Step {seq}", "completed" if done else "pending", seq,
+                          started + seq * 1000, started + seq * 1000 + 900 if done else None))
+    with db.get_conn() as conn:
+        conn.executemany(
+            """INSERT INTO tasks (id, name, type, subtype, status, priority, progress,
+               current_step, step_idx, started_at, completed_at, eta, retry_count,
+               error_code, error_message, tags_json, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            tasks
+        )
+        conn.executemany(
+            """INSERT INTO task_steps (task_id, label, status, seq, started_at, completed_at)
+               VALUES (?, ?, ?, ?, ?, ?)""", steps
+        )
+    db.rebuild_rollups()
+
+
+def timeit(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def db_bytes(path):
+    with db.get_conn() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def report(label):
+    counts = db.table_counts()
+    print(f"{label:>7}: {counts[('tasks',)]:>7} tasks, {counts[('task_steps',)]:>7} steps | "
+          f"get_all_tasks {timeit(db.get_all_tasks):7.1f} ms | "
+          f"list_tasks(status=completed) {timeit(lambda: db.list_tasks(status='completed')):5.1f} ms | "
+          f"/api/state tasks {timeit(db.get_state_tasks):5.1f} ms")
+
+
+def run(n, days):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.ARCHIVE_AFTER_MS = int(float(os.getenv("ARCHIVE_AFTER_DAYS", "30")) * DAY_MS)
+        db.init_db()
+        seed(n, days)
+        hot_before = db_bytes(db.DB_PATH)
+        analytics = db.compute_analytics()
+        report("before")
+
+        t0 = time.perf_counter()
+        moved = Archiver().run_once()
+        elapsed = time.perf_counter() - t0
+        print(f"archived {moved} tasks in {elapsed:.2f}s ({moved / elapsed:.0f} tasks/s)")
+        report("after")
+
+        with db.get_conn() as conn:
+            conn.execute("VACUUM")
+        hot_after = db_bytes(db.DB_PATH)
+        cold = os.path.getsize(db.archive_path())
+        print(f"hot db {hot_before / 2**20:.1f} MiB -> {hot_after / 2**20:.1f} MiB (after VACUUM) | "
+              f"archive {cold / 2**20:.1f} MiB, {cold / max(moved, 1):.0f} B/task "
+              f"vs {hot_before / n:.0f} B/task hot")
+
+        print("analytics unchanged:", db.compute_analytics() == analytics)
+        db.rebuild_rollups()
+        print("analytics unchanged after rebuild_rollups:", db.compute_analytics() == analytics)
+
+        ids = [f"tsk_{random.randrange(moved):08x}" for _ in range(1000)]
+        t0 = time.perf_counter()
+        found = sum(db.get_archived_task(i) is not None for i in ids)
+        per_get = (time.perf_counter() - t0) / len(ids) * 1e6
+        week_ago = db.now_ms() - (days - 7) * DAY_MS
+        page = timeit(lambda: db.list_archived_tasks(from_ts=week_ago - 7 * DAY_MS, to_ts=week_ago))
+        print(f"archive reads: by id {per_get:.0f} us ({found}/{len(ids)} found) | "
+              f"one-week range, first page {page:.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [100_000, 180][len(args):]))
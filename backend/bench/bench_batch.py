@@ -0,0 +1,108 @@
+"""
+Event throughput: individual POST /api/logs + PATCH /api/tasks/{id} calls
+versus the same events sent through POST /api/batch.
+
+Usage (from backend/):
+    python bench/bench_batch.py [events] [batch_size]
+
+Starts uvicorn on a throwaway database. Both modes reuse one keep-alive
+connection, so the difference is server-side per-request cost.
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "bench"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, port, workers=1):
+    env = dict(os.environ, CLAWD_DB_PATH=db_path, API_KEY=API_KEY)
+    # Benchmarks measure capacity, so admission limits are off unless asked for
+    for name in ("RATE_INGEST", "RATE_READ", "READ_MAX_INFLIGHT"):
+        env.setdefault(name, "0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        cwd=BACKEND, env=env,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+class Client:
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port)
+
+    def call(self, method, path, body):
+        self.conn.request(method, path, json.dumps(body),
+                          {"X-API-Key": API_KEY, "Content-Type": "application/json"})
+        resp = self.conn.getresponse()
+        data = resp.read()
+        if resp.status >= 400:
+            raise RuntimeError(f"{method} {path} → {resp.status} {data[:200]!r}")
+        return json.loads(data)
+
+
+def events(task_id, n):
+    """Alternate progress updates and log lines, like a busy bot."""
+    for i in range(n):
+        if i % 2:
+            yield {"op": "log", "level": "info", "task_id": task_id, "msg": f"line {i}"}
+        else:
+            yield {"op": "update_task", "task_id": task_id, "progress": i % 100}
+
+
+def run(n, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_server(os.path.join(tmp, "bench.db"), port)
+        try:
+            c = Client(port)
+            task_id = c.call("POST", "/api/tasks", {
+                "name": "bench", "type": "research", "subtype": "bench", "steps": ["a"],
+            })["task_id"]
+
+            t0 = time.perf_counter()
+            for ev in events(task_id, n):
+                if ev.pop("op") == "log":
+                    c.call("POST", "/api/logs", ev)
+                else:
+                    c.call("PATCH", f"/api/tasks/{ev.pop('task_id')}", ev)
+            single = n / (time.perf_counter() - t0)
+
+            evs = list(events(task_id, n))
+            t0 = time.perf_counter()
+            for i in range(0, n, batch_size):
+                c.call("POST", "/api/batch", {"ops": evs[i:i + batch_size]})
+            batched = n / (time.perf_counter() - t0)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{n} events | individual {single:8.0f} ev/s | batch of {batch_size} "
+          f"{batched:8.0f} ev/s | x{batched / single:.1f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run(n, batch_size)
@@ -0,0 +1,131 @@
+"""
+NDJSON export and import throughput, and server memory while they run.
+
+Usage (from backend/):
+    python bench/bench_export.py [tasks] [logs]     # default 200,000 tasks, 200,000 logs
+
+Seeds a throwaway database (4 steps per task), streams GET /api/export to a
+file, then POSTs that file to /api/import on a second, empty server. Rows
+are tasks plus log lines (steps ride along inside their task). Memory is
+the server's peak anonymous RSS (heap, not SQLite's mmap'd file pages)
+over what it was before the transfer, sampled every 50 ms.
+"""
+
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+from bench_archive import seed  # noqa: E402
+from bench_batch import API_KEY, free_port, start_server  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def anon_kib(pid):
+    """Anonymous resident memory of a process (Linux only; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class PeakMemory:
+    def __init__(self, pid):
+        self.pid = pid
+        self.before = self.peak = anon_kib(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(0.05):
+            now = anon_kib(self.pid)
+            if now is not None:
+                self.peak = max(self.peak, now)
+
+    def __str__(self):
+        self._stop.set()
+        self._thread.join()
+        if self.before is None:
+            return "memory n/a"
+        return f"peak anon RSS +{(self.peak - self.before) / 1024:.1f} MiB"
+
+
+def seed_logs(n):
+    now = db.now_ms()
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO logs (id, level, task_id, task_name, msg, ts) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"lg_{i:08x}", "info", f"tsk_{i:08x}", f"Task {i}",
+              f"Processed page {i} of the run", now - n + i)
+             for i in range(n))
+        )
+
+
+def run(n_tasks, n_logs):
+    os.environ["LOG_RETENTION_COUNT"] = str(n_logs + 1)
+    os.environ["ARCHIVE_AFTER_DAYS"] = "0"  # nothing may move to the archive mid-export
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "source.db")
+        db.init_db()
+        seed(n_tasks, 60)
+        seed_logs(n_logs)
+        db.close_conn()
+        dump = os.path.join(tmp, "export.ndjson")
+        headers = {"X-API-Key": API_KEY, "Accept-Encoding": "identity"}
+
+        port = free_port()
+        proc = start_server(db.DB_PATH, port)
+        try:
+            mem = PeakMemory(proc.pid)
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+            t0 = time.perf_counter()
+            conn.request("GET", "/api/export", headers=headers)
+            resp = conn.getresponse()
+            size = 0
+            with open(dump, "wb") as f:
+                while chunk := resp.read(CHUNK):
+                    f.write(chunk)
+                    size += len(chunk)
+            elapsed = time.perf_counter() - t0
+            rows = n_tasks + n_logs
+            print(f"export: {rows} rows, {size / 2**20:.0f} MiB in {elapsed:.1f}s "
+                  f"({rows / elapsed:,.0f} rows/s) | {mem}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+        port = free_port()
+        proc = start_server(os.path.join(tmp, "target.db"), port)
+        try:
+            mem = PeakMemory(proc.pid)
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+            t0 = time.perf_counter()
+            with open(dump, "rb") as f:
+                conn.request("POST", "/api/import", body=iter(lambda: f.read(CHUNK), b""),
+                             headers={**headers, "Content-Type": "application/x-ndjson",
+                                      "Transfer-Encoding": "chunked"}, encode_chunked=True)
+                resp = conn.getresponse()
+                result = resp.read().decode()
+            elapsed = time.perf_counter() - t0
+            rows = n_tasks + n_logs
+            print(f"import: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) | "
+                  f"{mem} | {result[:120]}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [200_000, 200_000][len(args):]))
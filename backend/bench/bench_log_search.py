@@ -0,0 +1,89 @@
+"""
+Log search latency over a large retained log table.
+
+Usage (from backend/):
+    python bench/bench_log_search.py [lines]      # default 1,000,000
+
+Seeds a throwaway database with synthetic log lines (word frequencies
+roughly Zipf-distributed, so some terms are rare and some very common) and
+reports the median latency of typical searches.
+"""
+
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+VOCAB = [f"w{i}" for i in range(20_000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(VOCAB))))
+LEVELS = ["info", "info", "info", "warn", "error"]
+
+
+def seed(n):
+    now = db.now_ms()
+    rows = []
+    with db.get_conn() as conn:
+        for i in range(n):
+            words = random.choices(VOCAB, cum_weights=CUM_WEIGHTS, k=8)
+            rows.append((f"lg_{i:012x}", random.choice(LEVELS), f"tsk_{i % 5000:08x}",
+                         f"Task {i % 5000}", " ".join(words), now - (n - i) * 100))
+            if len(rows) == 50_000:
+                conn.executemany(
+                    "INSERT INTO logs (id, level, task_id, task_name, msg, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                rows.clear()
+        if rows:
+            conn.executemany(
+                "INSERT INTO logs (id, level, task_id, task_name, msg, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('optimize')")
+
+
+def median_ms(fn, repeat=15):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def run(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.init_db()
+        t0 = time.perf_counter()
+        seed(n)
+        print(f"seeded {n} lines in {time.perf_counter() - t0:.1f}s")
+
+        hour_ago = db.now_ms() - 3600 * 1000
+        cases = {
+            "rare term":              dict(q="w15000"),
+            "medium term":            dict(q="w500"),
+            "common term":            dict(q="w3"),
+            "two terms":              dict(q="w40 w90"),
+            "prefix":                 dict(q="w1234*"),
+            "term + level":           dict(q="w500", level="error"),
+            "term + last hour":       dict(q="w500", from_ts=hour_ago),
+            "task, no text":          dict(task_id="tsk_00000042"),
+            "page 5 of common term":  dict(q="w3", offset=200),
+        }
+        for label, kwargs in cases.items():
+            ms = median_ms(lambda: db.search_logs(**kwargs))
+            hits, _ = db.search_logs(**kwargs)
+            print(f"{label:>24} {ms:8.2f} ms  ({len(hits)} shown)")
+
+
+if __name__ == "__main__":
+    # Keep everything we seed; the default retention would trim it.
+    db.LOG_CAP = 10 ** 12
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,105 @@
+"""
+Write latency for a bot while many dashboards poll /api/state.
+
+Usage (from backend/):
+    python bench/bench_polling.py [seconds] [pollers] [tasks]   # default 5 64 2000
+
+Starts uvicorn on a throwaway database seeded with `tasks` tasks, then
+times one bot's POST /api/logs + PATCH /api/tasks/{id} calls, first alone
+and then with `pollers` connections (from a separate process) fetching
+full snapshots as fast as they can. Each write changes the version, so snapshots keep being rebuilt.
+"""
+
+import http.client
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_batch import API_KEY, Client, free_port, start_server
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def bot(port, task_id, stop):
+    c = Client(port)
+    latencies = []
+    i = 0
+    while time.time() < stop:
+        t0 = time.perf_counter()
+        if i % 2:
+            c.call("POST", "/api/logs", {"level": "info", "task_id": task_id, "msg": f"line {i}"})
+        else:
+            c.call("PATCH", f"/api/tasks/{task_id}",
+                   {"current_step": f"step {i}", "status": "running"})
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+    return latencies
+
+
+def poll(port, stop, count):
+    # Dashboards fetch compressed snapshots and don't parse them here, so
+    # the client process stays out of the bot's way.
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"X-API-Key": API_KEY, "Accept-Encoding": "br, gzip"}
+    while time.time() < stop:
+        conn.request("GET", "/api/state", headers=headers)
+        conn.getresponse().read()
+        with count.get_lock():
+            count.value += 1
+
+
+def pollers_process(port, stop, count, n):
+    threads = [threading.Thread(target=poll, args=(port, stop, count)) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def phase(label, port, task_id, seconds, pollers):
+    stop = time.time() + seconds
+    count = multiprocessing.Value("q", 0)
+    proc = multiprocessing.Process(target=pollers_process, args=(port, stop, count, pollers))
+    if pollers:
+        proc.start()
+        time.sleep(0.2)  # let them connect
+    latencies = bot(port, task_id, stop)
+    if pollers:
+        proc.join()
+    print(f"{label:>18}: {len(latencies) / seconds:6.0f} writes/s | "
+          f"p50 {percentile(latencies, 0.5):6.1f} ms | "
+          f"p99 {percentile(latencies, 0.99):6.1f} ms | max {max(latencies) * 1000:6.1f} ms | "
+          f"{count.value / seconds:5.0f} polls/s")
+
+
+def run(seconds, pollers, n_tasks):
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_server(os.path.join(tmp, "bench.db"), port)
+        try:
+            c = Client(port)
+            for start in range(0, n_tasks, 100):
+                c.call("POST", "/api/batch", {"ops": [
+                    {"op": "create_task", "name": f"seed {i}", "type": "research",
+                     "subtype": "bench", "steps": ["a", "b"]}
+                    for i in range(start, min(start + 100, n_tasks))
+                ]})
+            task_id = c.call("POST", "/api/tasks", {
+                "name": "bench", "type": "research", "subtype": "bench", "steps": ["a"],
+            })["task_id"]
+            phase("idle", port, task_id, seconds, 0)
+            phase(f"{pollers} pollers", port, task_id, seconds, pollers)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*(args + [5, 64, 2000][len(args):]))
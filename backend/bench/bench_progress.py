@@ -0,0 +1,99 @@
+"""
+Progress-update throughput with and without the write-behind buffer.
+
+Usage (from backend/):
+    python bench/bench_progress.py [seconds] [clients] [tasks]   # default 5 16 48
+
+Starts uvicorn on a throwaway database twice, once with PROGRESS_FLUSH_MS=0
+(every patch commits) and once with the default buffer. `clients` threads
+each keep a connection open and PATCH progress on their own share of the
+tasks (`tasks` should be a multiple of `clients`). Afterwards checks that
+/api/state shows every task's last progress and, once flushed, that the
+database holds it too.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from bench_batch import Client, free_port, start_server
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process (Linux only; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def run_mode(flush_ms, seconds, clients, n_tasks):
+    os.environ["PROGRESS_FLUSH_MS"] = str(flush_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        port = free_port()
+        proc = start_server(db_path, port)
+        try:
+            c = Client(port)
+            ids = [c.call("POST", "/api/tasks", {
+                "name": f"bench {i}", "type": "research", "subtype": "bench",
+                "steps": ["a", "b", "c"],
+            })["task_id"] for i in range(n_tasks)]
+            for task_id in ids:
+                c.call("PATCH", f"/api/tasks/{task_id}", {"status": "running"})
+
+            last = {}
+            counts = [0] * clients
+            stop = time.monotonic() + seconds
+
+            def client(k):
+                cc = Client(port)
+                i = 0
+                while time.monotonic() < stop:
+                    task_id = ids[(k + i * clients) % n_tasks]
+                    value = i % 100
+                    cc.call("PATCH", f"/api/tasks/{task_id}",
+                            {"progress": value, "current_step": f"step {value}"})
+                    last[task_id] = value
+                    i += 1
+                counts[k] = i
+
+            threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+            cpu0 = cpu_seconds(proc.pid)
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - t0
+            total = sum(counts)
+            cpu1 = cpu_seconds(proc.pid)
+            server_cpu = (f"server CPU {(cpu1 - cpu0) / total * 1e6:.0f} us/update | "
+                          if cpu0 is not None else "")
+
+            state = {t["id"]: t["progress"] for t in Client(port).call("GET", "/api/state", None)["tasks"]}
+            shown = sum(state.get(i) == v for i, v in last.items())
+            time.sleep(max(flush_ms, 100) / 1000 * 2)
+            with sqlite3.connect(db_path) as conn:
+                stored = dict(conn.execute("SELECT id, progress FROM tasks"))
+                version = conn.execute("SELECT version FROM sync_state").fetchone()[0]
+            flushed = sum(stored.get(i) == v for i, v in last.items())
+            label = f"flush {flush_ms} ms" if flush_ms else "unbuffered"
+            print(f"{label:>13}: {total / elapsed:7.0f} updates/s ({clients} clients, {n_tasks} tasks) | "
+                  f"{server_cpu}{version} commits | /api/state current {shown}/{len(last)} | "
+                  f"stored {flushed}/{len(last)}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    seconds, clients, n_tasks = args + [5, 16, 48][len(args):]
+    run_mode(0, seconds, clients, n_tasks)
+    run_mode(250, seconds, clients, n_tasks)
@@ -0,0 +1,109 @@
+"""
+Reporter events/sec against a local stand-in server.
+
+Usage (from backend/):
+    python bench/bench_reporter.py [events] [concurrency]
+
+The stand-in answers every request with a tiny JSON body and does no work,
+so the numbers isolate client-side cost: a new connection per call (the old
+urllib path) versus kept-alive connections in ClawdReporter and
+AsyncClawdReporter.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clawd_reporter import AsyncClawdReporter, ClawdReporter  # noqa: E402
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = -1  # headers and body in one write
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok": true, "task_id": "tsk_bench"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_PATCH = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def urllib_log(base_url, i):
+    """The pre-pooling request path, kept here for comparison."""
+    req = urllib.request.Request(
+        f"{base_url}/api/logs",
+        data=json.dumps({"level": "info", "task_id": None, "task_name": None,
+                         "msg": f"line {i}"}).encode(),
+        headers={"X-API-Key": "bench", "Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        resp.read()
+
+
+def rate(fn, n):
+    t0 = time.perf_counter()
+    fn(n)
+    return n / (time.perf_counter() - t0)
+
+
+def run(n, concurrency):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def old(n):
+        for i in range(n):
+            urllib_log(base_url, i)
+
+    def pooled(n):
+        r = ClawdReporter(base_url, "bench")
+        for i in range(n):
+            r.log(None, None, "info", f"line {i}")
+
+    def async_seq(n):
+        async def go():
+            async with AsyncClawdReporter(base_url, "bench") as r:
+                for i in range(n):
+                    await r.log(None, None, "info", f"line {i}")
+        asyncio.run(go())
+
+    def async_concurrent(n):
+        async def go():
+            async with AsyncClawdReporter(base_url, "bench") as r:
+                sem = asyncio.Semaphore(concurrency)
+
+                async def one(i):
+                    async with sem:
+                        await r.log(None, None, "info", f"line {i}")
+
+                await asyncio.gather(*(one(i) for i in range(n)))
+        asyncio.run(go())
+
+    print(f"{'urllib, new connection':>28} {rate(old, n):8.0f} ev/s")
+    print(f"{'ClawdReporter, keep-alive':>28} {rate(pooled, n):8.0f} ev/s")
+    print(f"{'AsyncClawdReporter':>28} {rate(async_seq, n):8.0f} ev/s")
+    print(f"{f'AsyncClawdReporter x{concurrency}':>28} {rate(async_concurrent, n):8.0f} ev/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run(n, concurrency)
@@ -0,0 +1,76 @@
+"""
+Serialization time and bytes on the wire for a large state payload.
+
+Usage (from backend/):
+    python bench/bench_serialize.py [tasks]      # default 10,000
+
+Builds a state payload holding every seeded task (what /api/state used to
+send) and compares FastAPI's default path (jsonable_encoder + json) with
+the stdlib compact encoder and orjson, then the size and cost of gzip and
+brotli on the result.
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import database as db  # noqa: E402
+import responses  # noqa: E402
+from bench_state import seed  # noqa: E402
+
+
+def median_ms(fn, repeat=7):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def fastapi_default(obj):
+    return json.dumps(jsonable_encoder(obj), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode()
+
+
+def stdlib_compact(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def run(n_tasks):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.init_db()
+        seed(n_tasks)
+        state = {
+            "tasks":     db.get_all_tasks(),
+            "logs":      db.get_logs(60),
+            "scheduled": db.get_all_scheduled(),
+            "analytics": db.compute_analytics(),
+        }
+
+    encoders = {"jsonable_encoder + json": fastapi_default, "json (compact)": stdlib_compact}
+    if responses.orjson is not None:
+        encoders["orjson"] = responses.orjson.dumps
+    print(f"{n_tasks} tasks")
+    for label, encode in encoders.items():
+        print(f"  {label:>24} {median_ms(lambda: encode(state)):8.1f} ms")
+
+    body = responses.dumps(state)
+    print(f"  {'identity':>24} {len(body) / 1024:8.0f} KiB")
+    for name, compress in responses.ENCODERS.items():
+        ms = median_ms(lambda: compress(body), repeat=3)
+        size = len(compress(body))
+        print(f"  {name:>24} {size / 1024:8.0f} KiB  ({size / len(body):.0%}, {ms:.1f} ms, "
+              f"once per version)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
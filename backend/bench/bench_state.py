@@ -0,0 +1,112 @@
+"""
+Benchmark GET /api/state against a seeded throwaway database.
+
+Usage (from backend/):
+    python bench/bench_state.py                # 1k, 10k, 100k tasks
+    python bench/bench_state.py 5000 20000     # custom sizes
+
+Compares the old per-task step query (N+1) with the batched loader over the
+whole table, and times analytics and the full /api/state handler
+(active + recent tasks, logs, scheduled, analytics).
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+TYPES = list(db.TYPE_LABELS)
+STATUSES = ["completed", "completed", "completed", "failed", "running", "pending", "cancelled"]
+STEPS_PER_TASK = 4
+
+
+def seed(n_tasks):
+    now = db.now_ms()
+    tasks, steps = [], []
+    for i in range(n_tasks):
+        task_id = f"tsk_{i:08x}"
+        status = random.choice(STATUSES)
+        created = now - random.randint(0, 60 * 24 * 3600 * 1000)
+        started = created + 1000
+        done = started + random.randint(5_000, 600_000) if status in ("completed", "failed") else None
+        tasks.append((
+            task_id, f"Task {i}", random.choice(TYPES), "bench", status, "medium",
+            100 if done else 0, None, 0, started, done, None, 0,
+            "E_BENCH" if status == "failed" else None, None, '["bench"]', created,
+        ))
+        for seq in range(STEPS_PER_TASK):
+            steps.append((task_id, f"Step {seq}", "pending", seq))
+    with db.get_conn() as conn:
+        conn.executemany(
+            """INSERT INTO tasks (id, name, type, subtype, status, priority, progress,
+               current_step, step_idx, started_at, completed_at, eta, retry_count,
+               error_code, error_message, tags_json, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            tasks
+        )
+        conn.executemany(
+            "INSERT INTO task_steps (task_id, label, status, seq) VALUES (?, ?, ?, ?)", steps
+        )
+    db.rebuild_rollups()
+
+
+def get_all_tasks_n_plus_one():
+    """The pre-batching loader, kept here for comparison."""
+    with db.get_conn() as conn:
+        rows = conn.execute("SELECT * FROM tasks ORDER BY created_at DESC").fetchall()
+        tasks = []
+        for row in rows:
+            task = dict(row)
+            task["tags"] = json.loads(task.pop("tags_json", "[]"))
+            task["steps"] = [
+                dict(s) for s in conn.execute(
+                    "SELECT label, status FROM task_steps WHERE task_id = ? ORDER BY seq",
+                    (task["id"],)
+                ).fetchall()
+            ]
+            tasks.append(task)
+        return tasks
+
+
+def get_state():
+    return json.dumps({
+        "tasks":     db.get_state_tasks(),
+        "logs":      db.get_logs(60),
+        "scheduled": db.get_all_scheduled(),
+        "analytics": db.compute_analytics(),
+    })
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def run(n_tasks):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.init_db()
+        seed(n_tasks)
+        repeat = 5 if n_tasks <= 10_000 else 2
+        old = timeit(get_all_tasks_n_plus_one, repeat)
+        new = timeit(db.get_all_tasks, repeat)
+        analytics = timeit(db.compute_analytics, repeat)
+        state = timeit(get_state, repeat)
+        print(f"{n_tasks:>8} tasks | n+1 {old:9.1f} ms | batched {new:9.1f} ms "
+              f"| x{old / new:5.1f} | analytics {analytics:7.1f} ms | /api/state {state:7.1f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,103 @@
+"""
+Write throughput and /api/state latency of the single server process as
+concurrent writers grow, i.e. how well the writer's group commit scales.
+The app runs as one uvicorn worker (see Procfile), so this varies clients,
+not worker processes.
+
+Usage (from backend/):
+    python bench/bench_writer.py [max_writers] [seconds] [readers]
+                                                  # default 64 5 4
+
+For 1, 4, 16, ... up to `max_writers` writer threads, starts uvicorn on a
+fresh throwaway database and runs the writers, which create tasks, log and
+move them through running → completed (writes that always commit, unlike
+progress patches), next to `readers` threads fetching full /api/state
+snapshots. Reports writes/s, failed writes, write latency and snapshot
+latency percentiles.
+"""
+
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_batch import Client, free_port, start_server
+
+
+def pct(sorted_ms, q):
+    return sorted_ms[max(0, math.ceil(q * len(sorted_ms)) - 1)] if sorted_ms else float("nan")
+
+
+def run(seconds, n_writers, n_readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_server(os.path.join(tmp, "bench.db"), port)
+        try:
+            writes, reads, failed = [], [], [0]
+            lock = threading.Lock()
+            stop = time.monotonic() + seconds
+
+            def timed(c, method, path, body, into):
+                t0 = time.perf_counter()
+                try:
+                    result = c.call(method, path, body)
+                except Exception:
+                    with lock:
+                        failed[0] += 1
+                    return None
+                with lock:
+                    into.append((time.perf_counter() - t0) * 1000)
+                return result
+
+            def writer(k):
+                c = Client(port)
+                while time.monotonic() < stop:
+                    created = timed(c, "POST", "/api/tasks", {
+                        "name": f"bench {k}", "type": "research", "subtype": "bench",
+                        "steps": ["a", "b"],
+                    }, writes)
+                    if created is None:
+                        c = Client(port)
+                        continue
+                    task_id = created["task_id"]
+                    timed(c, "PATCH", f"/api/tasks/{task_id}", {"status": "running"}, writes)
+                    timed(c, "POST", "/api/logs", {"level": "info", "task_id": task_id,
+                                                   "msg": "working"}, writes)
+                    timed(c, "PATCH", f"/api/tasks/{task_id}", {"status": "completed"}, writes)
+
+            def reader():
+                c = Client(port)
+                while time.monotonic() < stop:
+                    if timed(c, "GET", "/api/state", None, reads) is None:
+                        c = Client(port)
+
+            threads = ([threading.Thread(target=writer, args=(k,)) for k in range(n_writers)]
+                       + [threading.Thread(target=reader) for _ in range(n_readers)])
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - t0
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    writes.sort()
+    reads.sort()
+    print(f"{n_writers:3d} writers: {len(writes) / elapsed:6.0f} writes/s, {failed[0]} failed | "
+          f"write p50 {pct(writes, .5):5.1f} p99 {pct(writes, .99):6.1f} ms | "
+          f"/api/state {len(reads) / elapsed:5.0f}/s p50 {pct(reads, .5):5.1f} "
+          f"p99 {pct(reads, .99):6.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    max_writers, seconds, n_readers = args + [64, 5, 4][len(args):]
+    print(f"{os.cpu_count()} CPU(s), {n_readers} reader threads")
+    n_writers = 1
+    while n_writers <= max_writers:
+        run(seconds, n_writers, n_readers)
+        n_writers *= 4
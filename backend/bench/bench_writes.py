@@ -0,0 +1,74 @@
+"""
+Microbenchmark of append_log / update_task calls per second.
+
+Usage (from backend/):
+    python bench/bench_writes.py [calls] [threads]
+
+Calls are spread over a thread pool sized like FastAPI's default (40), once
+with a fresh connection per call (the old get_conn) and once with the
+per-thread persistent connections.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+N_TASKS = 200
+
+
+def connect_per_call():
+    """The pre-pooling get_conn, kept here for comparison."""
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def do_log(i):
+    db.append_log(f"lg_{uuid.uuid4().hex[:12]}", "info", None, None, f"bench line {i}")
+
+
+def do_update(i):
+    task_id = f"tsk_{i % N_TASKS:08x}"
+    if db.task_exists(task_id):
+        db.update_task(task_id, {"progress": i % 100})
+
+
+def rate(fn, calls, threads):
+    with ThreadPoolExecutor(threads) as pool:
+        t0 = time.perf_counter()
+        list(pool.map(fn, range(calls)))
+        return calls / (time.perf_counter() - t0)
+
+
+def run(calls, threads):
+    pooled_get_conn = db.get_conn
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.init_db()
+        for i in range(N_TASKS):
+            db.create_task(f"tsk_{i:08x}", f"Task {i}", "research", "bench",
+                           ["a", "b"], [], "medium", None)
+
+        for label, get_conn in (("per-call", connect_per_call), ("pooled", pooled_get_conn)):
+            db.get_conn = get_conn
+            try:
+                logs = rate(do_log, calls, threads)
+                updates = rate(do_update, calls, threads)
+            finally:
+                db.get_conn = pooled_get_conn
+            print(f"{label:>9} | append_log {logs:8.0f}/s | update_task {updates:8.0f}/s")
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    run(calls, threads)
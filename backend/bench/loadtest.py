@@ -0,0 +1,395 @@
+"""
+Load test for the dashboard API: seeded database, mixed concurrent
+workload, per-endpoint latency percentiles and throughput.
+
+Usage (from backend/):
+    python bench/loadtest.py [options]                 # run, write loadtest-<commit>.json
+    python bench/loadtest.py --compare OLD.json NEW.json
+
+Starts uvicorn on a throwaway database seeded with --tasks/--steps/--logs/
+--scheduled rows (or targets --url, as-is), then runs for --duration
+seconds:
+
+  pollers   dashboards: one full GET /api/state, then ?since= deltas every
+            --poll-interval seconds (a full snapshot every --full-every polls)
+  writers   bots driving ClawdReporter: create a task, run it step by step
+            with progress updates and log lines, complete it
+  readers   task list pages, log search and analytics
+
+and reports count, req/s and p50/p95/p99 latency per endpoint. The result
+file records the commit and the configuration so runs can be compared.
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import free_port, start_server  # noqa: E402
+from clawd_reporter import ClawdReporter  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TYPES = ["web_automation", "research", "api_integration", "dev_infra", "local_ops"]
+STATUSES = ["completed"] * 6 + ["failed", "cancelled", "pending", "running", "waiting_input"]
+PRIORITIES = ["low", "medium", "medium", "high"]
+LEVELS = ["info"] * 6 + ["warn", "error"]
+WORDS = ("fetch parse export upload retry timeout browser page record sheet invoice "
+         "sync lead webhook report backup crawl summary token quota").split()
+RECURRENCES = ["Every 1h", "Every 15m", "Daily 09:00", "Mon 08:00", "1st of month", "*/30 * * * *"]
+ACCEPT_ENCODING = "gzip, br" if brotli else "gzip"
+
+
+# ── Seeding ───────────────────────────────────────────────
+
+def seed(db_path, n_tasks, n_steps, n_logs, n_scheduled):
+    import database as db
+
+    db.DB_PATH = db_path
+    db.init_db()
+    now = db.now_ms()
+    month = 30 * 24 * 3600 * 1000
+    tasks, steps, logs = [], [], []
+    for i in range(n_tasks):
+        task_id = f"tsk_{i:08x}"
+        status = random.choice(STATUSES)
+        created = now - random.randrange(month)
+        started = created + random.randrange(60_000) if status != "pending" else None
+        done = status in ("completed", "failed", "cancelled")
+        completed = started + random.randrange(5_000, 900_000) if done else None
+        step_idx = n_steps if status == "completed" else random.randrange(n_steps + 1)
+        tasks.append((task_id, f"Task {i}", random.choice(TYPES), "load", status,
+                      random.choice(PRIORITIES), 100 if status == "completed" else 0,
+                      step_idx, started, completed, json.dumps(random.sample(WORDS, 2)), created))
+        for seq in range(n_steps):
+            step_status = "completed" if seq < step_idx else "pending"
+            step_start = started + seq * 1000 if started and step_status == "completed" else None
+            steps.append((task_id, f"Step {seq}", step_status, seq, step_start,
+                          step_start + random.randrange(100, 60_000) if step_start else None))
+    for i in range(n_logs):
+        task = random.randrange(max(n_tasks, 1))
+        logs.append((f"lg_{i:012x}", random.choice(LEVELS), f"tsk_{task:08x}", f"Task {task}",
+                     " ".join(random.choices(WORDS, k=6)), now - (n_logs - i) * 50))
+
+    with db.get_conn() as conn:
+        conn.executemany(
+            """INSERT INTO tasks (id, name, type, subtype, status, priority, progress, step_idx,
+               started_at, completed_at, tags_json, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            tasks
+        )
+        conn.executemany(
+            """INSERT INTO task_steps (task_id, label, status, seq, started_at, completed_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            steps
+        )
+        conn.executemany(
+            "INSERT INTO logs (id, level, task_id, task_name, msg, ts) VALUES (?, ?, ?, ?, ?, ?)",
+            logs
+        )
+    for i in range(n_scheduled):
+        db.upsert_scheduled(f"sch_{i:05d}", f"Schedule {i}", random.choice(TYPES), "load",
+                            None, random.choice(RECURRENCES), None)
+    db.rebuild_rollups()
+    db.close_conn()
+
+
+# ── Measurement ───────────────────────────────────────────
+
+class Recorder:
+    """Latencies per endpoint label, kept only once the warm-up is over."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.recording = False
+
+    def add(self, label, ms, ok=True):
+        if not self.recording:
+            return
+        with self.lock:
+            self.samples.setdefault(label, []).append(ms)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+
+def endpoint_label(method, path):
+    path = urllib.parse.urlsplit(path).path
+    path = re.sub(r"/(tsk|sch|lg)_[0-9a-f]+", "/{id}", path)
+    return f"{method} {path}"
+
+
+class Http:
+    """One keep-alive connection, like a browser tab."""
+
+    def __init__(self, base_url, api_key, recorder):
+        parts = urllib.parse.urlsplit(base_url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        self.headers = {"X-API-Key": api_key, "Accept-Encoding": ACCEPT_ENCODING}
+        self.recorder = recorder
+
+    def get(self, path, label=None):
+        """Returns (status, decoded JSON or None). Decompression isn't timed."""
+        t0 = time.perf_counter()
+        try:
+            self.conn.request("GET", path, headers=self.headers)
+            resp = self.conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.recorder.add(label or endpoint_label("GET", path), 0, ok=False)
+            return 599, None
+        self.recorder.add(label or endpoint_label("GET", path),
+                          (time.perf_counter() - t0) * 1000, resp.status < 400)
+        if resp.status != 200:
+            return resp.status, None
+        encoding = resp.getheader("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "br":
+            body = brotli.decompress(body)
+        return resp.status, json.loads(body)
+
+
+class TimedReporter(ClawdReporter):
+    """ClawdReporter that records how long each API call took."""
+
+    def __init__(self, *args, recorder, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def _request(self, method, path, body=None):
+        t0 = time.perf_counter()
+        res = super()._request(method, path, body)
+        self.recorder.add(endpoint_label(method, path), (time.perf_counter() - t0) * 1000,
+                          res is not None)
+        return res
+
+
+def percentile(sorted_vals, q):
+    return sorted_vals[max(0, math.ceil(q * len(sorted_vals)) - 1)]
+
+
+# ── Workloads ─────────────────────────────────────────────
+
+def poller(ctx, i):
+    http_ = Http(ctx.url, ctx.api_key, ctx.recorder)
+    version = None
+    polls = 0
+    while not ctx.stop.is_set():
+        if version is None or polls % ctx.args.full_every == 0:
+            status, data = http_.get("/api/state", "GET /api/state (full)")
+        else:
+            status, data = http_.get(f"/api/state?since={version}", "GET /api/state (delta)")
+        if data is not None:
+            version = data["version"]
+        polls += 1
+        ctx.stop.wait(ctx.args.poll_interval)
+
+
+def writer(ctx, i):
+    r = TimedReporter(ctx.url, ctx.api_key, recorder=ctx.recorder)
+    n_steps = max(ctx.args.steps, 1)
+    labels = [f"Step {s}" for s in range(n_steps)]
+    while not ctx.stop.is_set():
+        task_id = r.create_task(f"Load {i}", type=random.choice(TYPES), subtype="load",
+                                steps=labels, tags=["load"], priority=random.choice(PRIORITIES))
+        if not task_id:
+            ctx.stop.wait(0.1)
+            continue
+        r.update(task_id, status="running")
+        for s in range(n_steps):
+            if ctx.stop.is_set():
+                break
+            r.update(task_id, step=labels[s], step_idx=s, progress=round(s / n_steps * 100))
+            r.log(task_id, f"Load {i}", random.choice(LEVELS), " ".join(random.choices(WORDS, k=6)))
+            ctx.stop.wait(ctx.args.think)
+        r.complete(task_id)
+
+
+def reader(ctx, i):
+    http_ = Http(ctx.url, ctx.api_key, ctx.recorder)
+    cursor = None
+    while not ctx.stop.is_set():
+        path = "/api/tasks?limit=50" + (f"&cursor={urllib.parse.quote(cursor)}" if cursor else "")
+        _, data = http_.get(path, "GET /api/tasks")
+        cursor = data["next_cursor"] if data else None
+        http_.get(f"/api/tasks?status={random.choice(STATUSES)}&limit=50", "GET /api/tasks?status")
+        http_.get(f"/api/logs/search?q={random.choice(WORDS)}&limit=50")
+        http_.get("/api/analytics")
+        http_.get("/api/analytics/steps")
+        ctx.stop.wait(ctx.args.think)
+
+
+class Context:
+    def __init__(self, args, url, api_key):
+        self.args = args
+        self.url = url
+        self.api_key = api_key
+        self.recorder = Recorder()
+        self.stop = threading.Event()
+
+
+def run_workload(args, url, api_key):
+    ctx = Context(args, url, api_key)
+    threads = []
+    for role, count in ((poller, args.pollers), (writer, args.writers), (reader, args.readers)):
+        threads += [threading.Thread(target=role, args=(ctx, i), daemon=True) for i in range(count)]
+    for t in threads:
+        t.start()
+    time.sleep(args.warmup)
+    ctx.recorder.recording = True
+    t0 = time.perf_counter()
+    time.sleep(args.duration)
+    ctx.recorder.recording = False
+    elapsed = time.perf_counter() - t0
+    ctx.stop.set()
+    for t in threads:
+        t.join(timeout=10)
+    return summarize(ctx.recorder, elapsed)
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for label, samples in sorted(recorder.samples.items()):
+        samples.sort()
+        endpoints[label] = {
+            "count":  len(samples),
+            "rps":    round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(samples, 0.50), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2),
+            "p99_ms": round(percentile(samples, 0.99), 2),
+            "max_ms": round(samples[-1], 2),
+            "errors": recorder.errors.get(label, 0),
+        }
+    total = sum(e["count"] for e in endpoints.values())
+    return {"elapsed_s": round(elapsed, 2), "total_rps": round(total / elapsed, 1),
+            "endpoints": endpoints}
+
+
+# ── Reporting ─────────────────────────────────────────────
+
+def git_commit():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                                      text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--", "."],
+                                             cwd=BACKEND, text=True).strip())
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def print_table(result):
+    print(f"{'endpoint':<36} {'count':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+    for label, e in result["endpoints"].items():
+        print(f"{label:<36} {e['count']:>7} {e['rps']:>8.1f} {e['p50_ms']:>8.2f} "
+              f"{e['p95_ms']:>8.2f} {e['p99_ms']:>8.2f} {e['errors']:>5}")
+    print(f"{'total':<36} {'':>7} {result['total_rps']:>8.1f}   (latencies in ms)")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def pct(a, b):
+        return f"{(b - a) / a:+.0%}" if a else "n/a"
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'endpoint':<36} {'req/s':>16} {'':>6} {'p95 ms':>18} {'':>6}")
+    for label in sorted(set(old["endpoints"]) | set(new["endpoints"])):
+        a, b = old["endpoints"].get(label), new["endpoints"].get(label)
+        if not a or not b:
+            print(f"{label:<36} {'only in ' + ('new' if b else 'old'):>16}")
+            continue
+        print(f"{label:<36} {a['rps']:>7.1f} {b['rps']:>8.1f} {pct(a['rps'], b['rps']):>6} "
+              f"{a['p95_ms']:>8.2f} {b['p95_ms']:>9.2f} {pct(a['p95_ms'], b['p95_ms']):>6}")
+    print(f"{'total':<36} {old['total_rps']:>7.1f} {new['total_rps']:>8.1f} "
+          f"{pct(old['total_rps'], new['total_rps']):>6}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--tasks", type=int, default=5_000)
+    p.add_argument("--steps", type=int, default=5, help="steps per task")
+    p.add_argument("--logs", type=int, default=20_000)
+    p.add_argument("--scheduled", type=int, default=200)
+    p.add_argument("--pollers", type=int, default=8)
+    p.add_argument("--writers", type=int, default=4)
+    p.add_argument("--readers", type=int, default=2)
+    p.add_argument("--poll-interval", type=float, default=0.5)
+    p.add_argument("--full-every", type=int, default=10, help="full snapshot every N polls")
+    p.add_argument("--think", type=float, default=0.0, help="pause between bot/reader steps")
+    p.add_argument("--duration", type=float, default=20)
+    p.add_argument("--warmup", type=float, default=3)
+    p.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    p.add_argument("--url", help="target a running server instead (no seeding)")
+    p.add_argument("--api-key", default=os.getenv("API_KEY", "bench"))
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="result file (default loadtest-<commit>.json)")
+    p.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = p.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    random.seed(args.seed)
+    commit, dirty = git_commit()
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = None
+        url, api_key = args.url, args.api_key
+        if not url:
+            db_path = os.path.join(tmp, "load.db")
+            t0 = time.perf_counter()
+            seed(db_path, args.tasks, args.steps, args.logs, args.scheduled)
+            print(f"seeded {args.tasks} tasks, {args.tasks * args.steps} steps, {args.logs} logs, "
+                  f"{args.scheduled} scheduled in {time.perf_counter() - t0:.1f}s")
+            port = free_port()
+            os.environ["LOG_RETENTION_COUNT"] = str(max(args.logs, 500))
+            proc = start_server(db_path, port, args.workers)
+            url, api_key = f"http://127.0.0.1:{port}", "bench"
+        try:
+            result = run_workload(args, url, api_key)
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait()
+
+    result = {
+        "commit":    commit,
+        "dirty":     dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python":    platform.python_version(),
+        "config":    {k: v for k, v in vars(args).items() if k not in ("compare", "api_key")},
+        **result,
+    }
+    print_table(result)
+    out = args.out or f"loadtest-{commit or 'nogit'}{'-dirty' if dirty else ''}.json"
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Small in-process caches for read endpoints.
+
+VersionedCache holds the value for the newest key it has seen (the database
+change version, so any write invalidates it) and makes concurrent misses
+for the same key wait for a single computation. TTLCache is the same idea
+keyed on time, for data that doesn't need per-write freshness.
+"""
+
+import threading
+import time
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class VersionedCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._value = None
+        self._flights = {}
+
+    def get(self, key, compute):
+        """Return the cached value for `key`, computing it at most once
+        across concurrent callers. Older keys never replace newer ones."""
+        with self._lock:
+            if self._key == key:
+                return self._value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and (self._key is None or key > self._key):
+                    self._key, self._value = key, flight.value
+            flight.done.set()
+        return flight.value
+
+    def clear(self):
+        with self._lock:
+            self._key = self._value = None
+
+
+class TTLCache(VersionedCache):
+    """Single value refreshed every `ttl` seconds. `get()` returns
+    (generation, value); the generation changes on every refresh."""
+
+    def __init__(self, ttl: float):
+        super().__init__()
+        self.ttl = ttl
+
+    def get(self, compute):
+        generation = int(time.monotonic() // self.ttl)
+        return generation, super().get(generation, compute)
@@ -22,43 +22,359 @@ Usage:
         t.step(2);  verify();   t.done(2)
         # Exception → r.fail() called automatically
 
+    # Buffered mode: update/log/schedule return immediately and a background
+    # thread sends them to /api/batch; successive updates of one task merge.
+    r = ClawdReporter("http://localhost:8000", api_key="your-key", buffered=True)
+    ...
+    r.close()   # flush what's left (also runs at interpreter exit)
+
+    # Workers: pull pending tasks from the dashboard's queue
+    for t in r.lease("worker-1", types=["web_automation"], lease_s=60):
+        r.heartbeat(t["id"], "worker-1")     # at least once per lease_s
+        ...
+        r.complete(t["id"], worker="worker-1")  # 409 if the lease was lost
+
+    # asyncio bots: same calls, awaited
+    async with AsyncClawdReporter("http://localhost:8000", api_key="your-key") as r:
+        async with r.task("Daily backup", type="local_ops", subtype="backup",
+                          steps=["Dump DB", "Compress"]) as t:
+            await t.step(0);  await do_dump();  await t.done(0)
+
+Both reporters keep HTTP/1.1 connections open between calls. When the
+dashboard says to slow down (429/503) they wait its Retry-After, or back off
+exponentially, and try again; every call from that reporter waits too.
+
 All calls are fire-and-forget (errors are logged, never re-raised).
 """
 
+import asyncio
+import atexit
+import collections
+import http.client
 import json
 import logging
-import urllib.request
-import urllib.error
+import random
+import select
+import ssl
+import threading
+import time
+import urllib.parse
 from typing import Optional
 
 logger = logging.getLogger("clawd_reporter")
 
+# Errors that mean a kept-alive connection was closed by the server while
+# idle. The request is retried once on a fresh connection if it failed
+# while being written, or is idempotent; otherwise the server may already
+# have applied it (a task created or a line logged twice).
+_STALE_ERRORS = (ConnectionError, http.client.HTTPException, asyncio.IncompleteReadError)
+_IDEMPOTENT = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+# Responses that mean the request wasn't handled and may be sent again later.
+_THROTTLED = (429, 503)
+
+
+# ── Request bodies (shared by the sync and async reporters) ──
+
+def _task_body(name, type, subtype, steps, tags, priority, eta):
+    return {
+        "name":     name,
+        "type":     type,
+        "subtype":  subtype,
+        "steps":    steps or [],
+        "tags":     tags or [],
+        "priority": priority,
+        "eta":      eta,
+    }
+
+
+def _update_body(progress, step, step_idx, status, eta, error_code, error_message,
+                 worker=None):
+    body = {}
+    if progress is not None:   body["progress"]      = progress
+    if step is not None:       body["current_step"]  = step
+    if step_idx is not None:   body["step_idx"]      = step_idx
+    if status is not None:     body["status"]        = status
+    if eta is not None:        body["eta"]           = eta
+    if error_code is not None: body["error_code"]    = error_code
+    if error_message is not None: body["error_message"] = error_message
+    if worker is not None:     body["worker"]        = worker
+    return body
+
+
+def _log_body(task_id, task_name, level, msg):
+    return {
+        "level":     level,
+        "task_id":   task_id,
+        "task_name": task_name,
+        "msg":       msg,
+    }
+
+
+def _schedule_body(id, name, type, subtype, next_run, recurrence, avg_dur):
+    return {
+        "id":         id,
+        "name":       name,
+        "type":       type,
+        "subtype":    subtype,
+        "next_run":   next_run,
+        "recurrence": recurrence,
+        "avg_dur":    avg_dur,
+    }
+
+
+def _lease_body(worker, types, limit, lease_s):
+    return {"worker": worker, "types": list(types or []), "limit": limit, "lease_s": lease_s}
+
+
+def _step_update(steps, idx):
+    label = steps[idx] if idx < len(steps) else f"Step {idx}"
+    pct = round(idx / max(len(steps), 1) * 100)
+    return {"progress": pct, "step": label, "step_idx": idx}
+
+
+def _done_update(steps, idx):
+    pct = round((idx + 1) / max(len(steps), 1) * 100)
+    return {"progress": pct, "step_idx": idx + 1}
+
+
+def _dropped(sock) -> bool:
+    """An idle connection is unusable once it's readable: the server closed
+    it (or sent something nobody asked for)."""
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class _ConnectionPool:
+    """Idle keep-alive connections keyed by (scheme, host:port), shared by
+    every ClawdReporter in the process."""
+
+    MAX_IDLE = 8
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = collections.defaultdict(list)
+
+    def get(self, scheme: str, netloc: str, timeout: float):
+        """Return (connection, reused)."""
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            while idle:
+                conn = idle.pop()
+                if conn.sock is not None and not _dropped(conn.sock):
+                    return conn, True
+                conn.close()
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=timeout), False
+
+    def put(self, scheme: str, netloc: str, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle[(scheme, netloc)]
+            if len(idle) < self.MAX_IDLE:
+                idle.append(conn)
+                return
+        conn.close()
+
+
+_pool = _ConnectionPool()
+
+
+class _Backoff:
+    """When the dashboard last asked this reporter to wait. Every request
+    waits out remaining() first, not just the one that was told."""
+
+    def __init__(self, max_delay: float):
+        self.max_delay = max_delay
+        self._until = 0.0
+
+    def remaining(self) -> float:
+        return max(0.0, self._until - time.monotonic())
+
+    def throttled(self, retry_after: Optional[str], attempt: int) -> float:
+        """Record a 429/503 and return the delay before retry `attempt`
+        (0-based): Retry-After in seconds if given, else exponential with
+        full jitter."""
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):  # missing, or an HTTP date
+            delay = random.uniform(0, 0.5 * 2 ** attempt)
+        delay = min(max(delay, 0.0), self.max_delay)
+        self._until = max(self._until, time.monotonic() + delay)
+        return self.remaining()
+
+
+class _Stats:
+    """Event counters for one reporter (thread-safe)."""
+
+    # counter -> (Prometheus metric suffix, help)
+    METRICS = {
+        "sent":    ("events_sent_total", "Events the dashboard accepted"),
+        "failed":  ("events_failed_total", "Events rejected or lost to request errors"),
+        "dropped": ("events_dropped_total", "Events discarded because the buffer was full"),
+        "retried": ("requests_retried_total", "Requests retried on a fresh connection"),
+        "throttled": ("requests_throttled_total", "Responses asking to slow down (429/503)"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.METRICS, 0)
+
+    def add(self, name: str, n: int = 1):
+        with self._lock:
+            self._counts[name] += n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def prometheus(self, prefix: str = "clawd_reporter") -> str:
+        lines = []
+        for name, value in self.snapshot().items():
+            suffix, help_ = self.METRICS[name]
+            lines += [f"# HELP {prefix}_{suffix} {help_}", f"# TYPE {prefix}_{suffix} counter",
+                      f"{prefix}_{suffix} {value}"]
+        return "\n".join(lines) + "\n"
+
 
 class ClawdReporter:
-    def __init__(self, base_url: str, api_key: str, timeout: int = 5):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: int = 5,
+        *,
+        buffered: bool = False,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10_000,
+        on_full: str = "drop",
+        max_retries: int = 3,
+        max_backoff: float = 30.0,
+    ):
+        """
+        buffered:       queue update/log/schedule calls and send them in the
+                        background through /api/batch (create_task stays
+                        synchronous because it returns the task id).
+        batch_size:     send as soon as this many events are queued ...
+        flush_interval: ... or this many seconds after the oldest one.
+        max_queue:      queued events before `on_full` applies.
+        on_full:        "drop" the new event, or "block" the caller until
+                        there is room.
+        max_retries:    times a request the dashboard turned away with
+                        429/503 is sent again before it counts as failed ...
+        max_backoff:    ... waiting at most this many seconds each time.
+                        Unbuffered calls block the caller meanwhile.
+        """
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.timeout = timeout
+        url = urllib.parse.urlsplit(self.base_url)
+        self._scheme, self._netloc, self._prefix = url.scheme, url.netloc, url.path
+        self._stats = _Stats()
+        self.max_retries = max_retries
+        self._backoff = _Backoff(max_backoff)
+        self._buffer = None
+        if buffered:
+            self._buffer = _Buffer(self, batch_size, flush_interval, max_queue, on_full)
+            atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every buffered event has been sent. Returns False on timeout."""
+        return self._buffer.flush(timeout) if self._buffer else True
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush buffered events and stop the background sender. A buffered
+        reporter that is never closed lives until exit, when it's flushed."""
+        if self._buffer:
+            self._buffer.close(timeout)
+            atexit.unregister(self.close)
+
+    @property
+    def dropped(self) -> int:
+        """Events discarded because the buffer was full."""
+        return self._stats.snapshot()["dropped"]
+
+    @property
+    def stats(self) -> dict:
+        """Counters since creation: events sent/failed/dropped, requests
+        retried or throttled."""
+        return self._stats.snapshot()
+
+    def metrics_text(self) -> str:
+        """The counters in Prometheus text format, for a bot's own /metrics."""
+        return self._stats.prometheus()
 
     # ── Internal HTTP helper ──────────────────────────────
 
     def _request(self, method: str, path: str, body: Optional[dict] = None) -> Optional[dict]:
-        url = f"{self.base_url}{path}"
         data = json.dumps(body).encode() if body is not None else None
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._backoff.remaining())
+            res = self._roundtrip(method, path, data)
+            if res is None:
+                return None
+            status, payload, retry_after = res
+            if status in _THROTTLED:
+                self._stats.add("throttled")
+                if attempt < self.max_retries:
+                    delay = self._backoff.throttled(retry_after, attempt)
+                    logger.info("ClawdReporter %s %s → HTTP %s, retrying in %.1fs",
+                                method, path, status, delay)
+                    continue
+            if status >= 400:
+                logger.warning("ClawdReporter %s %s → HTTP %s", method, path, status)
+                return None
+            try:
+                return json.loads(payload)
+            except ValueError as e:
+                logger.warning("ClawdReporter %s %s → %s", method, path, e)
+                return None
+        return None
+
+    def _roundtrip(self, method: str, path: str, data: Optional[bytes]):
+        """Send one request → (status, body, Retry-After), or None on error."""
         headers = {
             "X-API-Key": self.api_key,
             "Content-Type": "application/json",
         }
-        req = urllib.request.Request(url, data=data, headers=headers, method=method)
-        try:
-            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-                return json.loads(resp.read())
-        except urllib.error.HTTPError as e:
-            logger.warning("ClawdReporter %s %s → HTTP %s", method, path, e.code)
-        except Exception as e:
-            logger.warning("ClawdReporter %s %s → %s", method, path, e)
+        for _ in range(2):
+            conn, reused = _pool.get(self._scheme, self._netloc, self.timeout)
+            sent = False
+            try:
+                conn.request(method, self._prefix + path, body=data, headers=headers)
+                sent = True
+                resp = conn.getresponse()
+                payload = resp.read()
+            except Exception as e:
+                conn.close()
+                if (reused and isinstance(e, _STALE_ERRORS)
+                        and (not sent or method in _IDEMPOTENT)):
+                    self._stats.add("retried")
+                    continue
+                logger.warning("ClawdReporter %s %s → %s", method, path, e)
+                return None
+            if resp.will_close:
+                conn.close()
+            else:
+                _pool.put(self._scheme, self._netloc, conn)
+            return resp.status, payload, resp.getheader("Retry-After")
         return None
 
+    def _send(self, method: str, path: str, body: dict) -> Optional[dict]:
+        """_request for one reporting event, counted in stats."""
+        res = self._request(method, path, body)
+        self._stats.add("sent" if res is not None else "failed")
+        return res
+
     # ── Public API ────────────────────────────────────────
 
     def create_task(
@@ -73,15 +389,8 @@ class ClawdReporter:
         eta: str = None,
     ) -> Optional[str]:
         """Create a task on the dashboard. Returns task_id or None on error."""
-        res = self._request("POST", "/api/tasks", {
-            "name":     name,
-            "type":     type,
-            "subtype":  subtype,
-            "steps":    steps or [],
-            "tags":     tags or [],
-            "priority": priority,
-            "eta":      eta,
-        })
+        res = self._send("POST", "/api/tasks",
+                         _task_body(name, type, subtype, steps, tags, priority, eta))
         return res.get("task_id") if res else None
 
     def update(
@@ -95,36 +404,36 @@ class ClawdReporter:
         eta: str = None,
         error_code: str = None,
         error_message: str = None,
+        worker: str = None,
     ):
-        """Update progress/status of an existing task."""
-        body = {}
-        if progress is not None:   body["progress"]      = progress
-        if step is not None:       body["current_step"]  = step
-        if step_idx is not None:   body["step_idx"]      = step_idx
-        if status is not None:     body["status"]        = status
-        if eta is not None:        body["eta"]           = eta
-        if error_code is not None: body["error_code"]    = error_code
-        if error_message is not None: body["error_message"] = error_message
-        if body:
-            self._request("PATCH", f"/api/tasks/{task_id}", body)
+        """Update progress/status of an existing task. Pass the leasing
+        `worker` to have the update refused (409) once the lease is lost."""
+        body = _update_body(progress, step, step_idx, status, eta, error_code, error_message,
+                            worker)
+        if not body:
+            return
+        if self._buffer:
+            self._buffer.put({"op": "update_task", "task_id": task_id, **body})
+        else:
+            self._send("PATCH", f"/api/tasks/{task_id}", body)
 
-    def complete(self, task_id: str, *, progress: int = 100):
+    def complete(self, task_id: str, *, progress: int = 100, worker: str = None):
         """Mark task as completed."""
-        self.update(task_id, status="completed", progress=progress)
+        self.update(task_id, status="completed", progress=progress, worker=worker)
 
-    def fail(self, task_id: str, *, error_code: str = None, error_message: str = None):
+    def fail(self, task_id: str, *, error_code: str = None, error_message: str = None,
+             worker: str = None):
         """Mark task as failed."""
-        self.update(task_id, status="failed",
-                    error_code=error_code, error_message=error_message)
+        self.update(task_id, status="failed", error_code=error_code,
+                    error_message=error_message, worker=worker)
 
     def log(self, task_id: Optional[str], task_name: Optional[str], level: str, msg: str):
         """Append a log entry."""
-        self._request("POST", "/api/logs", {
-            "level":     level,
-            "task_id":   task_id,
-            "task_name": task_name,
-            "msg":       msg,
-        })
+        body = _log_body(task_id, task_name, level, msg)
+        if self._buffer:
+            self._buffer.put({"op": "log", **body})
+        else:
+            self._send("POST", "/api/logs", body)
 
     def schedule(
         self,
@@ -138,21 +447,147 @@ class ClawdReporter:
         avg_dur: Optional[str] = None,
     ):
         """Upsert a scheduled task entry."""
-        self._request("POST", "/api/scheduled", {
-            "id":         id,
-            "name":       name,
-            "type":       type,
-            "subtype":    subtype,
-            "next_run":   next_run,
-            "recurrence": recurrence,
-            "avg_dur":    avg_dur,
-        })
+        body = _schedule_body(id, name, type, subtype, next_run, recurrence, avg_dur)
+        if self._buffer:
+            self._buffer.put({"op": "schedule", **body})
+        else:
+            self._send("POST", "/api/scheduled", body)
+
+    def lease(
+        self,
+        worker: str,
+        *,
+        types: list[str] = None,
+        limit: int = 1,
+        lease_s: int = 60,
+    ) -> list[dict]:
+        """Claim pending tasks for `worker` (highest priority, oldest first).
+        Heartbeat within `lease_s` or the task goes back to the queue.
+        Returns [] when nothing is pending or on error."""
+        res = self._request("POST", "/api/tasks/lease", _lease_body(worker, types, limit, lease_s))
+        return res.get("tasks", []) if res else []
+
+    def heartbeat(self, task_id: str, worker: str, *, lease_s: int = 60) -> bool:
+        """Extend a lease. False means the lease was lost; stop working on it."""
+        res = self._request("POST", f"/api/tasks/{task_id}/heartbeat",
+                            {"worker": worker, "lease_s": lease_s})
+        return res is not None
 
     def task(self, name: str, **kwargs) -> "_TaskContext":
         """Return a context manager for a task (auto complete/fail)."""
         return _TaskContext(self, name, **kwargs)
 
 
+class _Buffer:
+    """Bounded event queue drained by a background thread into /api/batch."""
+
+    def __init__(self, reporter: ClawdReporter, batch_size: int, flush_interval: float,
+                 max_queue: int, on_full: str):
+        if on_full not in ("drop", "block"):
+            raise ValueError("on_full must be 'drop' or 'block'")
+        self._r = reporter
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_queue = max_queue
+        self._on_full = on_full
+        self._queue = collections.deque()
+        self._tail = {}          # task_id → its queued update, if that's its latest event
+        self._oldest = None      # monotonic time the oldest queued event arrived
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="clawd-reporter", daemon=True)
+        self._thread.start()
+
+    def put(self, event: dict):
+        with self._cond:
+            if self._closed:
+                return
+            task_id = event.get("task_id")
+            if event["op"] == "update_task":
+                pending = self._tail.get(task_id)
+                # Merge into the task's queued update unless both change status
+                # (each status transition must reach the server on its own).
+                if pending is not None and not ("status" in pending and "status" in event):
+                    pending.update(event)
+                    return
+            elif task_id is not None:
+                self._tail.pop(task_id, None)
+
+            while len(self._queue) >= self._max_queue:
+                if self._on_full == "drop" or self._closed:
+                    self._r._stats.add("dropped")
+                    logger.warning("ClawdReporter buffer full, dropping %s event", event["op"])
+                    return
+                self._cond.wait()
+
+            self._queue.append(event)
+            if event["op"] == "update_task":
+                self._tail[task_id] = event
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._queue) >= self._batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _take_batch(self):
+        """Wait until a batch is due and pop it (called with the lock held)."""
+        while True:
+            if self._queue:
+                if (self._closed or self._flush_requested
+                        or len(self._queue) >= self._batch_size
+                        or time.monotonic() - self._oldest >= self._flush_interval):
+                    break
+                self._cond.wait(self._oldest + self._flush_interval - time.monotonic())
+            elif self._closed:
+                return None
+            else:
+                self._flush_requested = False
+                self._cond.wait()
+        batch = [self._queue.popleft() for _ in range(min(self._batch_size, len(self._queue)))]
+        for event in batch:  # sent events can no longer absorb merges
+            if self._tail.get(event.get("task_id")) is event:
+                del self._tail[event["task_id"]]
+        self._oldest = time.monotonic() if self._queue else None
+        self._in_flight = len(batch)
+        self._cond.notify_all()  # room for blocked producers
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if batch is None:
+                return
+            res = self._r._request("POST", "/api/batch", {"ops": batch})
+            failed = len(batch)
+            if res:
+                failed = 0
+                for event, result in zip(batch, res.get("results", [])):
+                    if not result.get("ok"):
+                        failed += 1
+                        logger.warning("ClawdReporter batch %s → %s",
+                                       event["op"], result.get("error"))
+            self._r._stats.add("sent", len(batch) - failed)
+            self._r._stats.add("failed", failed)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+
 class _TaskContext:
     """Context manager that auto-completes or fails a task."""
 
@@ -185,14 +620,299 @@ class _TaskContext:
     def step(self, idx: int):
         """Mark a step as running."""
         if self.id:
-            steps = self._kwargs.get("steps", [])
-            label = steps[idx] if idx < len(steps) else f"Step {idx}"
-            pct = round(idx / max(len(steps), 1) * 100)
-            self._r.update(self.id, progress=pct, step=label, step_idx=idx)
+            self._r.update(self.id, **_step_update(self._kwargs.get("steps", []), idx))
 
     def done(self, idx: int):
         """Mark a step as completed (advance progress)."""
         if self.id:
-            steps = self._kwargs.get("steps", [])
-            pct = round((idx + 1) / max(len(steps), 1) * 100)
-            self._r.update(self.id, progress=pct, step_idx=idx + 1)
+            self._r.update(self.id, **_done_update(self._kwargs.get("steps", []), idx))
+
+
+# ── asyncio client ────────────────────────────────────────
+
+class AsyncClawdReporter:
+    """asyncio version of ClawdReporter with the same calls, awaited.
+
+    Uses a small built-in HTTP/1.1 client over asyncio streams so the SDK
+    stays dependency-free; idle connections are kept for reuse.
+    """
+
+    MAX_IDLE = 8
+
+    def __init__(self, base_url: str, api_key: str, timeout: float = 5, *,
+                 max_retries: int = 3, max_backoff: float = 30.0):
+        """max_retries / max_backoff: as for ClawdReporter."""
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        url = urllib.parse.urlsplit(self.base_url)
+        self._host = url.hostname
+        self._port = url.port or (443 if url.scheme == "https" else 80)
+        self._ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self._netloc = url.netloc
+        self._prefix = url.path
+        self._idle = []  # (reader, writer)
+        self._stats = _Stats()
+        self.max_retries = max_retries
+        self._backoff = _Backoff(max_backoff)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+    async def close(self):
+        """Close idle connections."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    # ── Internal HTTP helper ──────────────────────────────
+
+    async def _write_request(self, writer, method, path, data):
+        head = (
+            f"{method} {self._prefix}{path} HTTP/1.1\r\n"
+            f"Host: {self._netloc}\r\n"
+            f"X-API-Key: {self.api_key}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        )
+        writer.write(head.encode() + data)
+        await writer.drain()
+
+    @staticmethod
+    async def _read_response(reader):
+        """→ (status, body, headers)"""
+        status = int((await reader.readuntil(b"\r\n")).split()[1])
+        headers = {}
+        while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            while await reader.readuntil(b"\r\n") != b"\r\n":  # trailers
+                pass
+            body = b"".join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, body, headers
+
+    async def _request(self, method: str, path: str, body: Optional[dict] = None) -> Optional[dict]:
+        data = json.dumps(body).encode() if body is not None else b""
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._backoff.remaining())
+            res = await self._roundtrip(method, path, data)
+            if res is None:
+                return None
+            status, payload, retry_after = res
+            if status in _THROTTLED:
+                self._stats.add("throttled")
+                if attempt < self.max_retries:
+                    delay = self._backoff.throttled(retry_after, attempt)
+                    logger.info("ClawdReporter %s %s → HTTP %s, retrying in %.1fs",
+                                method, path, status, delay)
+                    continue
+            if status >= 400:
+                logger.warning("ClawdReporter %s %s → HTTP %s", method, path, status)
+                return None
+            try:
+                return json.loads(payload)
+            except ValueError as e:
+                logger.warning("ClawdReporter %s %s → %s", method, path, e)
+                return None
+        return None
+
+    async def _roundtrip(self, method: str, path: str, data: bytes):
+        """Send one request → (status, body, Retry-After), or None on error."""
+        for _ in range(2):
+            while self._idle:
+                reader, writer = self._idle.pop()
+                if not reader.at_eof() and not writer.is_closing():
+                    break
+                writer.close()
+            else:
+                reader = None
+            reused = reader is not None
+            try:
+                if not reused:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self._host, self._port, ssl=self._ssl),
+                        self.timeout,
+                    )
+            except Exception as e:
+                logger.warning("ClawdReporter %s %s → %s", method, path, e)
+                return None
+            sent = False
+            try:
+                await asyncio.wait_for(self._write_request(writer, method, path, data), self.timeout)
+                sent = True
+                status, payload, headers = await asyncio.wait_for(
+                    self._read_response(reader), self.timeout
+                )
+            except Exception as e:
+                writer.close()
+                if (reused and isinstance(e, _STALE_ERRORS)
+                        and (not sent or method in _IDEMPOTENT)):
+                    self._stats.add("retried")
+                    continue
+                logger.warning("ClawdReporter %s %s → %s", method, path, e)
+                return None
+            if headers.get("connection", "").lower() != "close" and len(self._idle) < self.MAX_IDLE:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, payload, headers.get("retry-after")
+        return None
+
+    async def _send(self, method: str, path: str, body: dict) -> Optional[dict]:
+        """_request for one reporting event, counted in stats."""
+        res = await self._request(method, path, body)
+        self._stats.add("sent" if res is not None else "failed")
+        return res
+
+    @property
+    def stats(self) -> dict:
+        """Counters since creation: events sent/failed, requests retried or throttled."""
+        return self._stats.snapshot()
+
+    def metrics_text(self) -> str:
+        """The counters in Prometheus text format, for a bot's own /metrics."""
+        return self._stats.prometheus()
+
+    # ── Public API ────────────────────────────────────────
+
+    async def create_task(
+        self,
+        name: str,
+        *,
+        type: str,
+        subtype: str,
+        steps: list[str] = None,
+        tags: list[str] = None,
+        priority: str = "medium",
+        eta: str = None,
+    ) -> Optional[str]:
+        """Create a task on the dashboard. Returns task_id or None on error."""
+        res = await self._send("POST", "/api/tasks",
+                               _task_body(name, type, subtype, steps, tags, priority, eta))
+        return res.get("task_id") if res else None
+
+    async def update(
+        self,
+        task_id: str,
+        *,
+        progress: int = None,
+        step: str = None,
+        step_idx: int = None,
+        status: str = None,
+        eta: str = None,
+        error_code: str = None,
+        error_message: str = None,
+        worker: str = None,
+    ):
+        """Update progress/status of an existing task. Pass the leasing
+        `worker` to have the update refused (409) once the lease is lost."""
+        body = _update_body(progress, step, step_idx, status, eta, error_code, error_message,
+                            worker)
+        if body:
+            await self._send("PATCH", f"/api/tasks/{task_id}", body)
+
+    async def complete(self, task_id: str, *, progress: int = 100, worker: str = None):
+        """Mark task as completed."""
+        await self.update(task_id, status="completed", progress=progress, worker=worker)
+
+    async def fail(self, task_id: str, *, error_code: str = None, error_message: str = None,
+                   worker: str = None):
+        """Mark task as failed."""
+        await self.update(task_id, status="failed", error_code=error_code,
+                          error_message=error_message, worker=worker)
+
+    async def log(self, task_id: Optional[str], task_name: Optional[str], level: str, msg: str):
+        """Append a log entry."""
+        await self._send("POST", "/api/logs", _log_body(task_id, task_name, level, msg))
+
+    async def schedule(
+        self,
+        id: str,
+        name: str,
+        *,
+        type: str,
+        subtype: str,
+        next_run: Optional[int] = None,
+        recurrence: Optional[str] = None,
+        avg_dur: Optional[str] = None,
+    ):
+        """Upsert a scheduled task entry."""
+        await self._send("POST", "/api/scheduled",
+                         _schedule_body(id, name, type, subtype, next_run, recurrence, avg_dur))
+
+    async def lease(
+        self,
+        worker: str,
+        *,
+        types: list[str] = None,
+        limit: int = 1,
+        lease_s: int = 60,
+    ) -> list[dict]:
+        """Claim pending tasks for `worker` (highest priority, oldest first).
+        Heartbeat within `lease_s` or the task goes back to the queue.
+        Returns [] when nothing is pending or on error."""
+        res = await self._request("POST", "/api/tasks/lease",
+                                  _lease_body(worker, types, limit, lease_s))
+        return res.get("tasks", []) if res else []
+
+    async def heartbeat(self, task_id: str, worker: str, *, lease_s: int = 60) -> bool:
+        """Extend a lease. False means the lease was lost; stop working on it."""
+        res = await self._request("POST", f"/api/tasks/{task_id}/heartbeat",
+                                  {"worker": worker, "lease_s": lease_s})
+        return res is not None
+
+    def task(self, name: str, **kwargs) -> "_AsyncTaskContext":
+        """Return an async context manager for a task (auto complete/fail)."""
+        return _AsyncTaskContext(self, name, **kwargs)
+
+
+class _AsyncTaskContext:
+    """Async context manager that auto-completes or fails a task."""
+
+    def __init__(self, reporter: AsyncClawdReporter, name: str, **kwargs):
+        self._r = reporter
+        self._name = name
+        self._kwargs = kwargs
+        self.id: Optional[str] = None
+
+    async def __aenter__(self):
+        self.id = await self._r.create_task(self._name, **self._kwargs)
+        if self.id:
+            await self._r.update(self.id, status="running")
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if not self.id:
+            return False
+        if exc_type is None:
+            await self._r.complete(self.id)
+        else:
+            await self._r.fail(
+                self.id,
+                error_code=type(exc_val).__name__,
+                error_message=str(exc_val),
+            )
+            await self._r.log(self.id, self._name, "error", f"Task failed: {exc_val}")
+        return False  # don't suppress exceptions
+
+    async def step(self, idx: int):
+        """Mark a step as running."""
+        if self.id:
+            await self._r.update(self.id, **_step_update(self._kwargs.get("steps", []), idx))
+
+    async def done(self, idx: int):
+        """Mark a step as completed (advance progress)."""
+        if self.id:
+            await self._r.update(self.id, **_done_update(self._kwargs.get("steps", []), idx))
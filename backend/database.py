@@ -1,9 +1,18 @@
 import sqlite3
 import json
+import math
+import threading
 import time
 import os
+import queue
+import uuid
+import zlib
+from functools import wraps
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "clawd.db")
+import metrics
+from recurrence import parse as parse_recurrence
+
+DB_PATH = os.getenv("CLAWD_DB_PATH", os.path.join(os.path.dirname(__file__), "clawd.db"))
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS tasks (
@@ -23,7 +32,11 @@ CREATE TABLE IF NOT EXISTS tasks (
     error_code TEXT,
     error_message TEXT,
     tags_json TEXT NOT NULL DEFAULT '[]',
-    created_at INTEGER NOT NULL
+    created_at INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    schedule_id TEXT,
+    lease_owner TEXT,
+    lease_expires INTEGER
 );
 
 CREATE TABLE IF NOT EXISTS task_steps (
@@ -31,7 +44,10 @@ CREATE TABLE IF NOT EXISTS task_steps (
     task_id TEXT NOT NULL REFERENCES tasks(id),
     label TEXT NOT NULL,
     status TEXT NOT NULL DEFAULT 'pending',
-    seq INTEGER NOT NULL
+    seq INTEGER NOT NULL,
+    started_at INTEGER,
+    completed_at INTEGER,
+    pinned INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS logs (
@@ -40,7 +56,8 @@ CREATE TABLE IF NOT EXISTS logs (
     task_id TEXT,
     task_name TEXT,
     msg TEXT NOT NULL,
-    ts INTEGER NOT NULL
+    ts INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS scheduled (
@@ -52,112 +69,1227 @@ CREATE TABLE IF NOT EXISTS scheduled (
     recurrence TEXT,
     enabled INTEGER NOT NULL DEFAULT 1,
     avg_dur TEXT,
-    last_status TEXT
+    last_status TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    avg_dur_ms INTEGER
 );
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO sync_state (id, version) VALUES (1, 0);
+
+-- Hourly task counts keyed on created_at, kept current by create_task and
+-- update_task so analytics never scan the tasks table.
+CREATE TABLE IF NOT EXISTS task_rollup (
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error_code TEXT NOT NULL DEFAULT '',
+    cnt INTEGER NOT NULL DEFAULT 0,
+    dur_sum INTEGER NOT NULL DEFAULT 0,
+    dur_cnt INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, status, error_code)
+) WITHOUT ROWID;
+
+-- The part of task_rollup contributed by archived tasks, so rebuilding
+-- the rollup from the tasks table doesn't lose them.
+CREATE TABLE IF NOT EXISTS archived_rollup (
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error_code TEXT NOT NULL DEFAULT '',
+    cnt INTEGER NOT NULL DEFAULT 0,
+    dur_sum INTEGER NOT NULL DEFAULT 0,
+    dur_cnt INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, status, error_code)
+) WITHOUT ROWID;
+
+-- Completed-task durations per task_rollup key, as counts in log-scale
+-- bins (see DUR_GAMMA), so percentiles come from the rollup too.
+CREATE TABLE IF NOT EXISTS duration_rollup (
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error_code TEXT NOT NULL DEFAULT '',
+    bin INTEGER NOT NULL,
+    cnt INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, status, error_code, bin)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS archived_duration_rollup (
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error_code TEXT NOT NULL DEFAULT '',
+    bin INTEGER NOT NULL,
+    cnt INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, status, error_code, bin)
+) WITHOUT ROWID;
+
+-- Completed-step durations per (day completed, task type, step label), in
+-- the same bins as duration_rollup, so step_stats reads no task_steps rows.
+CREATE TABLE IF NOT EXISTS step_rollup (
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    label TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    cnt INTEGER NOT NULL DEFAULT 0,
+    dur_sum INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, label, bin)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS archived_step_rollup (
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    label TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    cnt INTEGER NOT NULL DEFAULT 0,
+    dur_sum INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, type, label, bin)
+) WITHOUT ROWID;
 """
 
+# Columns added after the first release; init_db adds them to older databases.
+MIGRATIONS = [
+    ("tasks",     "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("logs",      "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("scheduled", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("tasks",     "schedule_id", "TEXT"),
+    ("scheduled", "avg_dur_ms", "INTEGER"),
+    ("tasks",     "lease_owner", "TEXT"),
+    ("tasks",     "lease_expires", "INTEGER"),
+    ("task_steps", "started_at", "INTEGER"),
+    ("task_steps", "completed_at", "INTEGER"),
+    ("task_steps", "pinned", "INTEGER NOT NULL DEFAULT 0"),
+    ("sync_state", "resync_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("scheduled", "recurrence_error", "TEXT"),
+]
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_task_steps_task_seq ON task_steps(task_id, seq);
+CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_type_created ON tasks(type, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority_created ON tasks(priority, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_version ON tasks(version);
+CREATE INDEX IF NOT EXISTS idx_logs_version ON logs(version);
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(ts);
+CREATE INDEX IF NOT EXISTS idx_scheduled_version ON scheduled(version);
+CREATE INDEX IF NOT EXISTS idx_logs_task_ts ON logs(task_id, ts);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_priority_created
+    ON tasks(status, priority, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease_expires
+    ON tasks(lease_expires) WHERE lease_expires IS NOT NULL;
+-- rebuild_rollups walks completed steps in time order
+CREATE INDEX IF NOT EXISTS idx_task_steps_completed
+    ON task_steps(completed_at) WHERE started_at IS NOT NULL;
+"""
+
+# Full-text index over log lines. External content (the text lives only in
+# `logs`); triggers keep it in step with inserts and retention deletes.
+LOG_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+    msg, task_name, content='logs', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts (rowid, msg, task_name) VALUES (new.rowid, new.msg, new.task_name);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, msg, task_name)
+    VALUES ('delete', old.rowid, old.msg, old.task_name);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_fts_update AFTER UPDATE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, msg, task_name)
+    VALUES ('delete', old.rowid, old.msg, old.task_name);
+    INSERT INTO logs_fts (rowid, msg, task_name) VALUES (new.rowid, new.msg, new.task_name);
+END;
+"""
+
+# Tag -> task lookup for list_tasks(tag=...), keyed so one tag's tasks come
+# out newest first. Triggers keep it in step with tasks, so every path that
+# inserts, imports, archives or retags a task maintains it.
+TASK_TAGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_tags (
+    tag TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    task_id TEXT NOT NULL,
+    PRIMARY KEY (tag, created_at, task_id)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS task_tags_insert AFTER INSERT ON tasks BEGIN
+    INSERT OR IGNORE INTO task_tags (tag, created_at, task_id)
+    SELECT value, new.created_at, new.id FROM json_each(new.tags_json);
+END;
+CREATE TRIGGER IF NOT EXISTS task_tags_delete AFTER DELETE ON tasks BEGIN
+    DELETE FROM task_tags WHERE tag IN (SELECT value FROM json_each(old.tags_json))
+        AND created_at = old.created_at AND task_id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS task_tags_update AFTER UPDATE OF tags_json ON tasks BEGIN
+    DELETE FROM task_tags WHERE tag IN (SELECT value FROM json_each(old.tags_json))
+        AND created_at = old.created_at AND task_id = old.id;
+    INSERT OR IGNORE INTO task_tags (tag, created_at, task_id)
+    SELECT value, new.created_at, new.id FROM json_each(new.tags_json);
+END;
+"""
+
+# Cold storage for finished tasks, in its own file (see archive_tasks). Each
+# task, steps included, is one zlib-compressed JSON document.
+ARCHIVE_PATH = os.getenv("CLAWD_ARCHIVE_PATH")  # default: <DB_PATH stem>-archive.db
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_tasks (
+    id TEXT PRIMARY KEY,
+    created_at INTEGER NOT NULL,
+    completed_at INTEGER,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archived_created ON archived_tasks(created_at, id);
+"""
+
+# False when this SQLite build lacks FTS5; log search is then unavailable.
+LOG_SEARCH_ENABLED = True
+
+
+# Applied once when a connection is opened, not on every call.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # safe with WAL; fsync only at checkpoints
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",      # 16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",    # 256 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+STATEMENT_CACHE = 256
+
+_local = threading.local()
+
+
+def _connect(path=None):
+    DB_CONNECTIONS.inc()
+    conn = sqlite3.connect(path or DB_PATH, cached_statements=STATEMENT_CACHE)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_conn():
+    """Return this thread's connection, opening it on first use.
+
+    Connections are kept per thread (FastAPI's threadpool reuses its
+    threads), so pragmas run once and sqlite3's statement cache stays warm.
+    `with get_conn() as conn:` commits or rolls back; it never closes.
+    Request threads only read through it; writes go through `writer`.
+    """
+    key = (DB_PATH, os.getpid())
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.key != key:
+        if conn is not None:
+            conn.close()
+        conn = _local.conn = _connect()
+        _local.key = key
     return conn
 
 
+def archive_path():
+    return ARCHIVE_PATH or os.path.splitext(DB_PATH)[0] + "-archive.db"
+
+
+def get_archive_conn():
+    """This thread's connection to the archive database, like get_conn()."""
+    key = (archive_path(), os.getpid())
+    conn = getattr(_local, "archive", None)
+    if conn is None or _local.archive_key != key:
+        if conn is not None:
+            conn.close()
+        conn = _local.archive = _connect(key[0])
+        conn.executescript(ARCHIVE_SCHEMA)
+        _local.archive_key = key
+    return conn
+
+
+def close_conn():
+    """Close this thread's connections, if any."""
+    for attr in ("conn", "archive"):
+        conn = getattr(_local, attr, None)
+        if conn is not None:
+            conn.close()
+            setattr(_local, attr, None)
+
+
+# ── Instrumentation ───────────────────────────────────────
+
+DB_CALL_SECONDS = metrics.Histogram("clawd_db_call_seconds", "Time spent in database functions",
+                                    ("function",))
+DB_WRITE_WAIT_SECONDS = metrics.Histogram(
+    "clawd_db_write_wait_seconds",
+    "Time to start a write transaction (mostly waiting for SQLite's write lock)")
+DB_WRITE_GROUP = metrics.Histogram("clawd_db_write_group_size", "Writes committed together",
+                                   buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+DB_LOCKED = metrics.Counter("clawd_db_locked_total",
+                            "Calls that failed because the database stayed locked",
+                            ("function",))
+DB_CONNECTIONS = metrics.Counter("clawd_db_connections_opened_total", "SQLite connections opened")
+
+
+def timed(fn):
+    """Record the call's duration, and lock timeouts, under its name."""
+    name = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                DB_LOCKED.inc(name)
+            raise
+        finally:
+            DB_CALL_SECONDS.observe(time.perf_counter() - t0, name)
+    return wrapper
+
+
+COUNTED_TABLES = ("tasks", "task_steps", "task_tags", "logs", "scheduled", "task_rollup",
+                  "duration_rollup", "step_rollup")
+
+
+@timed
+def table_counts():
+    with get_conn() as conn:
+        return {(t,): conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                for t in COUNTED_TABLES}
+
+
 def init_db():
     with get_conn() as conn:
         conn.executescript(SCHEMA)
+        for table, column, ddl in MIGRATIONS:
+            existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        conn.executescript(INDEXES)
+        _init_task_tags(conn)
+        _init_log_search(conn)
+        # Rollup tables added after tasks were already recorded start empty.
+        if conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() and (
+                not conn.execute("SELECT 1 FROM task_rollup LIMIT 1").fetchone()
+                or not conn.execute("SELECT 1 FROM duration_rollup LIMIT 1").fetchone()
+                or not conn.execute("SELECT 1 FROM step_rollup LIMIT 1").fetchone()
+                and conn.execute(f"SELECT 1 FROM {STEP_DURATIONS_SQL} LIMIT 1").fetchone()):
+            _rebuild_rollups(conn)
+
+
+def _init_task_tags(conn):
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'task_tags'"
+    ).fetchone()
+    conn.executescript(TASK_TAGS_SCHEMA)
+    if not existed:
+        conn.execute(
+            """INSERT OR IGNORE INTO task_tags (tag, created_at, task_id)
+               SELECT j.value, t.created_at, t.id FROM tasks t, json_each(t.tags_json) j"""
+        )
+
+
+def _init_log_search(conn):
+    global LOG_SEARCH_ENABLED
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'logs_fts'"
+    ).fetchone()
+    try:
+        conn.executescript(LOG_SEARCH_SCHEMA)
+    except sqlite3.OperationalError:
+        LOG_SEARCH_ENABLED = False
+        return
+    if not existed:
+        conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
 
 
 def now_ms():
     return int(time.time() * 1000)
 
 
+# ── Change version ────────────────────────────────────────
+# Every write bumps a single counter and stamps the rows it touched, so
+# readers can ask for "everything after version N".
+
+def _bump_version(conn):
+    conn.execute("UPDATE sync_state SET version = version + 1 WHERE id = 1")
+    return conn.execute("SELECT version FROM sync_state WHERE id = 1").fetchone()[0]
+
+
+@timed
+def get_version():
+    with get_conn() as conn:
+        return conn.execute("SELECT version FROM sync_state WHERE id = 1").fetchone()[0]
+
+
+# ── Writer ────────────────────────────────────────────────
+# All writes in a process run on one thread. Calls queue up while the
+# current group commits and then go in together: one BEGIN IMMEDIATE ...
+# COMMIT for the group, each call in its own savepoint so a failing call
+# only undoes itself. Request threads keep their own connections for
+# reads, which WAL never blocks.
+#
+# The writer, like the SSE hub, the progress buffer and admission limits,
+# is per process, and the API supports exactly one process (the Procfile
+# pins --workers 1). A second process writing the same file still works,
+# since SQLite serializes the writers, but its writes never reach the first
+# process's streams. Jobs should stay short, because the group behind a
+# job waits for it. Bulk work is split into bounded calls.
+
+WRITE_GROUP_MAX = 256
+WRITE_JOB_ROWS = 100  # bulk writes (archive, import) go in calls of this many rows
+
+
+class Rollback(Exception):
+    """Raised by a write to undo its own changes and return `value`."""
+
+    def __init__(self, value=None):
+        super().__init__()
+        self.value = value
+
+
+class _Job:
+    __slots__ = ("fn", "done", "result", "error")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = self.error = None
+
+
+class Writer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def run(self, fn):
+        """Run fn(conn) in the next group commit and return its result."""
+        if threading.current_thread() is self._thread:
+            return fn(get_conn())  # a write calling another write
+        job = _Job(fn)
+        self._jobs().put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _jobs(self):
+        with self._lock:
+            if self._pid != os.getpid():  # first use, or forked
+                self._pid = os.getpid()
+                self._queue = queue.SimpleQueue()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name="clawd-writer", daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _run(self, jobs):
+        while True:
+            group = [jobs.get()]
+            while len(group) < WRITE_GROUP_MAX:
+                try:
+                    group.append(jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(group)
+            for job in group:
+                job.done.set()
+
+    def _commit(self, group):
+        DB_WRITE_GROUP.observe(len(group))
+        conn = None
+        try:
+            conn = get_conn()
+            t0 = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            DB_WRITE_WAIT_SECONDS.observe(time.perf_counter() - t0)
+            for job in group:
+                conn.execute("SAVEPOINT job")
+                try:
+                    job.result = job.fn(conn)
+                except Rollback as r:
+                    conn.execute("ROLLBACK TO job")
+                    job.result = r.value
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    job.error = e
+                conn.execute("RELEASE job")
+            conn.commit()
+        except Exception as e:
+            # BEGIN or COMMIT failed (e.g. still locked after busy_timeout):
+            # nothing in the group was written.
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            for job in group:
+                job.result, job.error = None, e
+
+
+writer = Writer()
+
+
+def _versioned(op, *args):
+    """Run op(conn, version, *args) as one write; returns the new version."""
+    def write(conn):
+        version = _bump_version(conn)
+        op(conn, version, *args)
+        return version
+    return writer.run(write)
+
+
 # ── Tasks ────────────────────────────────────────────────
 
-def create_task(task_id, name, type_, subtype, steps, tags, priority, eta):
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class LeaseLost(ValueError):
+    """A worker tried to change a task whose lease it no longer holds."""
+
+
+def _insert_task(conn, version, task_id, name, type_, subtype, steps, tags, priority, eta,
+                 schedule_id=None):
     created = now_ms()
-    with get_conn() as conn:
-        conn.execute(
-            """INSERT INTO tasks (id, name, type, subtype, status, priority, progress,
-               current_step, step_idx, eta, tags_json, created_at)
-               VALUES (?, ?, ?, ?, 'pending', ?, 0, ?, 0, ?, ?, ?)""",
-            (task_id, name, type_, subtype, priority,
-             steps[0] if steps else None, eta, json.dumps(tags), created)
-        )
-        for i, label in enumerate(steps):
-            conn.execute(
-                "INSERT INTO task_steps (task_id, label, status, seq) VALUES (?, ?, 'pending', ?)",
-                (task_id, label, i)
-            )
+    conn.execute(
+        """INSERT INTO tasks (id, name, type, subtype, status, priority, progress,
+           current_step, step_idx, eta, tags_json, created_at, version, schedule_id)
+           VALUES (?, ?, ?, ?, 'pending', ?, 0, ?, 0, ?, ?, ?, ?, ?)""",
+        (task_id, name, type_, subtype, priority,
+         steps[0] if steps else None, eta, json.dumps(tags), created, version, schedule_id)
+    )
+    conn.executemany(
+        "INSERT INTO task_steps (task_id, label, status, seq) VALUES (?, ?, 'pending', ?)",
+        [(task_id, label, i) for i, label in enumerate(steps)]
+    )
+    _add_to_rollup(conn, (created, type_, "pending", None, None, None), 1)
+    return True
 
 
-def update_task(task_id, fields: dict):
-    if not fields:
-        return
+@timed
+def create_task(task_id, name, type_, subtype, steps, tags, priority, eta):
+    return _versioned(_insert_task, task_id, name, type_, subtype, steps, tags, priority, eta)
+
+
+def _update_task(conn, version, task_id, fields, worker=None):
+    """Apply `fields` to a task; returns False if the task doesn't exist.
+    With `worker`, raises LeaseLost unless that worker holds its lease."""
     # Auto-set timestamps
     if fields.get("status") == "running":
         fields.setdefault("started_at", now_ms())
-    if fields.get("status") in ("completed", "failed", "cancelled"):
+    if fields.get("status") in TERMINAL_STATUSES:
         fields.setdefault("completed_at", now_ms())
+    # Any status change (cancel, retry, completion...) ends the task's
+    # lease, unless it's the lease being granted.
+    if "status" in fields:
+        row = conn.execute("SELECT status FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row and row[0] != fields["status"]:
+            fields.setdefault("lease_owner", None)
+            fields.setdefault("lease_expires", None)
+
+    cols = ", ".join([f"{k} = ?" for k in fields] + ["version = ?"])
+    vals = list(fields.values()) + [version, task_id]
+    where = "id = ?"
+    if worker is not None:
+        where += " AND status = 'running' AND lease_owner = ?"
+        vals.append(worker)
+    touches_steps = "step_idx" in fields or "status" in fields
+    touches_rollup = not ROLLUP_FIELDS.isdisjoint(fields)
+    if touches_rollup:
+        old = conn.execute(ROLLUP_ROW_SQL, (task_id,)).fetchone()
+    cur = conn.execute(f"UPDATE tasks SET {cols} WHERE {where}", vals)
+    if worker is not None and not cur.rowcount and _task_exists(conn, task_id):
+        raise LeaseLost("Lease not held by this worker")
+    if touches_rollup and old:
+        new = conn.execute(ROLLUP_ROW_SQL, (task_id,)).fetchone()
+        if _rollup_key(old) != _rollup_key(new):
+            _add_to_rollup(conn, old, -1)
+            _add_to_rollup(conn, new, 1)
+        if new[2] != old[2] and new[2] in TERMINAL_STATUSES:
+            _record_scheduled_run(conn, version, task_id, new[2], _rollup_key(new)[4])
+    if touches_steps and cur.rowcount:
+        _sync_steps(conn, task_id)
+    return cur.rowcount > 0
+
+
+@timed
+def update_task(task_id, fields: dict, worker=None):
+    if not fields:
+        return
+    return _versioned(_update_task, task_id, fields, worker)
+
+
+@timed
+def flush_progress(updates):
+    """Apply buffered {task_id: fields} in one transaction, skipping tasks
+    that have finished since the fields were buffered. Returns the version."""
+    def write(conn, version):
+        for task_id, fields in updates.items():
+            row = conn.execute("SELECT status FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row and row[0] not in TERMINAL_STATUSES:
+                _update_task(conn, version, task_id, dict(fields))
+    return _versioned(write)
+
+
+# ── Steps ────────────────────────────────────────────────
+# step_idx is the step in progress: earlier steps are completed, later ones
+# pending, and the current one follows the task's status. Steps set through
+# update_step are pinned: they keep their status until the task goes back to
+# pending. A completed task's steps that never started are skipped.
+
+STEP_STATUSES = ("pending", "running", "waiting", "completed", "failed", "skipped")
+STEP_STATUS_FOR_TASK = {
+    "pending":       "pending",
+    "running":       "running",
+    "waiting_input": "waiting",
+    "failed":        "failed",
+    "cancelled":     "pending",
+}
+
+# Moves steps to their target status (an SQL expression, so one statement
+# can handle every step of a task); skips steps already there so their
+# timestamps survive repeated updates.
+STEP_UPDATE_SQL = """UPDATE task_steps SET
+    started_at = CASE {target}
+        WHEN 'pending' THEN NULL
+        WHEN 'running' THEN CASE WHEN status = 'waiting' THEN started_at ELSE :now END
+        WHEN 'waiting' THEN COALESCE(started_at, :now)
+        ELSE started_at END,
+    completed_at = CASE WHEN {target} IN ('completed', 'failed') THEN :now END,
+    status = {target}
+    WHERE task_id = :task_id{where} AND status != {target}"""
+
+STEP_TARGET_FROM_IDX = """(CASE WHEN seq < :idx THEN 'completed'
+                                WHEN seq = :idx THEN :current ELSE 'pending' END)"""
+STEP_TARGET_DONE = """(CASE WHEN seq < :idx OR started_at IS NOT NULL THEN 'completed'
+                            ELSE 'skipped' END)"""
+
+
+def _sync_steps(conn, task_id):
+    """Bring step statuses in line with the task's step_idx and status."""
+    idx, status, type_ = conn.execute(
+        "SELECT step_idx, status, type FROM tasks WHERE id = ?", (task_id,)
+    ).fetchone()
+    target, current = STEP_TARGET_FROM_IDX, STEP_STATUS_FOR_TASK.get(status)
+    if status == "completed":
+        target = STEP_TARGET_DONE
+    elif current is None:
+        return  # a status we don't know how to map; leave steps alone
+    elif status == "pending":  # starting over
+        conn.execute("UPDATE task_steps SET pinned = 0 WHERE task_id = ? AND pinned",
+                     (task_id,))
+    before = _step_durations(conn, task_id)
+    conn.execute(STEP_UPDATE_SQL.format(target=target, where=" AND NOT pinned"),
+                 {"task_id": task_id, "idx": idx, "current": current, "now": now_ms()})
+    _update_step_rollup(conn, task_id, type_, before)
+
 
-    cols = ", ".join(f"{k} = ?" for k in fields)
-    vals = list(fields.values()) + [task_id]
+def _update_step(conn, version, task_id, seq, status, label=None):
+    """Set one step's status (and optionally its label) directly, pinning
+    it so task updates leave it alone until the task starts over."""
+    row = conn.execute(
+        """SELECT t.type FROM task_steps s JOIN tasks t ON t.id = s.task_id
+           WHERE s.task_id = ? AND s.seq = ?""", (task_id, seq)
+    ).fetchone()
+    if not row:
+        return False
+    before = _step_durations(conn, task_id)
+    conn.execute(
+        """UPDATE task_steps SET pinned = 1, label = COALESCE(?, label)
+           WHERE task_id = ? AND seq = ?""", (label, task_id, seq)
+    )
+    conn.execute(STEP_UPDATE_SQL.format(target=":status", where=" AND seq = :seq"),
+                 {"task_id": task_id, "seq": seq, "status": status, "now": now_ms()})
+    _update_step_rollup(conn, task_id, row[0], before)
+    conn.execute("UPDATE tasks SET version = ? WHERE id = ?", (version, task_id))
+    return True
+
+
+@timed
+def update_step(task_id, seq, status, label=None):
+    """Returns the change version, or None if the task has no such step."""
+    def write(conn):
+        version = _bump_version(conn)
+        if not _update_step(conn, version, task_id, seq, status, label):
+            raise Rollback(None)
+        return version
+    return writer.run(write)
+
+
+@timed
+def step_stats(type_=None, since=None, limit=50):
+    """Durations of completed steps finished after `since` (to the day),
+    grouped by task type and step label: runs, mean, p50/p95/max and total
+    time, read from step_rollup. Percentiles and max are bin midpoints, so
+    within ~5%. The steps that cost the most time overall come first."""
+    since = since or 0
+    where, args = ["bucket >= ?"], [since - since % STEP_BUCKET_MS]
+    if type_:
+        where.append("type = ?")
+        args.append(type_)
     with get_conn() as conn:
-        conn.execute(f"UPDATE tasks SET {cols} WHERE id = ?", vals)
+        rows = conn.execute(
+            f"""SELECT type, label, bin, SUM(cnt), SUM(dur_sum) FROM step_rollup
+                WHERE {" AND ".join(where)}
+                GROUP BY type, label, bin HAVING SUM(cnt) > 0
+                ORDER BY type, label, bin""",
+            args
+        ).fetchall()
+
+    groups = {}
+    for type_, label, bin_, cnt, dur_sum in rows:
+        g = groups.setdefault((type_, label), {"bins": [], "total": 0})
+        g["bins"].append((bin_, cnt))
+        g["total"] += dur_sum
+    stats = []
+    for (type_, label), g in groups.items():
+        runs = sum(c for _, c in g["bins"])
+        stats.append({
+            "type":     type_,
+            "label":    label,
+            "runs":     runs,
+            "avg_ms":   round(g["total"] / runs),
+            "p50_ms":   _weighted_percentile(g["bins"], 0.5),
+            "p95_ms":   _weighted_percentile(g["bins"], 0.95),
+            "max_ms":   dur_bin_value(g["bins"][-1][0]),
+            "total_ms": g["total"],
+        })
+    stats.sort(key=lambda s: s["total_ms"], reverse=True)
+    return stats[:limit]
+
+
+# ── Analytics rollups ─────────────────────────────────────
+
+ROLLUP_BUCKET_MS = 3600 * 1000
+STEP_BUCKET_MS = 24 * ROLLUP_BUCKET_MS  # step_stats windows are whole days
+ROLLUP_FIELDS = {"status", "error_code", "started_at", "completed_at"}
+DUR_GAMMA = 1.1  # duration bins are 10% wide, so percentiles are within ~5%
+ROLLUP_ROW_SQL = """SELECT created_at, type, status, error_code, started_at, completed_at
+                    FROM tasks WHERE id = ?"""
+
+
+def _rollup_key(row):
+    created, type_, status, error_code, started, completed = row
+    dur = None
+    if status == "completed" and started is not None and completed is not None:
+        dur = completed - started
+    return (created - created % ROLLUP_BUCKET_MS, type_, status, error_code or "", dur)
+
+
+def dur_bin(ms):
+    """Log-scale duration bin: bin i holds [DUR_GAMMA**i, DUR_GAMMA**(i+1)) ms."""
+    return int(math.log(max(ms, 1), DUR_GAMMA))
+
+
+def dur_bin_value(i):
+    """The bin's geometric midpoint, within sqrt(DUR_GAMMA) - 1 of any value in it."""
+    return round(DUR_GAMMA ** (i + 0.5))
+
+
+def _add_to_rollup(conn, row, sign, archived=False):
+    """Add (sign=1) or remove (sign=-1) one task's contribution; with
+    `archived`, to the archived_* tables instead."""
+    counts, durations = (("archived_rollup", "archived_duration_rollup") if archived
+                         else ("task_rollup", "duration_rollup"))
+    bucket, type_, status, error_code, dur = _rollup_key(row)
+    conn.execute(
+        f"""INSERT INTO {counts} (bucket, type, status, error_code, cnt, dur_sum, dur_cnt)
+           VALUES (?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(bucket, type, status, error_code) DO UPDATE SET
+             cnt = cnt + excluded.cnt,
+             dur_sum = dur_sum + excluded.dur_sum,
+             dur_cnt = dur_cnt + excluded.dur_cnt""",
+        (bucket, type_, status, error_code, sign,
+         sign * dur if dur is not None else 0, sign if dur is not None else 0)
+    )
+    if dur is not None:
+        conn.execute(
+            f"""INSERT INTO {durations} (bucket, type, status, error_code, bin, cnt)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(bucket, type, status, error_code, bin) DO UPDATE SET
+                 cnt = cnt + excluded.cnt""",
+            (bucket, type_, status, error_code, dur_bin(dur), sign)
+        )
+
+
+STEP_DURATION_ROWS_SQL = """SELECT seq, label, completed_at, completed_at - started_at
+                            FROM task_steps WHERE task_id = ? AND status = 'completed'
+                            AND started_at IS NOT NULL AND completed_at IS NOT NULL"""
+
+
+def _step_durations(conn, task_id):
+    """The task's step_rollup contributions, to diff around a step update."""
+    return {tuple(r) for r in conn.execute(STEP_DURATION_ROWS_SQL, (task_id,))}
+
 
+def _add_steps_to_rollup(conn, type_, steps, sign, archived=False):
+    """Add or remove (label, completed_at, duration) step contributions."""
+    conn.executemany(
+        f"""INSERT INTO {"archived_step_rollup" if archived else "step_rollup"}
+               (bucket, type, label, bin, cnt, dur_sum)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(bucket, type, label, bin) DO UPDATE SET
+             cnt = cnt + excluded.cnt,
+             dur_sum = dur_sum + excluded.dur_sum""",
+        [(completed - completed % STEP_BUCKET_MS, type_, label, dur_bin(dur), sign, sign * dur)
+         for label, completed, dur in steps]
+    )
 
+
+def _update_step_rollup(conn, task_id, type_, before):
+    after = _step_durations(conn, task_id)
+    if after != before:
+        _add_steps_to_rollup(conn, type_, [r[1:] for r in before - after], -1)
+        _add_steps_to_rollup(conn, type_, [r[1:] for r in after - before], 1)
+
+
+DURATIONS_SQL = """(SELECT *, CASE WHEN status = 'completed' AND started_at IS NOT NULL
+                                    AND completed_at IS NOT NULL
+                                   THEN completed_at - started_at END AS dur
+                    FROM tasks)"""
+
+
+STEP_DURATIONS_SQL = """(SELECT t.type, s.label, s.completed_at,
+                                s.completed_at - s.started_at AS dur
+                         FROM task_steps s JOIN tasks t ON t.id = s.task_id
+                         WHERE s.status = 'completed' AND s.started_at IS NOT NULL
+                           AND s.completed_at IS NOT NULL)"""
+
+
+ROLLUP_REBUILD_ROWS = 2000  # rows per rebuild_rollups writer call
+
+
+def _rebuild_task_rollups(conn, lo, hi):
+    """Recompute task_rollup and duration_rollup for buckets in [lo, hi)."""
+    conn.create_function("dur_bin", 1, dur_bin, deterministic=True)
+    conn.execute("DELETE FROM task_rollup WHERE bucket >= ? AND bucket < ?", (lo, hi))
+    conn.execute(
+        f"""INSERT INTO task_rollup (bucket, type, status, error_code, cnt, dur_sum, dur_cnt)
+           SELECT created_at - created_at % ?, type, status, COALESCE(error_code, ''),
+                  COUNT(*), COALESCE(SUM(dur), 0), COUNT(dur)
+           FROM {DURATIONS_SQL} WHERE created_at >= ? AND created_at < ?
+           GROUP BY 1, 2, 3, 4""",
+        (ROLLUP_BUCKET_MS, lo, hi)
+    )
+    conn.execute(
+        """INSERT INTO task_rollup (bucket, type, status, error_code, cnt, dur_sum, dur_cnt)
+           SELECT * FROM archived_rollup WHERE bucket >= ? AND bucket < ?
+           ON CONFLICT(bucket, type, status, error_code) DO UPDATE SET
+             cnt = cnt + excluded.cnt,
+             dur_sum = dur_sum + excluded.dur_sum,
+             dur_cnt = dur_cnt + excluded.dur_cnt""",
+        (lo, hi)
+    )
+    conn.execute("DELETE FROM duration_rollup WHERE bucket >= ? AND bucket < ?", (lo, hi))
+    conn.execute(
+        f"""INSERT INTO duration_rollup (bucket, type, status, error_code, bin, cnt)
+           SELECT created_at - created_at % ?, type, status, COALESCE(error_code, ''),
+                  dur_bin(dur), COUNT(*)
+           FROM {DURATIONS_SQL} WHERE dur IS NOT NULL AND created_at >= ? AND created_at < ?
+           GROUP BY 1, 2, 3, 4, 5""",
+        (ROLLUP_BUCKET_MS, lo, hi)
+    )
+    conn.execute(
+        """INSERT INTO duration_rollup (bucket, type, status, error_code, bin, cnt)
+           SELECT * FROM archived_duration_rollup WHERE bucket >= ? AND bucket < ?
+           ON CONFLICT(bucket, type, status, error_code, bin) DO UPDATE SET
+             cnt = cnt + excluded.cnt""",
+        (lo, hi)
+    )
+
+
+def _rebuild_step_rollup(conn, lo, hi):
+    """Recompute step_rollup for buckets in [lo, hi)."""
+    conn.create_function("dur_bin", 1, dur_bin, deterministic=True)
+    conn.execute("DELETE FROM step_rollup WHERE bucket >= ? AND bucket < ?", (lo, hi))
+    conn.execute(
+        f"""INSERT INTO step_rollup (bucket, type, label, bin, cnt, dur_sum)
+           SELECT completed_at - completed_at % ?, type, label, dur_bin(dur),
+                  COUNT(*), SUM(dur)
+           FROM {STEP_DURATIONS_SQL} WHERE completed_at >= ? AND completed_at < ?
+           GROUP BY 1, 2, 3, 4""",
+        (STEP_BUCKET_MS, lo, hi)
+    )
+    conn.execute(
+        """INSERT INTO step_rollup (bucket, type, label, bin, cnt, dur_sum)
+           SELECT * FROM archived_step_rollup WHERE bucket >= ? AND bucket < ?
+           ON CONFLICT(bucket, type, label, bin) DO UPDATE SET
+             cnt = cnt + excluded.cnt,
+             dur_sum = dur_sum + excluded.dur_sum""",
+        (lo, hi)
+    )
+
+
+# (rebuild, bucket width, query for the key ROLLUP_REBUILD_ROWS rows past a
+# bound). Ranges are whole buckets, and the incremental updates keep a
+# rebuilt range exact, so the ranges can be rebuilt one writer call at a time.
+ROLLUP_PARTS = (
+    (_rebuild_task_rollups, ROLLUP_BUCKET_MS,
+     "SELECT created_at FROM tasks WHERE created_at >= ? ORDER BY created_at LIMIT 1 OFFSET ?"),
+    (_rebuild_step_rollup, STEP_BUCKET_MS,
+     """SELECT completed_at FROM task_steps WHERE completed_at >= ? AND started_at IS NOT NULL
+        ORDER BY completed_at LIMIT 1 OFFSET ?"""),
+)
+
+
+def _rebuild_rollup_range(conn, part, lo):
+    """Rebuild about ROLLUP_REBUILD_ROWS rows' worth of buckets from `lo`;
+    returns where to carry on, or None once the rest has been rebuilt."""
+    rebuild, bucket_ms, next_sql = part
+    row = conn.execute(next_sql, (lo, ROLLUP_REBUILD_ROWS)).fetchone()
+    hi = row[0] - row[0] % bucket_ms + bucket_ms if row else None
+    rebuild(conn, lo, 1 << 62 if hi is None else hi)
+    return hi
+
+
+def _rebuild_rollups(conn):
+    for part in ROLLUP_PARTS:
+        lo = 0
+        while lo is not None:
+            lo = _rebuild_rollup_range(conn, part, lo)
+
+
+@timed
+def rebuild_rollups():
+    """Recompute the rollups from the tasks table (after bulk loads),
+    keeping archived tasks' counts. Runs as many short writes, so other
+    writes go on in between."""
+    for part in ROLLUP_PARTS:
+        lo = 0
+        while lo is not None:
+            lo = writer.run(lambda conn, lo=lo: _rebuild_rollup_range(conn, part, lo))
+
+
+def _row_to_task(row):
+    task = dict(row)
+    task["tags"] = json.loads(task.pop("tags_json", "[]"))
+    task["steps"] = []
+    return task
+
+
+def _attach_steps(conn, tasks, all_tasks=False):
+    """Fill in task["steps"] for every task with a single query.
+
+    When `all_tasks` is set the whole step table is read; otherwise the ids
+    are passed as one JSON array so the query stays a single statement no
+    matter how many tasks are involved.
+    """
+    if not tasks:
+        return tasks
+    by_id = {t["id"]: t["steps"] for t in tasks}
+    if all_tasks:
+        rows = conn.execute(
+            """SELECT task_id, label, status, started_at, completed_at FROM task_steps
+               ORDER BY task_id, seq"""
+        )
+    else:
+        rows = conn.execute(
+            """SELECT task_id, label, status, started_at, completed_at FROM task_steps
+               WHERE task_id IN (SELECT value FROM json_each(?))
+               ORDER BY task_id, seq""",
+            (json.dumps(list(by_id)),)
+        )
+    for task_id, label, status, started_at, completed_at in rows:
+        steps = by_id.get(task_id)
+        if steps is not None:
+            steps.append({"label": label, "status": status,
+                          "started_at": started_at, "completed_at": completed_at})
+    return tasks
+
+
+def _task_exists(conn, task_id):
+    return conn.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone() is not None
+
+
+@timed
+def task_exists(task_id):
+    with get_conn() as conn:
+        return _task_exists(conn, task_id)
+
+
+@timed
 def get_task(task_id):
     with get_conn() as conn:
         row = conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
         if not row:
             return None
-        task = dict(row)
-        task["tags"] = json.loads(task.pop("tags_json", "[]"))
-        task["steps"] = [
-            dict(s) for s in conn.execute(
-                "SELECT label, status FROM task_steps WHERE task_id = ? ORDER BY seq", (task_id,)
-            ).fetchall()
-        ]
-        return task
+        return _attach_steps(conn, [_row_to_task(row)])[0]
 
 
+@timed
+def get_tasks(task_ids):
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT * FROM tasks WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(task_ids)),)
+        ).fetchall()
+        return _attach_steps(conn, [_row_to_task(r) for r in rows])
+
+
+@timed
 def get_all_tasks():
     with get_conn() as conn:
         rows = conn.execute("SELECT * FROM tasks ORDER BY created_at DESC").fetchall()
-        tasks = []
-        for row in rows:
-            task = dict(row)
-            task["tags"] = json.loads(task.pop("tags_json", "[]"))
-            task["steps"] = [
-                dict(s) for s in conn.execute(
-                    "SELECT label, status FROM task_steps WHERE task_id = ? ORDER BY seq",
-                    (task["id"],)
-                ).fetchall()
-            ]
-            tasks.append(task)
-        return tasks
+        return _attach_steps(conn, [_row_to_task(r) for r in rows], all_tasks=True)
 
 
-# ── Logs ─────────────────────────────────────────────────
+ACTIVE_STATUSES = ("pending", "running", "waiting_input")
+STATE_ACTIVE_LIMIT = 200
+STATE_RECENT_LIMIT = 100
 
-LOG_CAP = 500
 
-def append_log(log_id, level, task_id, task_name, msg):
-    ts = now_ms()
+@timed
+def get_state_tasks(active_limit=STATE_ACTIVE_LIMIT, recent_limit=STATE_RECENT_LIMIT):
+    """Bounded window for /api/state: active tasks plus the latest finished ones."""
+    marks = ", ".join("?" * len(ACTIVE_STATUSES))
+    with get_conn() as conn:
+        active = conn.execute(
+            f"""SELECT * FROM tasks WHERE status IN ({marks})
+                ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (*ACTIVE_STATUSES, active_limit)
+        ).fetchall()
+        recent = conn.execute(
+            f"""SELECT * FROM tasks WHERE status NOT IN ({marks})
+                ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (*ACTIVE_STATUSES, recent_limit)
+        ).fetchall()
+        rows = sorted(active + recent, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        return _attach_steps(conn, [_row_to_task(r) for r in rows])
+
+
+def encode_cursor(task):
+    return f"{task['created_at']}:{task['id']}"
+
+
+def decode_cursor(cursor):
+    created, sep, task_id = cursor.partition(":")
+    if not sep or not task_id or not created.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return int(created), task_id
+
+
+@timed
+def list_tasks(status=None, type_=None, priority=None, tag=None, cursor=None, limit=50):
+    """Keyset-paginated task listing, newest first.
+
+    Returns (tasks, next_cursor); next_cursor is None on the last page.
+    """
+    where, args = [], []
+    # With a tag, walk that tag's task_tags entries newest first and look
+    # each task up, so the page stops after `limit` matches.
+    sql, created_col, id_col = "SELECT * FROM tasks", "created_at", "id"
+    if tag:
+        sql = "SELECT tasks.* FROM task_tags JOIN tasks ON tasks.id = task_tags.task_id"
+        created_col, id_col = "task_tags.created_at", "task_tags.task_id"
+        where.append("task_tags.tag = ?")
+        args.append(tag)
+    if status:
+        where.append("status = ?")
+        args.append(status)
+    if type_:
+        where.append("type = ?")
+        args.append(type_)
+    if priority:
+        where.append("priority = ?")
+        args.append(priority)
+    if cursor:
+        created, task_id = decode_cursor(cursor)
+        where.append(f"({created_col}, {id_col}) < (?, ?)")
+        args += [created, task_id]
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {created_col} DESC, {id_col} DESC LIMIT ?"
+    args.append(limit + 1)
+
     with get_conn() as conn:
+        rows = conn.execute(sql, args).fetchall()
+        tasks = _attach_steps(conn, [_row_to_task(r) for r in rows[:limit]])
+    next_cursor = encode_cursor(tasks[-1]) if len(rows) > limit else None
+    return tasks, next_cursor
+
+
+# ── Work queue ────────────────────────────────────────────
+# Workers lease pending tasks: a lease moves the task to `running`, owned
+# by the worker until lease_expires. Heartbeats extend it; expired leases
+# go back to `pending` on the next lease call, or fail the task once it
+# has been re-queued LEASE_MAX_RETRIES times.
+
+LEASE_PRIORITIES = ("critical", "high", "medium", "low")
+LEASE_MAX_RETRIES = int(os.getenv("LEASE_MAX_RETRIES", "3"))
+
+
+def _requeue_expired(conn, version, now):
+    # `+status` keeps the planner on the lease_expires index rather than
+    # scanning every running task through the status index.
+    rows = conn.execute(
+        "SELECT id, retry_count FROM tasks WHERE lease_expires < ? AND +status = 'running'", (now,)
+    ).fetchall()
+    for task_id, retry_count in rows:
+        if retry_count < LEASE_MAX_RETRIES:
+            fields = {"status": "pending", "lease_owner": None, "retry_count": retry_count + 1,
+                      "started_at": None, "progress": 0}
+        else:
+            fields = {"status": "failed", "error_code": "LEASE_EXPIRED",
+                      "error_message": "Worker stopped heartbeating"}
+        _update_task(conn, version, task_id, fields)
+    return [r[0] for r in rows]
+
+
+@timed
+def requeue_expired_leases():
+    """Re-queue (or fail) running tasks whose lease has run out, without
+    waiting for the next lease call. Returns (version, task_ids); version
+    is None if there were none."""
+    now = now_ms()
+    with get_conn() as conn:
+        if not conn.execute(
+            "SELECT 1 FROM tasks WHERE lease_expires < ? AND +status = 'running' LIMIT 1", (now,)
+        ).fetchone():
+            return None, []
+
+    def write(conn):
+        version = _bump_version(conn)
+        ids = _requeue_expired(conn, version, now)
+        if not ids:
+            raise Rollback((None, []))
+        return version, ids
+    return writer.run(write)
+
+
+@timed
+def lease_tasks(worker, types=None, limit=1, lease_ms=60_000):
+    """Claim up to `limit` pending tasks for `worker`: highest priority
+    first, oldest first within a priority, optionally only of `types`.
+
+    Runs in one write transaction, so concurrent callers never get the same
+    task. Returns (version, leased_tasks, requeued_ids); version is None if
+    nothing changed.
+    """
+    now = now_ms()
+    type_filter, type_args = "", []
+    if types:
+        type_filter = f" AND type IN ({', '.join('?' * len(types))})"
+        type_args = list(types)
+    marks = ", ".join("?" * len(LEASE_PRIORITIES))
+
+    def write(conn):
+        version = _bump_version(conn)
+        requeued = _requeue_expired(conn, version, now)
+        ids = []
+        # One index range per priority; unknown priorities come last.
+        for prio in (*LEASE_PRIORITIES, None):
+            if prio:
+                where, args = "priority = ?", [prio]
+            else:
+                where, args = f"priority NOT IN ({marks})", list(LEASE_PRIORITIES)
+            rows = conn.execute(
+                f"""SELECT id FROM tasks WHERE status = 'pending' AND {where}{type_filter}
+                    ORDER BY created_at, id LIMIT ?""",
+                (*args, *type_args, limit - len(ids))
+            ).fetchall()
+            ids += [r[0] for r in rows]
+            if len(ids) >= limit:
+                break
+        if not ids and not requeued:
+            raise Rollback((None, [], []))
+        for task_id in ids:
+            _update_task(conn, version, task_id, {
+                "status": "running", "lease_owner": worker, "lease_expires": now + lease_ms,
+            })
+        rows = conn.execute(
+            "SELECT * FROM tasks WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),)
+        ).fetchall()
+        order = {task_id: i for i, task_id in enumerate(ids)}
+        tasks = sorted((_row_to_task(r) for r in rows), key=lambda t: order[t["id"]])
+        return version, _attach_steps(conn, tasks), requeued
+    return writer.run(write)
+
+
+@timed
+def heartbeat_task(task_id, worker, lease_ms=60_000):
+    """Extend `worker`'s lease on a task. Returns the new expiry, or None
+    if the worker no longer holds the lease."""
+    expires = now_ms() + lease_ms
+    # Lease expiry isn't shown on the dashboard, so heartbeats don't bump
+    # the change version (and don't invalidate cached snapshots).
+    def write(conn):
+        return conn.execute(
+            """UPDATE tasks SET lease_expires = ?
+               WHERE id = ? AND status = 'running' AND lease_owner = ?
+                 AND lease_expires IS NOT NULL""",
+            (expires, task_id, worker)
+        ).rowcount
+    return expires if writer.run(write) else None
+
+
+# ── Logs ─────────────────────────────────────────────────
+
+# Retention: keep the newest LOG_CAP lines and, if LOG_RETENTION_DAYS is set,
+# nothing older than that. Trimming runs every LOG_TRIM_EVERY inserts, so
+# the table can briefly hold up to that many extra lines.
+LOG_CAP = int(os.getenv("LOG_RETENTION_COUNT", "500"))
+LOG_MAX_AGE_MS = int(float(os.getenv("LOG_RETENTION_DAYS", "0")) * 24 * 3600 * 1000)
+LOG_TRIM_EVERY = 64
+
+def _insert_log(conn, version, log_id, level, task_id, task_name, msg):
+    conn.execute(
+        """INSERT INTO logs (id, level, task_id, task_name, msg, ts, version)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (log_id, level, task_id, task_name, msg, now_ms(), version)
+    )
+    return True
+
+
+def _trim_logs(conn, force=False):
+    # Oldest first by (ts, rowid), so imported older lines go in their turn.
+    # COUNT(*) and the delete both walk idx_logs_ts, the delete only as far
+    # as the excess.
+    top = conn.execute("SELECT MAX(rowid) FROM logs").fetchone()[0]
+    if top is None or (not force and top % LOG_TRIM_EVERY):
+        return
+    excess = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] - LOG_CAP
+    if excess > 0:
         conn.execute(
-            "INSERT INTO logs (id, level, task_id, task_name, msg, ts) VALUES (?, ?, ?, ?, ?, ?)",
-            (log_id, level, task_id, task_name, msg, ts)
+            "DELETE FROM logs WHERE rowid IN (SELECT rowid FROM logs ORDER BY ts, rowid LIMIT ?)",
+            (excess,)
         )
-        count = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
-        if count > LOG_CAP:
-            conn.execute(
-                "DELETE FROM logs WHERE id IN (SELECT id FROM logs ORDER BY ts ASC LIMIT ?)",
-                (count - LOG_CAP,)
-            )
+    if LOG_MAX_AGE_MS:
+        conn.execute("DELETE FROM logs WHERE ts < ?", (now_ms() - LOG_MAX_AGE_MS,))
 
 
+def _log_cutoff(conn, incoming):
+    """The ts below which `incoming` new lines would be trimmed straight
+    away: the LOG_CAP newest lines already here are all at least this new."""
+    cutoff = now_ms() - LOG_MAX_AGE_MS if LOG_MAX_AGE_MS else None
+    if conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] + incoming > LOG_CAP:
+        row = conn.execute("SELECT ts FROM logs ORDER BY ts DESC, rowid DESC LIMIT 1 OFFSET ?",
+                           (LOG_CAP - 1,)).fetchone()
+        if row and (cutoff is None or row[0] > cutoff):
+            cutoff = row[0]
+    return cutoff
+
+
+@timed
+def append_log(log_id, level, task_id, task_name, msg):
+    def write(conn, version):
+        _insert_log(conn, version, log_id, level, task_id, task_name, msg)
+        _trim_logs(conn)
+    return _versioned(write)
+
+
+@timed
+def get_log(log_id):
+    with get_conn() as conn:
+        row = conn.execute("SELECT * FROM logs WHERE id = ?", (log_id,)).fetchone()
+        return dict(row) if row else None
+
+
+@timed
 def get_logs(limit=60):
     with get_conn() as conn:
         rows = conn.execute(
@@ -166,36 +1298,645 @@ def get_logs(limit=60):
         return [dict(r) for r in rows]
 
 
+def _fts_query(q):
+    """Turn free text into an FTS5 query: every word must match, a trailing
+    * makes it a prefix match, and FTS5 operators are treated as text."""
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+# Relevance ranking only scores the newest matches, so a query for a very
+# common word costs the same as one for a rare word.
+SEARCH_RANK_WINDOW = 10_000
+
+
+@timed
+def search_logs(q=None, level=None, task_id=None, from_ts=None, to_ts=None,
+                limit=50, offset=0):
+    """Search retained logs. With `q`, the newest SEARCH_RANK_WINDOW matches
+    are ranked by relevance (bm25); without it results are newest first.
+    Returns (logs, has_more)."""
+    where, args = [], []
+    if level:
+        where.append("logs.level = ?")
+        args.append(level)
+    if task_id:
+        where.append("logs.task_id = ?")
+        args.append(task_id)
+    if from_ts is not None:
+        where.append("logs.ts >= ?")
+        args.append(from_ts)
+    if to_ts is not None:
+        where.append("logs.ts < ?")
+        args.append(to_ts)
+
+    match = _fts_query(q) if q else ""
+    if match:
+        filters = "".join(f" AND {w}" for w in where)
+        sql = f"""SELECT logs.*, m.rank FROM (
+                      SELECT logs_fts.rowid AS rid, bm25(logs_fts) AS rank
+                      FROM logs_fts JOIN logs ON logs.rowid = logs_fts.rowid
+                      WHERE logs_fts MATCH ?{filters}
+                      ORDER BY logs_fts.rowid DESC LIMIT ?
+                  ) m JOIN logs ON logs.rowid = m.rid
+                  ORDER BY m.rank, logs.ts DESC LIMIT ? OFFSET ?"""
+        args = [match, *args, SEARCH_RANK_WINDOW]
+    else:
+        sql = "SELECT logs.* FROM logs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY logs.ts DESC LIMIT ? OFFSET ?"
+    args += [limit + 1, offset]
+
+    with get_conn() as conn:
+        rows = conn.execute(sql, args).fetchall()
+    return [dict(r) for r in rows[:limit]], len(rows) > limit
+
+
 # ── Scheduled ─────────────────────────────────────────────
 
+def _upsert_scheduled(conn, version, id_, name, type_, subtype, next_run, recurrence, avg_dur):
+    # Fills in the first run if omitted. Free-text recurrences the parser
+    # can't read are still stored, as before rules were parsed, but never
+    # run: next_run is cleared and recurrence_error says why.
+    error = None
+    try:
+        rule = parse_recurrence(recurrence)
+    except ValueError as e:
+        rule, next_run, error = None, None, str(e)
+    if next_run is None and rule is not None:
+        next_run = rule.next_after(now_ms())
+    conn.execute(
+        """INSERT INTO scheduled (id, name, type, subtype, next_run, recurrence, enabled,
+           avg_dur, version, recurrence_error)
+           VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+             name=excluded.name, type=excluded.type, subtype=excluded.subtype,
+             next_run=excluded.next_run, recurrence=excluded.recurrence,
+             avg_dur=COALESCE(excluded.avg_dur, scheduled.avg_dur),
+             version=excluded.version, recurrence_error=excluded.recurrence_error""",
+        (id_, name, type_, subtype, next_run, recurrence, avg_dur, version, error)
+    )
+    return True
+
+
+@timed
 def upsert_scheduled(id_, name, type_, subtype, next_run, recurrence, avg_dur):
-    with get_conn() as conn:
-        conn.execute(
-            """INSERT INTO scheduled (id, name, type, subtype, next_run, recurrence, enabled, avg_dur)
-               VALUES (?, ?, ?, ?, ?, ?, 1, ?)
-               ON CONFLICT(id) DO UPDATE SET
-                 name=excluded.name, type=excluded.type, subtype=excluded.subtype,
-                 next_run=excluded.next_run, recurrence=excluded.recurrence,
-                 avg_dur=excluded.avg_dur""",
-            (id_, name, type_, subtype, next_run, recurrence, avg_dur)
-        )
+    return _versioned(_upsert_scheduled, id_, name, type_, subtype, next_run, recurrence, avg_dur)
 
 
+def _update_scheduled(conn, version, id_, fields):
+    cols = ", ".join([f"{k} = ?" for k in fields] + ["version = ?"])
+    vals = list(fields.values()) + [version, id_]
+    cur = conn.execute(f"UPDATE scheduled SET {cols} WHERE id = ?", vals)
+    return cur.rowcount > 0
+
+
+@timed
 def update_scheduled(id_, fields: dict):
     if not fields:
         return
-    cols = ", ".join(f"{k} = ?" for k in fields)
-    vals = list(fields.values()) + [id_]
+    return _versioned(_update_scheduled, id_, fields)
+
+
+@timed
+def get_scheduled(id_):
     with get_conn() as conn:
-        conn.execute(f"UPDATE scheduled SET {cols} WHERE id = ?", vals)
+        row = conn.execute("SELECT * FROM scheduled WHERE id = ?", (id_,)).fetchone()
+        return dict(row) if row else None
 
 
+@timed
 def get_all_scheduled():
     with get_conn() as conn:
         rows = conn.execute("SELECT * FROM scheduled ORDER BY next_run ASC").fetchall()
         return [dict(r) for r in rows]
 
 
+# ── Scheduler support ─────────────────────────────────────
+# The scheduler keeps (next_run, id) in memory and only touches the table
+# when an entry comes due or is written.
+
+SCHEDULE_DUR_ALPHA = 0.2  # weight of the newest run in the learned avg_dur
+
+
+@timed
+def get_schedule_heads():
+    """(id, next_run) for every enabled entry that has a run pending."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, next_run FROM scheduled WHERE enabled = 1 AND next_run IS NOT NULL"
+        ).fetchall()
+        return [tuple(r) for r in rows]
+
+
+@timed
+def get_schedule_head(id_):
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT next_run FROM scheduled WHERE id = ? AND enabled = 1", (id_,)
+        ).fetchone()
+        return row[0] if row else None
+
+
+@timed
+def fire_scheduled(id_, due):
+    """Materialize a pending task for an entry that came due at `due` and
+    advance its next_run from the recurrence (NULL for one-shot entries).
+
+    The run is claimed with a compare-and-set on next_run, so it fires once
+    even if several processes hold the entry. Returns (version, task_id,
+    next_run), or None if the entry was changed or disabled meanwhile.
+    """
+    def write(conn):
+        row = conn.execute(
+            "SELECT * FROM scheduled WHERE id = ? AND enabled = 1 AND next_run = ?", (id_, due)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            rule = parse_recurrence(row["recurrence"])
+        except ValueError:
+            rule = None  # stored before rules were validated; run it once
+        # Runs missed while the server was down collapse into this one.
+        next_run = rule.next_after(max(now_ms(), due), due) if rule else None
+
+        version = _bump_version(conn)
+        cur = conn.execute(
+            """UPDATE scheduled SET next_run = ?, version = ?
+               WHERE id = ? AND enabled = 1 AND next_run = ?""",
+            (next_run, version, id_, due)
+        )
+        if cur.rowcount == 0:
+            raise Rollback(None)
+        task_id = f"tsk_{uuid.uuid4().hex[:8]}"
+        avg = row["avg_dur_ms"]
+        eta = f"~{max(1, round(avg / 60000))} min" if avg else None
+        _insert_task(conn, version, task_id, row["name"], row["type"], row["subtype"],
+                     [], ["scheduled"], "medium", eta, schedule_id=id_)
+        return version, task_id, next_run
+    return writer.run(write)
+
+
+def _record_scheduled_run(conn, version, task_id, status, dur):
+    """A task spawned by the scheduler finished: record its status on the
+    entry and fold its duration into the learned average."""
+    row = conn.execute(
+        """SELECT s.id, s.avg_dur_ms FROM tasks t JOIN scheduled s ON s.id = t.schedule_id
+           WHERE t.id = ?""",
+        (task_id,)
+    ).fetchone()
+    if row is None:
+        return
+    fields = {"last_status": status}
+    if dur is not None:
+        avg = row["avg_dur_ms"]
+        avg = dur if avg is None else avg + SCHEDULE_DUR_ALPHA * (dur - avg)
+        fields["avg_dur_ms"] = round(avg)
+        fields["avg_dur"] = _fmt_dur(avg)
+    _update_scheduled(conn, version, row["id"], fields)
+
+
+# ── Batch writes ──────────────────────────────────────────
+
+BATCH_OPS = {
+    "create_task": _insert_task,
+    "update_task": _update_task,
+    "log":         _insert_log,
+    "schedule":    _upsert_scheduled,
+}
+
+
+@timed
+def apply_batch(ops):
+    """Apply [(op, kwargs), ...] in order inside one transaction.
+
+    Every item runs in its own savepoint, so a failing item is rolled back
+    on its own and reported without aborting the rest. All rows written by
+    the batch share one change version. Returns (version, results) where
+    each result is None on success or an error message.
+    """
+    def write(conn):
+        version = _bump_version(conn)
+        results = []
+        for op, kwargs in ops:
+            conn.execute("SAVEPOINT batch_item")
+            try:
+                found = BATCH_OPS[op](conn, version, **kwargs)
+            except (sqlite3.Error, ValueError) as e:
+                conn.execute("ROLLBACK TO batch_item")
+                results.append(str(e))
+            else:
+                results.append(None if found else "Not found")
+            conn.execute("RELEASE batch_item")
+        if any(op == "log" for op, _ in ops):
+            _trim_logs(conn, force=True)
+        return version, results
+    return writer.run(write)
+
+
+# ── Delta sync ────────────────────────────────────────────
+
+@timed
+def get_changes(since, log_limit=60):
+    """Everything written after version `since`: changed tasks and scheduled
+    entries, and new log lines (newest first, capped at `log_limit`).
+    None if a bulk import has happened since then; the caller needs a full
+    snapshot rather than a delta of the whole import."""
+    with get_conn() as conn:
+        version, resync = conn.execute(
+            "SELECT version, resync_version FROM sync_state WHERE id = 1").fetchone()
+        if since < resync:
+            return None
+        rows = conn.execute(
+            "SELECT * FROM tasks WHERE version > ? ORDER BY created_at DESC, id DESC", (since,)
+        ).fetchall()
+        tasks = _attach_steps(conn, [_row_to_task(r) for r in rows])
+        logs = conn.execute(
+            "SELECT * FROM logs WHERE version > ? ORDER BY ts DESC LIMIT ?", (since, log_limit)
+        ).fetchall()
+        scheduled = conn.execute(
+            "SELECT * FROM scheduled WHERE version > ? ORDER BY next_run ASC", (since,)
+        ).fetchall()
+    return {
+        "version":   version,
+        "tasks":     tasks,
+        "logs":      [dict(r) for r in logs],
+        "scheduled": [dict(r) for r in scheduled],
+    }
+
+
+# ── Archive ───────────────────────────────────────────────
+# Finished tasks older than ARCHIVE_AFTER_DAYS move, steps and all, to the
+# archive database so the hot tables only hold recent history. Their counts
+# stay in the rollups (and archived_*rollup, for rebuilds), so analytics
+# don't change when a task is archived. Off unless ARCHIVE_AFTER_DAYS is set.
+
+ARCHIVE_AFTER_MS = int(float(os.getenv("ARCHIVE_AFTER_DAYS", "0")) * 24 * 3600 * 1000)
+ARCHIVE_BATCH = 500
+ARCHIVE_DROP = ("version", "lease_owner", "lease_expires")
+
+
+def _pack(task):
+    doc = {k: v for k, v in task.items() if k not in ARCHIVE_DROP}
+    return zlib.compress(json.dumps(doc, separators=(",", ":")).encode())
+
+
+def _unpack(blob):
+    task = json.loads(zlib.decompress(blob))
+    task["archived"] = True
+    return task
+
+
+@timed
+def archive_tasks(older_than_ms=None, limit=ARCHIVE_BATCH):
+    """Move up to `limit` finished tasks, oldest first, that finished more
+    than `older_than_ms` ago (default ARCHIVE_AFTER_MS; nothing, if that's
+    0) to the archive.
+
+    Returns (version, archived count); version is None if nothing moved.
+    The archive copy is committed before the hot row is deleted, and a row
+    is only deleted if it hasn't been written since it was read, so a crash
+    or a concurrent retry/rerun never loses a task.
+    """
+    if older_than_ms is None:
+        if ARCHIVE_AFTER_MS <= 0:
+            return None, 0
+        older_than_ms = ARCHIVE_AFTER_MS
+    cutoff = now_ms() - older_than_ms
+    marks = ", ".join("?" * len(TERMINAL_STATUSES))
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""SELECT * FROM tasks WHERE status IN ({marks}) AND created_at < ?
+                AND COALESCE(completed_at, created_at) < ?
+                ORDER BY created_at, id LIMIT ?""",
+            (*TERMINAL_STATUSES, cutoff, cutoff, limit)
+        ).fetchall()
+        tasks = _attach_steps(conn, [_row_to_task(r) for r in rows])
+    if not tasks:
+        return None, 0
+
+    archive = get_archive_conn()
+    with archive:
+        archive.executemany(
+            """INSERT OR REPLACE INTO archived_tasks (id, created_at, completed_at, type, status, data)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [(t["id"], t["created_at"], t["completed_at"], t["type"], t["status"], _pack(t))
+             for t in tasks]
+        )
+
+    def write(conn, batch):
+        version = _bump_version(conn)
+        moved, changed = [], []
+        for t in batch:
+            cur = conn.execute("DELETE FROM tasks WHERE id = ? AND version = ?",
+                               (t["id"], t["version"]))
+            (moved if cur.rowcount else changed).append(t)
+        ids = json.dumps([t["id"] for t in moved])
+        conn.execute("DELETE FROM task_steps WHERE task_id IN (SELECT value FROM json_each(?))",
+                     (ids,))
+        for t in moved:
+            _add_to_rollup(conn, (t["created_at"], t["type"], t["status"], t["error_code"],
+                                  t["started_at"], t["completed_at"]), 1, archived=True)
+            _add_steps_to_rollup(conn, t["type"], [
+                (s["label"], s["completed_at"], s["completed_at"] - s["started_at"])
+                for s in t["steps"] if s["status"] == "completed"
+                and s["started_at"] is not None and s["completed_at"] is not None
+            ], 1, archived=True)
+        # Written since we read it: still live, so its archive copy is stale.
+        # (Gone entirely means another archiver got there first.)
+        live = [r[0] for r in conn.execute(
+            "SELECT id FROM tasks WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([t["id"] for t in changed]),)
+        )] if changed else []
+        return version, moved, live
+
+    version, moved, live = None, [], []
+    for i in range(0, len(tasks), WRITE_JOB_ROWS):
+        version, m, l = writer.run(lambda conn, batch=tasks[i:i + WRITE_JOB_ROWS]:
+                                   write(conn, batch))
+        moved += m
+        live += l
+    if live:
+        with archive:
+            archive.execute(
+                "DELETE FROM archived_tasks WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(live),)
+            )
+    return version, len(moved)
+
+
+@timed
+def get_archived_task(task_id):
+    with get_archive_conn() as conn:
+        row = conn.execute("SELECT data FROM archived_tasks WHERE id = ?", (task_id,)).fetchone()
+    return _unpack(row[0]) if row else None
+
+
+@timed
+def list_archived_tasks(from_ts=None, to_ts=None, type_=None, status=None, cursor=None, limit=50):
+    """Archived tasks created in [from_ts, to_ts), newest first, paginated
+    like list_tasks. Returns (tasks, next_cursor)."""
+    where, args = [], []
+    if from_ts is not None:
+        where.append("created_at >= ?")
+        args.append(from_ts)
+    if to_ts is not None:
+        where.append("created_at < ?")
+        args.append(to_ts)
+    if type_:
+        where.append("type = ?")
+        args.append(type_)
+    if status:
+        where.append("status = ?")
+        args.append(status)
+    if cursor:
+        created, task_id = decode_cursor(cursor)
+        where.append("(created_at, id) < (?, ?)")
+        args += [created, task_id]
+    sql = "SELECT data FROM archived_tasks"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    args.append(limit + 1)
+
+    with get_archive_conn() as conn:
+        rows = conn.execute(sql, args).fetchall()
+    tasks = [_unpack(r[0]) for r in rows[:limit]]
+    next_cursor = encode_cursor(tasks[-1]) if len(rows) > limit else None
+    return tasks, next_cursor
+
+
+# ── Export / import ───────────────────────────────────────
+# Backups as NDJSON: one {"kind": "task", ...} (steps included) or
+# {"kind": "log", ...} object per line. Export reads keyset pages, so memory
+# stays flat and no read transaction is held open across the table. Import
+# writes chunks of lines, one transaction each, skipping ids that already
+# exist (here or in the archive), so a partial import can just be re-run.
+
+EXPORT_PAGE = 1000
+IMPORT_CHUNK = 500
+IMPORT_TASK_COLUMNS = ("id", "name", "type", "subtype", "status", "priority", "progress",
+                       "current_step", "step_idx", "started_at", "completed_at", "eta",
+                       "retry_count", "error_code", "error_message", "tags_json", "created_at",
+                       "schedule_id")
+IMPORT_TASK_SQL = f"""INSERT OR IGNORE INTO tasks ({", ".join(IMPORT_TASK_COLUMNS)}, version)
+                      VALUES ({", ".join("?" * (len(IMPORT_TASK_COLUMNS) + 1))})"""
+
+
+def _ts_range(column, from_ts, to_ts):
+    where, args = [], []
+    if from_ts is not None:
+        where.append(f"{column} >= ?")
+        args.append(from_ts)
+    if to_ts is not None:
+        where.append(f"{column} < ?")
+        args.append(to_ts)
+    return where, args
+
+
+@timed
+def export_tasks_page(from_ts=None, to_ts=None, after=None, limit=EXPORT_PAGE, archived=False):
+    """Up to `limit` tasks created in [from_ts, to_ts), oldest first, after
+    cursor `after`; from the archive with `archived`. Returns (tasks,
+    next_cursor), the cursor being None after the last page."""
+    where, args = _ts_range("created_at", from_ts, to_ts)
+    if after:
+        created, task_id = decode_cursor(after)
+        where.append("(created_at, id) > (?, ?)")
+        args += [created, task_id]
+    filters = " WHERE " + " AND ".join(where) if where else ""
+    args.append(limit)
+    if archived:
+        with get_archive_conn() as conn:
+            rows = conn.execute(
+                f"SELECT data FROM archived_tasks{filters} ORDER BY created_at, id LIMIT ?", args
+            ).fetchall()
+        tasks = [_unpack(r[0]) for r in rows]
+    else:
+        with get_conn() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM tasks{filters} ORDER BY created_at, id LIMIT ?", args
+            ).fetchall()
+            tasks = _attach_steps(conn, [_row_to_task(r) for r in rows])
+        for task in tasks:
+            for key in ARCHIVE_DROP:
+                del task[key]
+    next_cursor = encode_cursor(tasks[-1]) if len(tasks) == limit else None
+    return tasks, next_cursor
+
+
+@timed
+def export_logs_page(from_ts=None, to_ts=None, after=None, limit=EXPORT_PAGE):
+    """Up to `limit` log lines with ts in [from_ts, to_ts), in the order they
+    were written, after cursor `after` (a rowid). Returns (logs, next_cursor)."""
+    where, args = _ts_range("ts", from_ts, to_ts)
+    where.append("rowid > ?")
+    args += [after or 0, limit]
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""SELECT rowid, id, level, task_id, task_name, msg, ts FROM logs
+                WHERE {" AND ".join(where)} ORDER BY rowid LIMIT ?""", args
+        ).fetchall()
+    logs = [dict(r) for r in rows]
+    next_cursor = logs[-1].pop("rowid") if len(logs) == limit else None
+    for line in logs:
+        line.pop("rowid", None)
+    return logs, next_cursor
+
+
+def _require(row, key, type_, optional=False):
+    value = row.get(key)
+    if (value is None and optional) or (isinstance(value, type_) and not isinstance(value, bool)):
+        return value
+    raise ValueError(f"{key!r} must be {'null or ' if optional else ''}{type_.__name__}")
+
+
+def _task_import_rows(task):
+    """(tasks row, task_steps rows, rollup row) for an exported task; raises
+    ValueError if it can't be imported."""
+    values = {key: _require(task, key, str) for key in ("id", "name", "type", "subtype", "status")}
+    values["created_at"] = _require(task, "created_at", int)
+    for key in ("progress", "step_idx", "retry_count", "started_at", "completed_at"):
+        values[key] = _require(task, key, int, optional=True)
+    for key in ("priority", "current_step", "eta", "error_code", "error_message", "schedule_id"):
+        values[key] = _require(task, key, str, optional=True)
+    tags = _require(task, "tags", list, optional=True) or []
+    values["tags_json"] = json.dumps(tags)
+    values["priority"] = values["priority"] or "medium"
+    for key in ("progress", "step_idx", "retry_count"):
+        values[key] = values[key] or 0
+    steps = [_step_import_row(values["id"], seq, step)
+             for seq, step in enumerate(_require(task, "steps", list, optional=True) or [])]
+    rollup = tuple(values[c] for c in ("created_at", "type", "status", "error_code",
+                                       "started_at", "completed_at"))
+    return tuple(values[c] for c in IMPORT_TASK_COLUMNS), steps, rollup
+
+
+def _step_import_row(task_id, seq, step):
+    if not isinstance(step, dict):
+        raise ValueError("steps must be objects")
+    return (task_id, _require(step, "label", str),
+            _require(step, "status", str, optional=True) or "pending", seq,
+            _require(step, "started_at", int, optional=True),
+            _require(step, "completed_at", int, optional=True))
+
+
+def _log_import_row(line):
+    return (_require(line, "id", str), _require(line, "level", str),
+            _require(line, "task_id", str, optional=True),
+            _require(line, "task_name", str, optional=True),
+            _require(line, "msg", str), _require(line, "ts", int))
+
+
+@timed
+def import_rows(rows):
+    """Insert exported [(line_no, obj), ...], WRITE_JOB_ROWS rows per write.
+
+    Returns (version, tasks added, logs added, errors, log versions) where
+    errors lists (line_no, message), in line order, for lines that couldn't
+    be imported. Lines whose id already exists are skipped without error.
+    Log retention still applies, by timestamp: only the newest LOG_CAP
+    lines, old or imported, are kept, so log lines older than that are
+    skipped, and "logs added" counts the lines that are kept. A later,
+    newer import can still push them out; count_logs(log versions) says
+    how many are left. The import raises the resync mark, so dashboards
+    reload instead of asking for a delta of it.
+    """
+    tasks, logs, errors = [], [], []
+    for line_no, obj in rows:
+        try:
+            kind = obj.get("kind") if isinstance(obj, dict) else None
+            if kind == "task":
+                tasks.append(_task_import_rows(obj))
+            elif kind == "log":
+                logs.append(_log_import_row(obj))
+            elif kind != "export":  # the header line
+                raise ValueError(f"unknown kind {kind!r}")
+        except ValueError as e:
+            errors.append((line_no, str(e)))
+    if tasks:
+        with get_archive_conn() as archive:
+            archived = {r[0] for r in archive.execute(
+                "SELECT id FROM archived_tasks WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps([row[0] for row, _, _ in tasks]),)
+            )}
+        tasks = [t for t in tasks if t[0][0] not in archived]
+    if not tasks and not logs:
+        return None, 0, 0, errors, []
+
+    def resync(conn):
+        version = _bump_version(conn)
+        conn.execute("UPDATE sync_state SET resync_version = ? WHERE id = 1", (version,))
+        return version
+
+    def write_tasks(conn, batch):
+        version = resync(conn)
+        added = 0
+        for row, steps, rollup in batch:
+            if conn.execute(IMPORT_TASK_SQL, (*row, version)).rowcount:
+                conn.executemany(
+                    """INSERT INTO task_steps
+                         (task_id, label, status, seq, started_at, completed_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""", steps
+                )
+                _add_to_rollup(conn, rollup, 1)
+                _add_steps_to_rollup(conn, rollup[1], [
+                    (label, completed, completed - started)
+                    for _, label, status, _, started, completed in steps
+                    if status == "completed" and started is not None and completed is not None
+                ], 1)
+                added += 1
+        return version, added
+
+    def write_logs(conn, batch):
+        cutoff = _log_cutoff(conn, len(batch))
+        kept = [line for line in batch if cutoff is None or line[5] >= cutoff]
+        if not kept:
+            raise Rollback((None, 0))
+        version = resync(conn)
+        conn.executemany(
+            """INSERT OR IGNORE INTO logs (id, level, task_id, task_name, msg, ts, version)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""", [(*line, version) for line in kept]
+        )
+        _trim_logs(conn, force=True)
+        added = conn.execute("SELECT COUNT(*) FROM logs WHERE version = ?",
+                             (version,)).fetchone()[0]
+        return version, added
+
+    version, added_tasks, added_logs = None, 0, 0
+    for i in range(0, len(tasks), WRITE_JOB_ROWS):
+        version, added = writer.run(lambda conn, batch=tasks[i:i + WRITE_JOB_ROWS]:
+                                    write_tasks(conn, batch))
+        added_tasks += added
+    # Newest first, so no batch trims lines an earlier one added
+    logs.sort(key=lambda line: line[5], reverse=True)
+    log_versions = []
+    for i in range(0, len(logs), WRITE_JOB_ROWS):
+        logs_version, added = writer.run(lambda conn, batch=logs[i:i + WRITE_JOB_ROWS][::-1]:
+                                         write_logs(conn, batch))
+        if logs_version is not None:
+            version = logs_version
+            log_versions.append(logs_version)
+        added_logs += added
+    return version, added_tasks, added_logs, errors, log_versions
+
+
+@timed
+def count_logs(versions):
+    """How many log lines written at these versions are still kept."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM logs WHERE version IN (SELECT value FROM json_each(?))",
+            (json.dumps(versions),)
+        ).fetchone()[0]
+
+
 # ── Analytics ─────────────────────────────────────────────
 
 TYPE_COLORS = {
@@ -223,100 +1964,132 @@ STATUS_COLORS = {
     "cancelled":     "var(--hint)",
 }
 
-def compute_analytics():
-    window_ms = 30 * 24 * 3600 * 1000
-    cutoff = now_ms() - window_ms
+ANALYTICS_WINDOW_MS = 30 * 24 * 3600 * 1000
 
-    with get_conn() as conn:
-        # Total tasks in last 30d
-        total = conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE created_at >= ?", (cutoff,)
-        ).fetchone()[0] or 0
 
-        # Completed in last 30d
-        completed_count = conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE created_at >= ? AND status = 'completed'", (cutoff,)
-        ).fetchone()[0] or 0
+def _fmt_dur(ms):
+    s = int(ms / 1000)
+    return f"{s // 60}m {s % 60}s"
 
-        # Failed in last 30d
-        failed_count = conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE created_at >= ? AND status = 'failed'", (cutoff,)
-        ).fetchone()[0] or 0
 
-        success_pct = round(completed_count / total * 100) if total else 0
+def _trend(cur, prev, higher_is_better=True, points=False):
+    """KPI trend vs the previous window: ("+12%", "up"). `dir` says whether
+    the change is good (up) or bad (down), matching the dashboard styling.
+    With `points`, cur/prev are already percentages and the difference is
+    reported in points."""
+    if cur is None or not prev:
+        return "—", "flat"
+    change = round(cur - prev) if points else round((cur - prev) / prev * 100)
+    if change == 0:
+        return "0%", "flat"
+    good = (change > 0) == higher_is_better
+    return f"{change:+d}%", "up" if good else "down"
 
-        # Avg duration of completed tasks (ms → seconds → format)
-        avg_row = conn.execute(
-            """SELECT AVG(completed_at - started_at) FROM tasks
-               WHERE created_at >= ? AND status = 'completed'
-               AND completed_at IS NOT NULL AND started_at IS NOT NULL""",
-            (cutoff,)
-        ).fetchone()[0]
-        if avg_row:
-            avg_s = int(avg_row / 1000)
-            avg_dur = f"{avg_s // 60}m {avg_s % 60}s"
-        else:
-            avg_dur = "—"
 
-        # Running now
+@timed
+def compute_analytics():
+    """Analytics over the last 30 days, read from task_rollup.
+
+    The window is aligned to rollup buckets, so it can reach up to an hour
+    further back than exactly 30 days. Trends compare with the 30 days
+    before that.
+    """
+    now = now_ms()
+    cutoff = now - ANALYTICS_WINDOW_MS
+    cutoff -= cutoff % ROLLUP_BUCKET_MS
+    prev_cutoff = cutoff - ANALYTICS_WINDOW_MS
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            """SELECT bucket >= ? AS cur, type, status, error_code,
+                      SUM(cnt) AS cnt, SUM(dur_sum) AS dur_sum, SUM(dur_cnt) AS dur_cnt
+               FROM task_rollup WHERE bucket >= ?
+               GROUP BY cur, type, status, error_code""",
+            (cutoff, prev_cutoff)
+        ).fetchall()
+
+        # Running now (all time, not windowed)
         running_now = conn.execute(
             "SELECT COUNT(*) FROM tasks WHERE status = 'running'"
         ).fetchone()[0] or 0
 
-        kpis = [
-            {"label": "Tasks (30d)", "value": str(total),         "trend": "—", "dir": "flat"},
-            {"label": "Success Rate","value": f"{success_pct}%",  "trend": "—", "dir": "flat"},
-            {"label": "Avg Duration","value": avg_dur,             "trend": "—", "dir": "flat"},
-            {"label": "Active Now",  "value": str(running_now),   "trend": "—", "dir": "flat"},
-        ]
-
-        # Task types
-        type_rows = conn.execute(
-            "SELECT type, COUNT(*) as cnt FROM tasks WHERE created_at >= ? GROUP BY type ORDER BY cnt DESC",
-            (cutoff,)
-        ).fetchall()
-        total_typed = sum(r["cnt"] for r in type_rows) or 1
-        types = [
-            {
-                "label": TYPE_LABELS.get(r["type"], r["type"]),
-                "count": r["cnt"],
-                "pct":   round(r["cnt"] / total_typed * 100),
-                "color": TYPE_COLORS.get(r["type"], "var(--accent)"),
-            }
-            for r in type_rows
-        ]
-
-        # Status distribution
-        status_rows = conn.execute(
-            "SELECT status, COUNT(*) as cnt FROM tasks WHERE created_at >= ? GROUP BY status",
-            (cutoff,)
-        ).fetchall()
-        total_status = sum(r["cnt"] for r in status_rows) or 1
-        status_dist = [
-            {
-                "label": r["status"].replace("_", " ").title(),
-                "pct":   round(r["cnt"] / total_status * 100),
-                "color": STATUS_COLORS.get(r["status"], "var(--hint)"),
-            }
-            for r in status_rows
-        ]
-
-        # Top failure codes
-        failure_rows = conn.execute(
-            """SELECT error_code, COUNT(*) as cnt FROM tasks
-               WHERE created_at >= ? AND status = 'failed' AND error_code IS NOT NULL
-               GROUP BY error_code ORDER BY cnt DESC LIMIT 5""",
-            (cutoff,)
-        ).fetchall()
-        max_fail = failure_rows[0]["cnt"] if failure_rows else 1
-        failures = [
-            {
-                "name":  r["error_code"],
-                "count": r["cnt"],
-                "pct":   round(r["cnt"] / max_fail * 100),
-            }
-            for r in failure_rows
-        ]
+    def totals(cur):
+        out = {"total": 0, "completed": 0, "dur_sum": 0, "dur_cnt": 0}
+        for r in rows:
+            if r["cur"] != cur:
+                continue
+            out["total"] += r["cnt"]
+            if r["status"] == "completed":
+                out["completed"] += r["cnt"]
+            out["dur_sum"] += r["dur_sum"]
+            out["dur_cnt"] += r["dur_cnt"]
+        out["success"] = out["completed"] / out["total"] * 100 if out["total"] else None
+        out["avg_dur"] = out["dur_sum"] / out["dur_cnt"] if out["dur_cnt"] else None
+        return out
+
+    cur, prev = totals(1), totals(0)
+    total = cur["total"]
+    success_pct = round(cur["success"]) if cur["success"] is not None else 0
+    avg_dur = _fmt_dur(cur["avg_dur"]) if cur["avg_dur"] else "—"
+
+    tasks_trend = _trend(total, prev["total"])
+    success_trend = _trend(cur["success"], prev["success"], points=True)
+    dur_trend = _trend(cur["avg_dur"], prev["avg_dur"], higher_is_better=False)
+
+    def kpi(label, value, trend):
+        return {"label": label, "value": value, "trend": trend[0], "dir": trend[1]}
+
+    kpis = [
+        kpi("Tasks (30d)", str(total), tasks_trend),
+        kpi("Success Rate", f"{success_pct}%", success_trend),
+        kpi("Avg Duration", avg_dur, dur_trend),
+        kpi("Active Now", str(running_now), ("—", "flat")),
+    ]
+
+    by_type, by_status, by_error = {}, {}, {}
+    for r in rows:
+        if not r["cur"] or not r["cnt"]:
+            continue
+        by_type[r["type"]] = by_type.get(r["type"], 0) + r["cnt"]
+        by_status[r["status"]] = by_status.get(r["status"], 0) + r["cnt"]
+        if r["status"] == "failed" and r["error_code"]:
+            by_error[r["error_code"]] = by_error.get(r["error_code"], 0) + r["cnt"]
+
+    # Task types
+    type_rows = sorted(by_type.items(), key=lambda kv: kv[1], reverse=True)
+    total_typed = sum(by_type.values()) or 1
+    types = [
+        {
+            "label": TYPE_LABELS.get(type_, type_),
+            "count": cnt,
+            "pct":   round(cnt / total_typed * 100),
+            "color": TYPE_COLORS.get(type_, "var(--accent)"),
+        }
+        for type_, cnt in type_rows
+    ]
+
+    # Status distribution
+    total_status = sum(by_status.values()) or 1
+    status_dist = [
+        {
+            "label": status.replace("_", " ").title(),
+            "pct":   round(cnt / total_status * 100),
+            "color": STATUS_COLORS.get(status, "var(--hint)"),
+        }
+        for status, cnt in by_status.items()
+    ]
+
+    # Top failure codes
+    failure_rows = sorted(by_error.items(), key=lambda kv: kv[1], reverse=True)[:5]
+    max_fail = failure_rows[0][1] if failure_rows else 1
+    failures = [
+        {
+            "name":  code,
+            "count": cnt,
+            "pct":   round(cnt / max_fail * 100),
+        }
+        for code, cnt in failure_rows
+    ]
 
     return {
         "kpis":       kpis,
@@ -324,3 +2097,114 @@ def compute_analytics():
         "statusDist": status_dist,
         "failures":   failures,
     }
+
+
+# ── Time series ───────────────────────────────────────────
+
+TIMESERIES_METRICS = ("count", "success_rate", "duration")
+TIMESERIES_GROUPS = ("type", "status", "error_code")
+TIMESERIES_MAX_POINTS = 2000
+
+
+def _weighted_percentile(bins, q):
+    """q-th percentile (nearest rank) of a sorted [(bin, count)] histogram."""
+    total = sum(c for _, c in bins)
+    if not total:
+        return None
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for b, c in bins:
+        seen += c
+        if seen >= rank:
+            return dur_bin_value(b)
+
+
+@timed
+def timeseries(from_ts, to_ts, bucket_ms, group_by=None, metrics_=TIMESERIES_METRICS):
+    """Task counts, success rate and duration stats per time bucket, read
+    from the hourly rollups.
+
+    Tasks are counted in the bucket they were created in. success_rate is
+    completed / finished (completed, failed or cancelled), so buckets with
+    work still in flight aren't dragged down. Durations cover completed
+    tasks; p50/p95 come from the log-scale duration bins and are within
+    about 5%. `bucket_ms` must be a whole number of hours; buckets are
+    aligned to it from the epoch (UTC).
+
+    Returns {"t": [bucket starts], "series": [{"key", <metric arrays>}]}
+    with one series per group (a single "all" series without group_by).
+    """
+    if bucket_ms <= 0 or bucket_ms % ROLLUP_BUCKET_MS:
+        raise ValueError("bucket must be a whole number of hours")
+    if group_by is not None and group_by not in TIMESERIES_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(TIMESERIES_GROUPS)}")
+    unknown = set(metrics_) - set(TIMESERIES_METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metric: {', '.join(sorted(unknown))}")
+    start = from_ts - from_ts % bucket_ms
+    end = to_ts - to_ts % bucket_ms + (bucket_ms if to_ts % bucket_ms else 0)
+    points = (end - start) // bucket_ms
+    if points <= 0:
+        raise ValueError("'from' must be before 'to'")
+    if points > TIMESERIES_MAX_POINTS:
+        raise ValueError(f"Too many buckets ({points}); at most {TIMESERIES_MAX_POINTS}")
+
+    key = group_by or "'all'"
+    with get_conn() as conn:
+        counts = conn.execute(
+            f"""SELECT (bucket - ?) / ? AS i, {key} AS key, status,
+                       SUM(cnt), SUM(dur_sum), SUM(dur_cnt)
+                FROM task_rollup WHERE bucket >= ? AND bucket < ?
+                GROUP BY i, key, status""",
+            (start, bucket_ms, start, end)
+        ).fetchall()
+        bins = conn.execute(
+            f"""SELECT (bucket - ?) / ? AS i, {key} AS key, bin, SUM(cnt)
+                FROM duration_rollup WHERE bucket >= ? AND bucket < ?
+                GROUP BY i, key, bin ORDER BY i, key, bin""",
+            (start, bucket_ms, start, end)
+        ).fetchall() if "duration" in metrics_ else []
+
+    def empty():
+        return {"count": [0] * points, "completed": [0] * points, "finished": [0] * points,
+                "dur_sum": [0] * points, "dur_cnt": [0] * points, "bins": {}}
+
+    groups = {}
+    for i, k, status, cnt, dur_sum, dur_cnt in counts:
+        if not cnt:
+            continue
+        if k not in groups:
+            groups[k] = empty()
+        g = groups[k]
+        g["count"][i] += cnt
+        g["dur_sum"][i] += dur_sum
+        g["dur_cnt"][i] += dur_cnt
+        if status in TERMINAL_STATUSES:
+            g["finished"][i] += cnt
+            if status == "completed":
+                g["completed"][i] += cnt
+    for i, k, b, cnt in bins:
+        if cnt and k in groups:
+            groups[k]["bins"].setdefault(i, []).append((b, cnt))
+
+    series = []
+    for k, g in sorted(groups.items(), key=lambda kv: -sum(kv[1]["count"])):
+        out = {"key": k}
+        if "count" in metrics_:
+            out["count"] = g["count"]
+        if "success_rate" in metrics_:
+            out["success_rate"] = [round(c / f * 100, 1) if f else None
+                                   for c, f in zip(g["completed"], g["finished"])]
+        if "duration" in metrics_:
+            out["avg_ms"] = [round(s / n) if n else None for s, n in zip(g["dur_sum"], g["dur_cnt"])]
+            out["p50_ms"] = [_weighted_percentile(g["bins"].get(i, []), 0.50) for i in range(points)]
+            out["p95_ms"] = [_weighted_percentile(g["bins"].get(i, []), 0.95) for i in range(points)]
+        series.append(out)
+    return {
+        "from":      start,
+        "to":        end,
+        "bucket_ms": bucket_ms,
+        "group_by":  group_by,
+        "t":         [start + i * bucket_ms for i in range(points)],
+        "series":    series,
+    }
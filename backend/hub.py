@@ -0,0 +1,109 @@
+"""
+In-process broadcast hub for the /api/stream push channel.
+
+Write handlers publish changed rows once; every subscriber keeps a small
+pending map keyed by (kind, id), so rapid updates to the same task collapse
+into the latest version while the client is slow or between flushes. A
+subscriber that falls too far behind is reset and told to resync instead of
+buffering without bound.
+"""
+
+import asyncio
+import threading
+
+MAX_PENDING = 500
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int = MAX_PENDING):
+        self._loop = loop
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self._version = 0
+        self._overflow = False
+        self.wakeup = asyncio.Event()
+
+    def offer(self, kind: str, row: dict, version: int):
+        """Queue a changed row (any thread). Same-id rows replace each other."""
+        with self._lock:
+            if self._overflow:
+                return
+            self._pending[(kind, row["id"])] = row
+            self._version = max(self._version, version)
+            if len(self._pending) > self._max_pending:
+                self._pending.clear()
+                self._overflow = True
+        self._loop.call_soon_threadsafe(self.wakeup.set)
+
+    def reset(self):
+        """Drop anything queued and tell the client to resync (any thread)."""
+        with self._lock:
+            self._pending.clear()
+            self._overflow = True
+        self._loop.call_soon_threadsafe(self.wakeup.set)
+
+    def drain(self):
+        """Take everything queued so far (event-loop thread only).
+
+        Returns (delta, overflow); delta has the same shape as a
+        /api/state?since= response.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            overflow, self._overflow = self._overflow, False
+            version = self._version
+            self.wakeup.clear()
+        delta = {"version": version, "full": False, "tasks": [], "logs": [], "scheduled": []}
+        for (kind, _), row in pending.items():
+            delta[kind].append(row)
+        return delta, overflow
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: set[Subscriber] = set()
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def resync(self):
+        """Make every subscriber reload the full state, after changes too
+        large to push row by row."""
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                sub.reset()
+            except RuntimeError:
+                pass
+
+    def publish(self, kind: str, row: dict, version: int):
+        """Fan a changed row out to every subscriber. `kind` is one of
+        "tasks", "logs" or "scheduled"."""
+        if row is None or version is None:
+            return
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                sub.offer(kind, row, version)
+            except RuntimeError:
+                # Subscriber's event loop is gone; its stream will unsubscribe.
+                pass
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+
+hub = Hub()
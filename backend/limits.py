@@ -0,0 +1,142 @@
+"""
+Admission control: per-key token buckets and per-endpoint concurrency caps.
+
+Every request with a known key spends a token from that key's bucket for
+its route class ("ingest" for writes, "read" for queries). When the bucket
+is empty the request gets a 429 whose Retry-After says when the next token
+is due, so a runaway client is turned away instead of slowing everyone
+else down. A client that comes back before then (a tight loop ignoring
+errors) has its next 429 held until it should have waited, which costs an
+idle coroutine instead of a spinning one. Expensive reads also take a slot
+from a Gate; once every slot is in use, extra requests are shed at once
+rather than queued behind the rest.
+
+AdmissionMiddleware applies both before routing, so a rejection costs
+next to nothing. State is per process and only touched from the event
+loop, so it needs no locks.
+"""
+
+import asyncio
+import math
+import time
+
+import metrics
+
+REJECTED_BODY = b'{"detail":"Too many requests"}'
+MAX_HOLD_S = 5
+
+
+def retry_after(seconds):
+    """A Retry-After header value: whole seconds, at least 1."""
+    return str(max(1, math.ceil(seconds)))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp", "retry_at")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.retry_at = 0.0  # when the last rejected client was told to come back
+
+    def take(self, now=None):
+        """Spend a token. Returns 0 if there was one, otherwise the seconds
+        until there will be (nothing is spent)."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, rates):
+        self.rates = rates   # route class -> (tokens per second, burst); rate 0 = unlimited
+        self._buckets = {}   # (key, route class) -> TokenBucket
+
+    def check(self, key, route_class):
+        """(seconds the caller must wait, seconds to hold its 429), both 0
+        if the request may go ahead. The hold is non-zero when the key was
+        already told to wait and hasn't. Only call with keys that have been
+        authenticated, so the bucket table stays as small as the key list."""
+        rate, burst = self.rates.get(route_class, (0, 0))
+        if rate <= 0:
+            return 0.0, 0.0
+        bucket = self._buckets.get((key, route_class))
+        if bucket is None:
+            bucket = self._buckets[key, route_class] = TokenBucket(rate, burst)
+        now = time.monotonic()
+        wait = bucket.take(now)
+        if not wait:
+            return 0.0, 0.0
+        hold = max(0.0, bucket.retry_at - now)
+        bucket.retry_at = max(bucket.retry_at, now + int(retry_after(wait)))
+        return wait, min(hold, MAX_HOLD_S)
+
+
+class Gate:
+    """At most `limit` requests inside at once (0 = no limit)."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+
+    def enter(self):
+        if self.limit > 0 and self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def leave(self):
+        self.active -= 1
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: rate limits requests carrying one of `keys` (an
+    unknown key is left for the endpoint to reject) and caps the requests
+    in flight on each path in `gates`; only reads (GET and HEAD) take a
+    slot, so writes to the same path are never shed. Paths in `exempt`
+    pass untouched."""
+
+    def __init__(self, app, keys, limiter, gates, exempt=()):
+        self.app = app
+        self.keys = keys
+        self.limiter = limiter
+        self.gates = gates      # path -> Gate
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            return await self.app(scope, receive, send)
+        key = next((v for k, v in scope["headers"] if k == b"x-api-key"), b"").decode("latin-1")
+        read = scope["method"] in ("GET", "HEAD")
+        if key in self.keys:
+            route_class = "read" if read else "ingest"
+            wait, hold = self.limiter.check(key, route_class)
+            if wait:
+                if hold:
+                    await asyncio.sleep(hold)
+                return await self._reject(send, "rate", route_class, wait)
+        gate = self.gates.get(scope["path"]) if read else None
+        if gate is None:
+            return await self.app(scope, receive, send)
+        if not gate.enter():
+            return await self._reject(send, "inflight", scope["path"], 1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.leave()
+
+    @staticmethod
+    async def _reject(send, limit, name, seconds):
+        metrics.HTTP_REJECTED.inc(limit, name)
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(REJECTED_BODY)).encode()),
+            (b"retry-after", retry_after(seconds).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": REJECTED_BODY})
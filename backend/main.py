@@ -1,53 +1,634 @@
+import asyncio
+import hashlib
+import hmac
 import os
+import secrets
+import sys
+import time
 import uuid
-from typing import Optional
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial, wraps
+from typing import Annotated, Literal, Optional, Union
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-import database as db
-
-load_dotenv()
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+load_dotenv()  # before importing database, which reads its settings at import
+
+import database as db  # noqa: E402
+import metrics  # noqa: E402
+from archiver import archiver  # noqa: E402
+from cache import TTLCache, VersionedCache  # noqa: E402
+from hub import hub  # noqa: E402
+from limits import AdmissionMiddleware, Gate, RateLimiter  # noqa: E402
+from progress import progress  # noqa: E402
+from responses import (  # noqa: E402
+    Payload, StreamEncoder, choose_encoding, dumps, etag_for, json_response, loads,
+)
+from scheduler import scheduler  # noqa: E402
 
 API_KEY = os.getenv("API_KEY", "changeme")
-
-app = FastAPI(title="Clawd Dashboard API")
-
+# Extra keys share API_KEY's access but get their own rate limits, so each
+# bot (or the dashboards) can be given a key and one can't starve the rest.
+API_KEYS = {API_KEY, *filter(None, (k.strip() for k in os.getenv("EXTRA_API_KEYS", "").split(",")))}
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
+
+DB_READ_THREADS = int(os.getenv("DB_READ_THREADS", "8"))
+DB_WRITE_THREADS = int(os.getenv("DB_WRITE_THREADS", "16"))
+
+# Per key, in requests per second (0 = unlimited), with a burst allowance.
+# "ingest" is everything that writes, "read" is queries.
+RATE_LIMITS = {
+    "ingest": (float(os.getenv("RATE_INGEST", "200")),
+               float(os.getenv("RATE_INGEST_BURST", "400"))),
+    "read":   (float(os.getenv("RATE_READ", "20")), float(os.getenv("RATE_READ_BURST", "40"))),
+}
+# Expensive reads in flight per endpoint (0 = unlimited). Beyond about twice
+# the read pool they'd only queue for a thread, so they're shed instead.
+READ_MAX_INFLIGHT = int(os.getenv("READ_MAX_INFLIGHT", str(2 * DB_READ_THREADS)))
+CAPPED_PATHS = ("/api/state", "/api/tasks", "/api/logs/search", "/api/archive/tasks",
+                "/api/analytics/steps", "/api/analytics/timeseries", "/api/export")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if SCHEDULER_ENABLED:
+        scheduler.on_fire = publish_scheduled_run
+        scheduler.on_requeue = publish_tasks
+        scheduler.start()
+    if db.ARCHIVE_AFTER_MS > 0:
+        archiver.start()
+    progress.on_flush = publish_tasks
+    progress.start()
+    yield
+    scheduler.stop()
+    archiver.stop()
+    progress.stop()
+
+
+app = FastAPI(title="Clawd Dashboard API", lifespan=lifespan)
+
+gates = {path: Gate(READ_MAX_INFLIGHT) for path in CAPPED_PATHS}
+metrics.Gauge("clawd_http_inflight", "Requests in progress on capped endpoints",
+              lambda: {(path,): gate.active for path, gate in gates.items()}, ("path",))
+# Innermost, so its 429s still get CORS headers and are counted by metrics
+app.add_middleware(AdmissionMiddleware, keys=API_KEYS, limiter=RateLimiter(RATE_LIMITS),
+                   gates=gates, exempt=("/metrics", "/api/stream"))
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 db.init_db()
 
 
+# ── DB executors ──────────────────────────────────────────
+
+# Handlers are async and run their blocking database work on one of two
+# bounded pools rather than Starlette's shared threadpool, so a burst of
+# slow dashboard polls queues behind other reads, never in front of a
+# bot's write. Write threads mostly wait on database.writer, so more of
+# them just means bigger group commits.
+read_pool = ThreadPoolExecutor(DB_READ_THREADS, thread_name_prefix="clawd-read")
+write_pool = ThreadPoolExecutor(DB_WRITE_THREADS, thread_name_prefix="clawd-write")
+
+
+def run_in(pool, fn, *args, **kwargs):
+    return asyncio.get_running_loop().run_in_executor(pool, partial(fn, *args, **kwargs))
+
+
+def on(pool):
+    """Turn a sync handler into an async one that runs its body on `pool`.
+    FastAPI reads the parameters through __wrapped__."""
+    def decorate(fn):
+        @wraps(fn)
+        async def handler(*args, **kwargs):
+            return await run_in(pool, fn, *args, **kwargs)
+        return handler
+    return decorate
+
+
 # ── Auth ──────────────────────────────────────────────────
 
-def require_api_key(x_api_key: str = Header(...)):
-    if x_api_key != API_KEY:
+async def require_api_key(x_api_key: str = Header(...)):
+    if x_api_key not in API_KEYS:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
 
+# EventSource can't send custom headers, so the stream is opened with a
+# short-lived token in the query string instead of the API key, which would
+# otherwise end up in access and proxy logs. Tokens are signed with a
+# per-process secret, so they don't outlive a restart.
+STREAM_TOKEN_TTL_S = 60
+_stream_secret = secrets.token_bytes(32)
+
+
+def _stream_signature(expires):
+    return hmac.new(_stream_secret, str(expires).encode(), hashlib.sha256).hexdigest()
+
+
+def stream_token():
+    expires = int(time.time()) + STREAM_TOKEN_TTL_S
+    return f"{expires}.{_stream_signature(expires)}"
+
+
+async def require_stream_token(token: str = Query(...)):
+    expires, _, signature = token.partition(".")
+    if (not expires.isdigit() or int(expires) < time.time()
+            or not hmac.compare_digest(signature, _stream_signature(int(expires)))):
+        raise HTTPException(status_code=401, detail="Invalid or expired stream token")
+
+
+async def require_metrics_key(
+    x_api_key: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None),
+):
+    # Scrapers are usually configured with a bearer token rather than a custom header
+    scheme, _, bearer = (authorization or "").partition(" ")
+    if scheme != "Bearer":
+        bearer = None
+    if x_api_key not in API_KEYS and bearer not in API_KEYS:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+
+# ── Push helpers ──────────────────────────────────────────
+
+def publish_task(task_id, version):
+    if version is not None and hub.subscriber_count:
+        task = db.get_task(task_id)
+        hub.publish("tasks", task, version)
+        # A finished scheduled run also updated its entry's last_status.
+        if task and task["schedule_id"] and task["status"] in db.TERMINAL_STATUSES:
+            publish_scheduled(task["schedule_id"], version)
+
+
+def publish_tasks(task_ids, version):
+    if version is not None and hub.subscriber_count:
+        for task in db.get_tasks(task_ids):
+            hub.publish("tasks", task, version)
+
+
+def with_progress(task_id, fields):
+    """`fields` on top of the task's buffered progress, which is taken so
+    it's written in the same commit rather than flushed after it."""
+    return {**progress.take(task_id), **fields}
+
+
+def publish_log(log_id, version):
+    if version is not None and hub.subscriber_count:
+        hub.publish("logs", db.get_log(log_id), version)
+
+
+def publish_scheduled(sched_id, version):
+    if version is not None and hub.subscriber_count:
+        hub.publish("scheduled", db.get_scheduled(sched_id), version)
+
+
+def scheduled_changed(sched_id, version):
+    if version is not None:
+        scheduler.refresh(sched_id)
+    publish_scheduled(sched_id, version)
+
+
+def publish_scheduled_run(task_id, sched_id, version):
+    publish_task(task_id, version)
+    publish_scheduled(sched_id, version)
+
+
 # ── GET /api/state ────────────────────────────────────────
 
-@app.get("/api/state")
-def get_state(auth=Depends(require_api_key)):
-    tasks = db.get_all_tasks()
-    logs = db.get_logs(60)
-    scheduled = db.get_all_scheduled()
-    analytics = db.compute_analytics()
+# Full snapshots are cached per change version (any write invalidates them)
+# and built once however many dashboards miss at the same time. Analytics
+# don't need per-write freshness and are refreshed on a timer instead. The
+# assembled body is cached with its compressed variants.
+ANALYTICS_TTL_S = 10
+
+_snapshot_cache = VersionedCache()
+_analytics_cache = TTLCache(ANALYTICS_TTL_S)
+_payload_cache = VersionedCache()
+
+
+def cached_analytics():
+    """(generation, analytics, serialized Payload), recomputed at most every
+    ANALYTICS_TTL_S; the generation changes on each refresh."""
+    def compute():
+        analytics = db.compute_analytics()
+        return analytics, Payload(dumps(analytics))
+    generation, (analytics, payload) = _analytics_cache.get(compute)
+    return generation, analytics, payload
+
 
+def build_snapshot():
     # Convert scheduled next_run int → keep as int (JS will convert)
-    return {
-        "tasks":     tasks,
-        "logs":      logs,
-        "scheduled": scheduled,
-        "analytics": analytics,
-    }
+    return (
+        dumps(progress.overlay(db.get_state_tasks())),
+        dumps(db.get_logs(60)),
+        dumps(db.get_all_scheduled()),
+    )
+
+
+def build_payload(key, analytics: Payload):
+    tasks, logs, scheduled = _snapshot_cache.get(key, build_snapshot)
+    version = key[0]
+    return Payload(b"".join([
+        b'{"version":', str(version).encode(), b',"full":true',
+        b',"tasks":', tasks,
+        b',"logs":', logs,
+        b',"scheduled":', scheduled,
+        b',"analytics":', analytics.body,
+        b"}",
+    ]))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(t.strip().removeprefix("W/") in (etag, "*") for t in if_none_match.split(","))
+
+
+@app.get("/api/state")
+@on(read_pool)
+def get_state(
+    request: Request,
+    since: Optional[int] = None,
+    auth=Depends(require_api_key),
+):
+    progress_gen, dirty = progress.generation, progress.dirty
+    version = db.get_version()
+    accept_encoding = request.headers.get("accept-encoding")
+
+    # Delta mode: the client already holds the snapshot at version `since`.
+    # A `since` ahead of the server (e.g. the DB was reset) or from before a
+    # bulk import falls through to a full snapshot. Buffered progress isn't
+    # versioned yet, so while there is any it's resent on top of the delta.
+    if since is not None:
+        if since == version and not dirty:
+            return Response(status_code=304)
+        changes = db.get_changes(since) if since <= version else None
+        if changes is not None:
+            changes["full"] = False
+            if changes["tasks"]:
+                changes["analytics"] = cached_analytics()[1]
+            if dirty:
+                seen = {t["id"] for t in changes["tasks"]}
+                changes["tasks"] += db.get_tasks([i for i in progress.pending_ids() if i not in seen])
+                progress.overlay(changes["tasks"])
+            return json_response(changes, accept_encoding)
+
+    generation, _, analytics = cached_analytics()
+    key = (version, progress_gen)
+    payload = _payload_cache.get((*key, generation), lambda: build_payload(key, analytics))
+    encoding = choose_encoding(accept_encoding, len(payload.body))
+    # The progress generation is per process, so it's only in the tag while
+    # it matters; otherwise workers agree on tags.
+    tag = f"{version}.{progress_gen}" if dirty else str(version)
+    etag = etag_for(f"{tag}-{zlib.crc32(analytics.body):08x}", encoding)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return payload.response(encoding, headers)
+
+
+# ── GET /api/stream (Server-Sent Events) ──────────────────
+
+STREAM_COALESCE_S = 0.25   # gather rapid updates into one event
+STREAM_KEEPALIVE_S = 15
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+@app.post("/api/stream/token")
+async def create_stream_token(auth=Depends(require_api_key)):
+    """A token for opening /api/stream?token=...; only checked on connect."""
+    return {"token": stream_token(), "expires_in": STREAM_TOKEN_TTL_S}
+
+
+@app.get("/api/stream")
+async def stream(request: Request, auth=Depends(require_stream_token)):
+    sub = hub.subscribe()
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    await asyncio.wait_for(sub.wakeup.wait(), STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                await asyncio.sleep(STREAM_COALESCE_S)
+                delta, overflow = sub.drain()
+                if overflow:
+                    yield sse("resync", {})
+                else:
+                    yield sse("delta", delta)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── GET /api/analytics ────────────────────────────────────
+
+@app.get("/api/analytics")
+@on(read_pool)
+def get_analytics(request: Request, auth=Depends(require_api_key)):
+    payload = cached_analytics()[2]
+    return payload.response(choose_encoding(request.headers.get("accept-encoding"), len(payload.body)))
+
+
+# ── GET /api/analytics/steps ──────────────────────────────
+
+@app.get("/api/analytics/steps")
+@on(read_pool)
+def step_analytics(
+    request: Request,
+    type: Optional[str] = None,
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(50, ge=1, le=200),
+    auth=Depends(require_api_key),
+):
+    """Per-step duration stats by task type, most total time first."""
+    since = db.now_ms() - days * 24 * 3600 * 1000
+    return json_response({"steps": db.step_stats(type_=type, since=since, limit=limit)},
+                         request.headers.get("accept-encoding"))
+
+
+# ── GET /api/analytics/timeseries ─────────────────────────
+
+BUCKET_UNITS = {"h": 3600 * 1000, "d": 24 * 3600 * 1000, "w": 7 * 24 * 3600 * 1000}
+
+
+@app.get("/api/analytics/timeseries")
+@on(read_pool)
+def timeseries(
+    request: Request,
+    metric: Optional[str] = None,
+    bucket: str = Query("1d", pattern=r"^\d+[hdw]$"),
+    from_ts: Optional[int] = Query(None, alias="from"),
+    to_ts: Optional[int] = Query(None, alias="to"),
+    group_by: Optional[Literal["type", "status", "error_code"]] = None,
+    auth=Depends(require_api_key),
+):
+    """Bucketed task counts, success rate and durations (avg/p50/p95) from
+    `from` to `to` (epoch ms; default the last 30 days). `metric` is a
+    comma-separated subset of count, success_rate, duration (default all)."""
+    to_ts = to_ts if to_ts is not None else db.now_ms()
+    from_ts = from_ts if from_ts is not None else to_ts - db.ANALYTICS_WINDOW_MS
+    metrics_ = tuple(m.strip() for m in metric.split(",")) if metric else db.TIMESERIES_METRICS
+    try:
+        data = db.timeseries(from_ts, to_ts, int(bucket[:-1]) * BUCKET_UNITS[bucket[-1]],
+                             group_by=group_by, metrics_=metrics_)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(data, request.headers.get("accept-encoding"))
+
+
+# ── GET /metrics ──────────────────────────────────────────
+
+# Row counts cost a COUNT(*) per table, so they're refreshed on a timer.
+TABLE_COUNTS_TTL_S = 15
+_table_counts_cache = TTLCache(TABLE_COUNTS_TTL_S)
+
+metrics.Gauge("clawd_table_rows", "Rows per table", lambda: _table_counts_cache.get(db.table_counts)[1],
+              ("table",))
+metrics.Gauge("clawd_change_version", "Current change version", db.get_version)
+metrics.Gauge("clawd_stream_subscribers", "Connected /api/stream clients",
+              lambda: hub.subscriber_count)
+metrics.Gauge("clawd_scheduler_pending", "Scheduled entries waiting to run",
+              lambda: scheduler.pending)
+
+
+@app.get("/metrics")
+@on(read_pool)
+def get_metrics(auth=Depends(require_metrics_key)):
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# ── GET /api/tasks ────────────────────────────────────────
+
+@app.get("/api/tasks")
+@on(read_pool)
+def list_tasks(
+    request: Request,
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    priority: Optional[str] = None,
+    tag: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    auth=Depends(require_api_key),
+):
+    try:
+        tasks, next_cursor = db.list_tasks(
+            status=status, type_=type, priority=priority, tag=tag,
+            cursor=cursor, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"tasks": progress.overlay(tasks), "next_cursor": next_cursor},
+                         request.headers.get("accept-encoding"))
+
+
+# ── GET /api/archive/tasks ────────────────────────────────
+
+@app.get("/api/archive/tasks")
+@on(read_pool)
+def list_archived_tasks(
+    request: Request,
+    from_ts: Optional[int] = Query(None, alias="from"),
+    to_ts: Optional[int] = Query(None, alias="to"),
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    auth=Depends(require_api_key),
+):
+    """Archived tasks created in [from, to) (epoch ms), newest first."""
+    try:
+        tasks, next_cursor = db.list_archived_tasks(
+            from_ts=from_ts, to_ts=to_ts, type_=type, status=status,
+            cursor=cursor, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"tasks": tasks, "next_cursor": next_cursor},
+                         request.headers.get("accept-encoding"))
+
+
+@app.get("/api/archive/tasks/{task_id}")
+@on(read_pool)
+def get_archived_task(task_id: str, auth=Depends(require_api_key)):
+    task = db.get_archived_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found in archive")
+    return task
+
+
+# ── GET /api/export ───────────────────────────────────────
+
+class Export:
+    """Produces an export's body one page at a time (call next_chunk() on a
+    read-pool thread until it returns None): a header line, tasks oldest
+    first, archived tasks if asked for, then logs, each line tagged with
+    its "kind". Pages are separate reads, so a task the archiver moves
+    while the export runs can be left out of it."""
+
+    FORMAT = 1
+
+    def __init__(self, from_ts, to_ts, archived, encoding):
+        self.from_ts, self.to_ts = from_ts, to_ts
+        self.parts = ["header", "tasks", *(["archived"] if archived else []), "logs"]
+        self.cursor = None
+        self.encoder = StreamEncoder(encoding)
+
+    def next_chunk(self):
+        while self.parts:
+            part = self.parts[0]
+            if part == "header":
+                rows, self.cursor = [{"kind": "export", "format": self.FORMAT,
+                                      "version": db.get_version(),
+                                      "from": self.from_ts, "to": self.to_ts,
+                                      "exported_at": db.now_ms()}], None
+            elif part == "logs":
+                rows, self.cursor = db.export_logs_page(self.from_ts, self.to_ts, after=self.cursor)
+                rows = [{"kind": "log", **r} for r in rows]
+            else:
+                rows, self.cursor = db.export_tasks_page(self.from_ts, self.to_ts,
+                                                         after=self.cursor,
+                                                         archived=part == "archived")
+                rows = [{"kind": "task", **r} for r in rows]
+            if self.cursor is None:
+                self.parts.pop(0)
+            out = self.encoder.compress(b"".join(dumps(r) + b"\n" for r in rows))
+            if out:
+                return out
+        if self.encoder is not None:
+            out, self.encoder = self.encoder.finish(), None
+            return out
+        return None
+
+
+@app.get("/api/export")
+async def export(
+    request: Request,
+    from_ts: Optional[int] = Query(None, alias="from"),
+    to_ts: Optional[int] = Query(None, alias="to"),
+    archived: bool = False,
+    auth=Depends(require_api_key),
+):
+    """Tasks created and log lines written in [from, to) (epoch ms) as
+    NDJSON, for backups and POST /api/import. Pages are read, encoded and
+    compressed on the read pool one at a time, so memory stays flat however
+    large the export; tasks are read in keyset pages, so the stream isn't
+    one snapshot if writes land while it runs."""
+    encoding = choose_encoding(request.headers.get("accept-encoding"), sys.maxsize)
+    body = Export(from_ts, to_ts, archived, encoding)
+
+    async def chunks():
+        while (chunk := await run_in(read_pool, body.next_chunk)) is not None:
+            yield chunk
+
+    headers = {"Content-Disposition": 'attachment; filename="clawd-export.ndjson"'}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(chunks(), media_type="application/x-ndjson", headers=headers)
+
+
+# ── POST /api/import ───────────────────────────────────────
+
+IMPORT_MAX_LINE = 16 * 1024 * 1024
+IMPORT_MAX_ERRORS = 100  # reported; any number are skipped
+
+
+async def ndjson_lines(request):
+    """(line number, line) for each non-blank line of the body as it
+    arrives, gunzipping it if it's sent with Content-Encoding: gzip."""
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(status_code=415, detail="Send the body plain or gzip-encoded")
+    gunzip = zlib.decompressobj(wbits=31) if encoding == "gzip" else None
+    tail, line_no = b"", 0
+    try:
+        async for data in request.stream():
+            if gunzip is not None:
+                data = gunzip.decompress(data)
+            *lines, tail = (tail + data).split(b"\n")
+            if len(tail) > IMPORT_MAX_LINE:
+                raise HTTPException(status_code=413,
+                                    detail=f"Line {line_no + len(lines) + 1} is too long")
+            for line in lines:
+                line_no += 1
+                if line.strip():
+                    yield line_no, line
+        if gunzip is not None:
+            tail += gunzip.flush()
+            if not gunzip.eof:
+                raise HTTPException(status_code=400, detail="Truncated gzip body")
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Bad gzip body: {e}")
+    for line in tail.split(b"\n"):
+        line_no += 1
+        if line.strip():
+            yield line_no, line
+
+
+@app.post("/api/import")
+async def import_data(request: Request, auth=Depends(require_api_key)):
+    """Load an /api/export stream. Lines are parsed as they arrive and
+    written db.IMPORT_CHUNK at a time, each chunk in its own transaction
+    and only once the previous one has committed, so memory stays flat
+    however large the body. Rows whose id exists are skipped, so an
+    interrupted import can be sent again. Logs are still capped at
+    LOG_RETENTION_COUNT (500 by default) by timestamp, so importing a large
+    log history keeps only its newest lines, and only if they're newer than
+    the ones already here; "logs" in the result counts lines kept. Errors
+    are listed in line order."""
+    result = {"tasks": 0, "logs": 0, "rejected": 0, "errors": []}
+
+    def reject(errors):
+        result["rejected"] += len(errors)
+        room = IMPORT_MAX_ERRORS - len(result["errors"])
+        result["errors"] += [{"line": n, "error": msg} for n, msg in errors[:room]]
+
+    log_versions = []  # newer chunks can trim older chunks' logs, so count at the end
+
+    async def commit(rows, bad):
+        _, tasks, _, errors, versions = await run_in(write_pool, db.import_rows, rows)
+        result["tasks"] += tasks
+        log_versions.extend(versions)
+        reject(sorted(errors + bad))
+
+    chunk, bad = [], []  # bad: unparseable lines, reported with the chunk
+    async for line_no, line in ndjson_lines(request):
+        try:
+            chunk.append((line_no, loads(line)))
+        except ValueError:
+            bad.append((line_no, "Not valid JSON"))
+        if len(chunk) + len(bad) >= db.IMPORT_CHUNK:
+            await commit(chunk, bad)
+            chunk, bad = [], []
+    if chunk or bad:
+        await commit(chunk, bad)
+    if log_versions:
+        result["logs"] = await run_in(read_pool, db.count_logs, log_versions)
+    if result["tasks"] or result["logs"]:
+        hub.resync()
+    return result
 
 
 # ── POST /api/tasks ───────────────────────────────────────
@@ -63,9 +644,10 @@ class CreateTaskBody(BaseModel):
 
 
 @app.post("/api/tasks", status_code=201)
+@on(write_pool)
 def create_task(body: CreateTaskBody, auth=Depends(require_api_key)):
     task_id = f"tsk_{uuid.uuid4().hex[:8]}"
-    db.create_task(
+    version = db.create_task(
         task_id=task_id,
         name=body.name,
         type_=body.type,
@@ -75,9 +657,49 @@ def create_task(body: CreateTaskBody, auth=Depends(require_api_key)):
         priority=body.priority,
         eta=body.eta,
     )
+    publish_task(task_id, version)
     return {"task_id": task_id}
 
 
+# ── POST /api/tasks/lease ─────────────────────────────────
+
+class LeaseBody(BaseModel):
+    worker: str = Field(..., min_length=1)
+    types: list[str] = []
+    limit: int = Field(1, ge=1, le=50)
+    lease_s: int = Field(60, ge=5, le=3600)
+
+
+@app.post("/api/tasks/lease")
+@on(write_pool)
+def lease_tasks(body: LeaseBody, auth=Depends(require_api_key)):
+    """Claim pending tasks for a worker; empty `tasks` when the queue is dry."""
+    version, tasks, requeued = db.lease_tasks(
+        body.worker, types=body.types, limit=body.limit, lease_ms=body.lease_s * 1000,
+    )
+    for task_id in [t["id"] for t in tasks] + requeued:
+        publish_task(task_id, version)
+    return {"tasks": tasks}
+
+
+# ── POST /api/tasks/{id}/heartbeat ───────────────────────
+
+class HeartbeatBody(BaseModel):
+    worker: str
+    lease_s: int = Field(60, ge=5, le=3600)
+
+
+@app.post("/api/tasks/{task_id}/heartbeat")
+@on(write_pool)
+def heartbeat_task(task_id: str, body: HeartbeatBody, auth=Depends(require_api_key)):
+    expires = db.heartbeat_task(task_id, body.worker, lease_ms=body.lease_s * 1000)
+    if expires is None:
+        if not db.task_exists(task_id):
+            raise HTTPException(status_code=404, detail="Task not found")
+        raise HTTPException(status_code=409, detail="Lease not held by this worker")
+    return {"ok": True, "lease_expires": expires}
+
+
 # ── PATCH /api/tasks/{id} ────────────────────────────────
 
 class UpdateTaskBody(BaseModel):
@@ -88,15 +710,50 @@ class UpdateTaskBody(BaseModel):
     eta: Optional[str] = None
     error_code: Optional[str] = None
     error_message: Optional[str] = None
+    # A leased task's worker: the update is refused (409) unless it still
+    # holds the lease. Progress-only updates are buffered without the check.
+    worker: Optional[str] = None
 
 
 @app.patch("/api/tasks/{task_id}")
-def update_task(task_id: str, body: UpdateTaskBody, auth=Depends(require_api_key)):
-    task = db.get_task(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+async def update_task(task_id: str, body: UpdateTaskBody, auth=Depends(require_api_key)):
     fields = {k: v for k, v in body.model_dump().items() if v is not None}
-    db.update_task(task_id, fields)
+    worker = fields.pop("worker", None)
+    # More progress for a task that's already buffered doesn't need the
+    # database at all, so it's answered without leaving the event loop.
+    if task_id in progress and progress.offer(task_id, fields):
+        return {"ok": True}
+    return await run_in(write_pool, _update_task, task_id, fields, worker)
+
+
+def _update_task(task_id, fields, worker):
+    if task_id not in progress and not db.task_exists(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    # Progress-only patches are written by the next flush (which publishes them)
+    if not progress.offer(task_id, fields):
+        try:
+            version = db.update_task(task_id, with_progress(task_id, fields), worker)
+        except db.LeaseLost as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        publish_task(task_id, version)
+    return {"ok": True}
+
+
+# ── PATCH /api/tasks/{id}/steps/{seq} ─────────────────────
+
+class UpdateStepBody(BaseModel):
+    status: Literal[db.STEP_STATUSES]
+    label: Optional[str] = None
+
+
+@app.patch("/api/tasks/{task_id}/steps/{seq}")
+@on(write_pool)
+def update_step(task_id: str, seq: int, body: UpdateStepBody, auth=Depends(require_api_key)):
+    db.update_task(task_id, progress.take(task_id))  # buffered step_idx goes first
+    version = db.update_step(task_id, seq, body.status, body.label)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Step not found")
+    publish_task(task_id, version)
     return {"ok": True}
 
 
@@ -110,12 +767,39 @@ class CreateLogBody(BaseModel):
 
 
 @app.post("/api/logs", status_code=201)
+@on(write_pool)
 def create_log(body: CreateLogBody, auth=Depends(require_api_key)):
     log_id = f"lg_{uuid.uuid4().hex[:12]}"
-    db.append_log(log_id, body.level, body.task_id, body.task_name, body.msg)
+    version = db.append_log(log_id, body.level, body.task_id, body.task_name, body.msg)
+    publish_log(log_id, version)
     return {"log_id": log_id}
 
 
+# ── GET /api/logs/search ──────────────────────────────────
+
+@app.get("/api/logs/search")
+@on(read_pool)
+def search_logs(
+    request: Request,
+    q: Optional[str] = None,
+    level: Optional[str] = None,
+    task_id: Optional[str] = None,
+    from_ts: Optional[int] = Query(None, alias="from"),
+    to_ts: Optional[int] = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0, le=10_000),
+    auth=Depends(require_api_key),
+):
+    if q and not db.LOG_SEARCH_ENABLED:
+        raise HTTPException(status_code=501, detail="Full-text search is not available")
+    logs, has_more = db.search_logs(
+        q=q, level=level, task_id=task_id, from_ts=from_ts, to_ts=to_ts,
+        limit=limit, offset=offset,
+    )
+    return json_response({"logs": logs, "next_offset": offset + limit if has_more else None},
+                         request.headers.get("accept-encoding"))
+
+
 # ── POST /api/scheduled ───────────────────────────────────
 
 class UpsertScheduledBody(BaseModel):
@@ -129,8 +813,9 @@ class UpsertScheduledBody(BaseModel):
 
 
 @app.post("/api/scheduled", status_code=201)
+@on(write_pool)
 def upsert_scheduled(body: UpsertScheduledBody, auth=Depends(require_api_key)):
-    db.upsert_scheduled(
+    version = db.upsert_scheduled(
         id_=body.id,
         name=body.name,
         type_=body.type,
@@ -139,6 +824,7 @@ def upsert_scheduled(body: UpsertScheduledBody, auth=Depends(require_api_key)):
         recurrence=body.recurrence,
         avg_dur=body.avg_dur,
     )
+    scheduled_changed(body.id, version)
     return {"ok": True}
 
 
@@ -149,52 +835,148 @@ class UpdateScheduledBody(BaseModel):
 
 
 @app.patch("/api/scheduled/{sched_id}")
+@on(write_pool)
 def update_scheduled(sched_id: str, body: UpdateScheduledBody, auth=Depends(require_api_key)):
     fields = {}
     if body.enabled is not None:
         fields["enabled"] = 1 if body.enabled else 0
-    db.update_scheduled(sched_id, fields)
+    scheduled_changed(sched_id, db.update_scheduled(sched_id, fields))
     return {"ok": True}
 
 
+# ── POST /api/batch ───────────────────────────────────────
+
+BATCH_MAX_OPS = 1000
+
+
+class BatchCreateTask(CreateTaskBody):
+    op: Literal["create_task"]
+
+
+class BatchUpdateTask(UpdateTaskBody):
+    op: Literal["update_task"]
+    task_id: str
+
+
+class BatchLog(CreateLogBody):
+    op: Literal["log"]
+
+
+class BatchSchedule(UpsertScheduledBody):
+    op: Literal["schedule"]
+
+
+BatchOp = Annotated[
+    Union[BatchCreateTask, BatchUpdateTask, BatchLog, BatchSchedule],
+    Field(discriminator="op"),
+]
+
+
+class BatchBody(BaseModel):
+    ops: list[BatchOp] = Field(..., max_length=BATCH_MAX_OPS)
+
+
+@app.post("/api/batch")
+@on(write_pool)
+def batch(body: BatchBody, auth=Depends(require_api_key)):
+    """Apply mixed writes in order, in one transaction, with per-item results."""
+    ops, results, published, buffered = [], [], [], set()
+    for item in body.ops:
+        if item.op == "create_task":
+            task_id = f"tsk_{uuid.uuid4().hex[:8]}"
+            ops.append(("create_task", dict(
+                task_id=task_id, name=item.name, type_=item.type, subtype=item.subtype,
+                steps=item.steps, tags=item.tags, priority=item.priority, eta=item.eta,
+            )))
+            results.append({"ok": True, "task_id": task_id})
+            published.append((publish_task, task_id))
+        elif item.op == "update_task":
+            fields = {k: v for k, v in item.model_dump(exclude={"op", "task_id"}).items()
+                      if v is not None}
+            worker = fields.pop("worker", None)
+            # Buffer progress for tasks that exist already (not ones created
+            # earlier in this batch, which the batch has to write first).
+            if ((item.task_id in progress or db.task_exists(item.task_id))
+                    and progress.offer(item.task_id, fields)):
+                buffered.add(len(results))
+                results.append({"ok": True, "task_id": item.task_id})
+                continue
+            fields = with_progress(item.task_id, fields)
+            ops.append(("update_task", dict(task_id=item.task_id, fields=fields, worker=worker)))
+            results.append({"ok": True, "task_id": item.task_id})
+            published.append((publish_task, item.task_id))
+        elif item.op == "log":
+            log_id = f"lg_{uuid.uuid4().hex[:12]}"
+            ops.append(("log", dict(
+                log_id=log_id, level=item.level, task_id=item.task_id,
+                task_name=item.task_name, msg=item.msg,
+            )))
+            results.append({"ok": True, "log_id": log_id})
+            published.append((publish_log, log_id))
+        else:
+            ops.append(("schedule", dict(
+                id_=item.id, name=item.name, type_=item.type, subtype=item.subtype,
+                next_run=item.next_run, recurrence=item.recurrence, avg_dur=item.avg_dur,
+            )))
+            results.append({"ok": True, "id": item.id})
+            published.append((scheduled_changed, item.id))
+
+    version, errors = db.apply_batch(ops) if ops else (None, [])
+    written = [r for i, r in enumerate(results) if i not in buffered]
+    for result, error, (publish, key) in zip(written, errors, published):
+        if error:
+            result.update(ok=False, error=error)
+        else:
+            publish(key, version)
+    return {"version": version, "results": results}
+
+
 # ── Action endpoints ──────────────────────────────────────
 
 @app.post("/api/tasks/{task_id}/cancel")
+@on(write_pool)
 def cancel_task(task_id: str, auth=Depends(require_api_key)):
-    task = db.get_task(task_id)
-    if not task:
+    if not db.task_exists(task_id):
         raise HTTPException(status_code=404, detail="Task not found")
-    db.update_task(task_id, {"status": "cancelled"})
+    publish_task(task_id, db.update_task(task_id, with_progress(task_id, {"status": "cancelled"})))
     return {"ok": True}
 
 
 @app.post("/api/tasks/{task_id}/retry")
+@on(write_pool)
 def retry_task(task_id: str, auth=Depends(require_api_key)):
     task = db.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    db.update_task(task_id, {
+    version = db.update_task(task_id, with_progress(task_id, {
         "status": "running",
         "progress": 0,
         "retry_count": (task.get("retry_count") or 0) + 1,
         "error_code": None,
         "error_message": None,
         "started_at": db.now_ms(),
-    })
+        "lease_owner": None,    # restarted by hand, even if it was running
+        "lease_expires": None,
+    }))
+    publish_task(task_id, version)
     return {"ok": True}
 
 
 @app.post("/api/tasks/{task_id}/rerun")
+@on(write_pool)
 def rerun_task(task_id: str, auth=Depends(require_api_key)):
     task = db.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    db.update_task(task_id, {
+    version = db.update_task(task_id, with_progress(task_id, {
         "status": "pending",
         "progress": 0,
         "started_at": None,
         "completed_at": None,
         "step_idx": 0,
         "current_step": "Waiting in queue",
-    })
+        "lease_owner": None,
+        "lease_expires": None,
+    }))
+    publish_task(task_id, version)
     return {"ok": True}
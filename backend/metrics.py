@@ -0,0 +1,145 @@
+"""
+Prometheus text-format metrics without a client library.
+
+Counters and histograms are dicts keyed by label values and updated under
+one lock: an observation is a bisect, a dict lookup and three additions, so
+instrumentation can stay on in production. Gauges are read from a callback
+at scrape time. render() produces the /metrics body.
+"""
+
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_, labels=()):
+        self.name, self.help, self.labels = name, help_, tuple(labels)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with _lock:
+            items = list(self._values.items())
+        for values, count in items:
+            yield f"{self.name}{_labels(self.labels, values)} {count}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (last is +Inf), sum, count]
+        REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            h = self._values.get(label_values)
+            if h is None:
+                h = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+
+    def samples(self):
+        with _lock:
+            items = [(values, list(h[0]), h[1], h[2]) for values, h in self._values.items()]
+        for values, counts, total, n in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {n}"
+
+
+class Gauge:
+    """Value(s) read from `fn` at scrape time: a number, or a dict of
+    label-value tuples to numbers."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_, fn, labels=()):
+        self.name, self.help, self.labels = name, help_, tuple(labels)
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def samples(self):
+        value = self.fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, v in items:
+            if v is not None:
+                yield f"{self.name}{_labels(self.labels, values)} {v}"
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# ── HTTP ──────────────────────────────────────────────────
+
+HTTP_REQUESTS = Counter("clawd_http_requests_total", "HTTP requests by route and status",
+                        ("method", "route", "status"))
+HTTP_SECONDS = Histogram("clawd_http_request_seconds", "HTTP request latency by route",
+                         ("method", "route"))
+HTTP_REJECTED = Counter("clawd_http_rejected_total",
+                        "Requests turned away with 429, by limit (rate or inflight) and route class or path",
+                        ("limit", "name"))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering) that
+    labels requests by route template, so ids don't blow up cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(scope["method"], route, status)
+            HTTP_SECONDS.observe(time.perf_counter() - t0, scope["method"], route)
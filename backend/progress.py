@@ -0,0 +1,130 @@
+"""
+Write-behind buffer for progress-only task updates.
+
+Bots report progress far more often than anything else about a task
+changes. Patches that only touch PROGRESS_FIELDS are merged per task in
+memory and written in one transaction every PROGRESS_FLUSH_MS, so a burst
+of updates costs one commit. Any other write to a task first take()s its
+buffered fields so they land in the same commit, in order. Readers
+overlay() what hasn't been flushed yet.
+
+The buffer is per process: with several workers each flushes its own, and
+database.flush_progress skips tasks that have finished in the meantime.
+"""
+
+import logging
+import os
+import threading
+
+import database as db
+
+log = logging.getLogger("clawd.progress")
+
+PROGRESS_FIELDS = frozenset({"progress", "current_step", "step_idx", "eta"})
+FLUSH_INTERVAL_S = int(os.getenv("PROGRESS_FLUSH_MS", "250")) / 1000
+
+
+class ProgressBuffer:
+    def __init__(self, interval=FLUSH_INTERVAL_S):
+        self.interval = interval
+        self.on_flush = None     # called with (task_ids, version) after each flush
+        self.generation = 0      # bumped by every buffered patch
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}       # task_id -> merged fields
+        self._flushing = {}      # being written; still visible to readers
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="clawd-progress", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+    def offer(self, task_id, fields):
+        """Buffer a patch if it's progress-only; returns False (and buffers
+        nothing) if it isn't or the buffer isn't running."""
+        if self._thread is None or not fields or not PROGRESS_FIELDS.issuperset(fields):
+            return False
+        with self._lock:
+            self._pending.setdefault(task_id, {}).update(fields)
+            self.generation += 1
+        return True
+
+    def take(self, task_id):
+        """Remove and return a task's buffered fields, for a write that's
+        about to touch it. Waits for a flush in progress, so that flush
+        can't land after the caller's write."""
+        with self._flush_lock, self._lock:
+            return self._pending.pop(task_id, {})
+
+    def __contains__(self, task_id):
+        with self._lock:
+            return task_id in self._pending or task_id in self._flushing
+
+    @property
+    def dirty(self):
+        """Whether anything is waiting to be written."""
+        with self._lock:
+            return bool(self._pending or self._flushing)
+
+    def pending_ids(self):
+        with self._lock:
+            return list(self._flushing.keys() | self._pending.keys())
+
+    def overlay(self, tasks):
+        """Apply unflushed fields to task dicts in place; returns `tasks`."""
+        with self._lock:
+            if not (self._pending or self._flushing):
+                return tasks
+            for task in tasks:
+                for layer in (self._flushing, self._pending):
+                    fields = layer.get(task["id"])
+                    if fields:
+                        task.update(fields)
+        return tasks
+
+    def flush(self):
+        """Write everything buffered in one transaction; returns the task count."""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+            batch = self._flushing
+            if not batch:
+                return 0
+            try:
+                version = db.flush_progress(batch)
+            except Exception:
+                with self._lock:
+                    # Keep it for the next flush, under anything newer.
+                    for task_id, fields in batch.items():
+                        self._pending[task_id] = {**fields, **self._pending.get(task_id, {})}
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+        if self.on_flush is not None:
+            try:
+                self.on_flush(list(batch), version)
+            except Exception:
+                log.exception("on_flush callback failed")
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Progress flush failed; retrying")
+
+
+progress = ProgressBuffer()
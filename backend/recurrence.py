@@ -0,0 +1,147 @@
+"""
+Recurrence rules for scheduled entries.
+
+parse() understands the phrasing the dashboard already shows ("Every 1h",
+"Daily 09:00", "Mon 08:00", "1st of month", "Monthly"), "@every 15m" and
+the usual @-macros (with or without the "@"), and standard five-field cron
+expressions ("*/5 * * * *"). Cron and calendar rules are evaluated in
+server-local time.
+"""
+
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+UNIT_WORDS = r"(s|secs?|seconds?|m|mins?|minutes?|h|hrs?|hours?|d|days?)"
+DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun",
+               "jul", "aug", "sep", "oct", "nov", "dec"]
+
+MACROS = {
+    "@hourly":   "0 * * * *",
+    "@daily":    "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly":   "0 0 * * 0",
+    "@monthly":  "0 0 1 * *",
+    "@yearly":   "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+
+# (low, high, names) for minute, hour, day of month, month, day of week
+CRON_FIELDS = ((0, 59, None), (0, 23, None), (1, 31, None), (1, 12, MONTH_NAMES), (0, 7, DAY_NAMES))
+
+_AT = r"(?:\s+(?:at\s+)?(\d{1,2}):(\d{2}))?"
+_INTERVAL = re.compile(r"@?every\s+(\d+)\s*" + UNIT_WORDS)
+_DAILY = re.compile(r"daily" + _AT)
+_WEEKDAYS = re.compile(r"weekdays" + _AT)
+_WEEKLY = re.compile(r"(sun|mon|tues?|wed(?:nes)?|thu(?:rs)?|fri|sat(?:ur)?)(?:day)?s?" + _AT)
+_MONTHLY = re.compile(r"(\d{1,2})(?:st|nd|rd|th)\s+of\s+(?:the\s+)?month" + _AT)
+
+
+class Interval:
+    def __init__(self, seconds: int):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.ms = seconds * 1000
+
+    def next_after(self, now: int, anchor: int = None) -> int:
+        """First run strictly after `now`, in phase with `anchor` (the run
+        that just came due) so intervals don't drift."""
+        if anchor is None:
+            return now + self.ms
+        return anchor + ((now - anchor) // self.ms + 1) * self.ms
+
+
+class Cron:
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError("Cron expressions have five fields")
+        fields = [_cron_field(p, lo, hi, names) for p, (lo, hi, names) in zip(parts, CRON_FIELDS)]
+        self.minute, self.hour, self.dom, self.month, dow = fields
+        self.dow = {d % 7 for d in dow}
+        # Cron semantics: when both day fields are restricted, either may match.
+        self.dom_or_dow = parts[2] != "*" and parts[4] != "*"
+
+    def _day_matches(self, t):
+        dom = t.day in self.dom
+        dow = t.isoweekday() % 7 in self.dow
+        return (dom or dow) if self.dom_or_dow else (dom and dow)
+
+    def next_after(self, now: int, anchor: int = None) -> int:
+        """First matching minute strictly after `now`, or None if the rule
+        never matches (e.g. Feb 31st)."""
+        t = datetime.fromtimestamp(now / 1000).replace(second=0, microsecond=0)
+        t += timedelta(minutes=1)
+        last_year = t.year + 5
+        while t.year <= last_year:
+            if t.month not in self.month:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hour:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minute:
+                t += timedelta(minutes=1)
+            else:
+                return int(t.timestamp() * 1000)
+        return None
+
+
+def _cron_field(text, lo, hi, names):
+    def value(s):
+        if names and s[:3].lower() in names:
+            return names.index(s[:3].lower()) + (lo if names is MONTH_NAMES else 0)
+        return int(s)
+
+    values = set()
+    for part in text.split(","):
+        span, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if span == "*":
+            start, end = lo, hi
+        else:
+            first, _, last = span.partition("-")
+            start = value(first)
+            end = value(last) if last else (hi if step > 1 else start)
+        if step < 1 or not lo <= start <= end <= hi:
+            raise ValueError(f"Cron field out of range: {part!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _at(m, hour_group):
+    hour, minute = m.group(hour_group), m.group(hour_group + 1)
+    return (int(minute), int(hour)) if hour is not None else (0, 0)
+
+
+@lru_cache(maxsize=1024)
+def parse(text):
+    """Rule for a recurrence string, or None for one-shot entries (no
+    recurrence). Raises ValueError for anything unrecognised."""
+    if text is None or not text.strip():
+        return None
+    s = " ".join(text.strip().lower().split())
+    try:
+        macro = MACROS.get(s) or MACROS.get("@" + s)
+        if macro:
+            return Cron(macro)
+        m = _INTERVAL.fullmatch(s)
+        if m:
+            return Interval(int(m.group(1)) * UNITS[m.group(2)[0]])
+        m = _DAILY.fullmatch(s)
+        if m:
+            return Cron("%d %d * * *" % _at(m, 1))
+        m = _WEEKDAYS.fullmatch(s)
+        if m:
+            return Cron("%d %d * * 1-5" % _at(m, 1))
+        m = _WEEKLY.fullmatch(s)
+        if m:
+            return Cron("%d %d * * %d" % (*_at(m, 2), DAY_NAMES.index(m.group(1)[:3])))
+        m = _MONTHLY.fullmatch(s)
+        if m:
+            return Cron("%d %d %d * *" % (*_at(m, 2), int(m.group(1))))
+        return Cron(s)
+    except ValueError:
+        raise ValueError(f"Unrecognised recurrence: {text!r}") from None
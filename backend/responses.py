@@ -0,0 +1,122 @@
+"""
+Fast JSON encoding and Accept-Encoding negotiated compression for the read
+endpoints.
+
+orjson and brotli are used when installed; without them responses fall back
+to the stdlib json encoder and gzip.
+"""
+
+import gzip
+import json
+import threading
+import zlib
+from typing import Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the saving isn't worth it.
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+ENCODERS = {"gzip": lambda b: gzip.compress(b, GZIP_LEVEL, mtime=0)}
+if brotli is not None:
+    ENCODERS["br"] = lambda b: brotli.compress(b, quality=BROTLI_QUALITY)
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class StreamEncoder:
+    """Compresses a body that's produced piece by piece: feed pieces to
+    compress(), then send what finish() returns. encoding=None passes the
+    pieces through."""
+
+    def __init__(self, encoding: Optional[str]):
+        if encoding == "br":
+            c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.finish = c.process, c.finish
+        elif encoding == "gzip":
+            z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.finish = z.compress, z.flush
+        else:
+            self.compress, self.finish = bytes, bytes
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """Best encoding the client accepts (br over gzip), or None."""
+    if not accept_encoding or size < COMPRESS_MIN_BYTES:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    for name in ("br", "gzip"):
+        if name in ENCODERS and (name in accepted or "*" in accepted):
+            return name
+    return None
+
+
+class Payload:
+    """A serialized body plus its compressed variants, each made on first use."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = ENCODERS[encoding](self.body)
+            return self._encoded[encoding]
+
+    def response(self, encoding: Optional[str], headers: Optional[dict] = None) -> Response:
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.encoded(encoding), media_type="application/json",
+                        headers=headers)
+
+
+def etag_for(tag: str, encoding: Optional[str]) -> str:
+    """Quoted ETag for one encoding of a body; the bytes differ per encoding."""
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def json_response(obj, accept_encoding: Optional[str], headers: Optional[dict] = None) -> Response:
+    """Serialize `obj` with the fast encoder, skipping FastAPI's
+    jsonable_encoder pass, and compress it if worthwhile."""
+    payload = Payload(dumps(obj))
+    return payload.response(choose_encoding(accept_encoding, len(payload.body)), headers)
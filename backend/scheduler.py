@@ -0,0 +1,150 @@
+"""
+Runs scheduled entries when they come due.
+
+Pending runs sit in a min-heap keyed on next_run, so the thread sleeps until
+the earliest one is due instead of scanning the table; the table is read
+once at start, and writes that change an entry call refresh() to re-read
+just that row. database.fire_scheduled claims each run with a
+compare-and-set, so several processes running a scheduler never fire the
+same run twice.
+
+The same thread sweeps expired work-queue leases every LEASE_SWEEP_S, so a
+dead worker's tasks go back to the queue even when no one calls lease.
+"""
+
+import heapq
+import logging
+import threading
+
+import database as db
+
+log = logging.getLogger("clawd.scheduler")
+
+# Upper bound on one sleep, so a wall-clock jump can't delay runs for long.
+MAX_SLEEP_S = 60
+RETRY_S = 5
+LEASE_SWEEP_S = 15
+SWEEP = object()  # _next_due's "time to sweep leases"
+
+
+class Scheduler:
+    def __init__(self):
+        self.on_fire = None     # called with (task_id, sched_id, version) after each run
+        self.on_requeue = None  # called with (task_ids, version) after a lease sweep
+        self._next_sweep = 0
+        self._cond = threading.Condition()
+        self._heap = []   # (next_run, id); entries that disagree with _due are stale
+        self._due = {}    # id -> next_run
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._heap = [(next_run, id_) for id_, next_run in db.get_schedule_heads()]
+            heapq.heapify(self._heap)
+            self._due = {id_: next_run for next_run, id_ in self._heap}
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="clawd-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def refresh(self, sched_id):
+        """Re-read one entry after a write changed it."""
+        if self._thread is not None:
+            self._set(sched_id, db.get_schedule_head(sched_id))
+
+    @property
+    def pending(self):
+        return len(self._due)
+
+    def _set(self, sched_id, next_run):
+        with self._cond:
+            if next_run is None:
+                self._due.pop(sched_id, None)
+                return
+            if self._due.get(sched_id) == next_run:
+                return
+            self._due[sched_id] = next_run
+            heapq.heappush(self._heap, (next_run, sched_id))
+            if len(self._heap) > 2 * len(self._due) + 64:
+                self._heap = [(n, i) for i, n in self._due.items()]
+                heapq.heapify(self._heap)
+            if self._heap[0] == (next_run, sched_id):
+                self._cond.notify()
+
+    def _next_due(self):
+        """Block until an entry is due; returns (id, due), SWEEP, or None
+        to stop."""
+        with self._cond:
+            while not self._stopping:
+                now = db.now_ms()
+                if now >= self._next_sweep:
+                    self._next_sweep = now + LEASE_SWEEP_S * 1000
+                    return SWEEP
+                wait = min((self._next_sweep - now) / 1000, MAX_SLEEP_S)
+                while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    due, sched_id = self._heap[0]
+                    if due <= now:
+                        heapq.heappop(self._heap)
+                        del self._due[sched_id]
+                        return sched_id, due
+                    wait = min(wait, (due - now) / 1000)
+                self._cond.wait(wait)
+        return None
+
+    def _sweep(self):
+        try:
+            version, task_ids = db.requeue_expired_leases()
+        except Exception:
+            log.exception("Lease sweep failed; retrying in %ss", LEASE_SWEEP_S)
+            return
+        if task_ids:
+            log.info("Re-queued %d tasks with expired leases", len(task_ids))
+        if task_ids and self.on_requeue is not None:
+            try:
+                self.on_requeue(task_ids, version)
+            except Exception:
+                log.exception("on_requeue callback failed")
+
+    def _run(self):
+        while True:
+            item = self._next_due()
+            if item is None:
+                return
+            if item is SWEEP:
+                self._sweep()
+                continue
+            sched_id, due = item
+            try:
+                fired = db.fire_scheduled(sched_id, due)
+            except Exception:
+                log.exception("Scheduled run %s failed; retrying in %ss", sched_id, RETRY_S)
+                timer = threading.Timer(RETRY_S, self.refresh, (sched_id,))
+                timer.daemon = True
+                timer.start()
+                continue
+            if fired is None:
+                # Changed under us (another process fired it, or it was edited).
+                self.refresh(sched_id)
+                continue
+            version, task_id, next_run = fired
+            self._set(sched_id, next_run)
+            if self.on_fire is not None:
+                try:
+                    self.on_fire(task_id, sched_id, version)
+                except Exception:
+                    log.exception("on_fire callback failed")
+
+
+scheduler = Scheduler()
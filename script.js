@@ -217,6 +217,7 @@ const state = {
   analytics: { ...DEMO_ANALYTICS },
   expanded: new Set(),
   connectionStatus: 'demo',
+  version: null,  // server change version of the snapshot we hold
 };
 
 /* ── DOM helpers ────────────────────────────────────── */
@@ -244,7 +245,9 @@ const fmtDate = d => {
 
 const TYPE_LABEL = { web_automation: 'Web', research: 'Research', api_integration: 'API', dev_infra: 'Dev', local_ops: 'Local' };
 const STATUS_LABEL = { running: 'Running', pending: 'Pending', waiting_input: 'Waiting', completed: 'Done', failed: 'Failed', cancelled: 'Cancelled' };
-const STEP_ICON = { completed: '✓', running: '↻', pending: '○', failed: '✕', waiting: '⏸' };
+const STEP_ICON = {
+  completed: '✓', running: '↻', pending: '○', failed: '✕', waiting: '⏸', skipped: '–',
+};
 
 /* ── Render: Home ───────────────────────────────────── */
 function renderHome() {
@@ -849,38 +852,85 @@ function addLog(level, taskId, taskName, msg) {
 
 /* ── Backend polling ────────────────────────────────── */
 async function fetchState() {
+  // Once we hold a live snapshot, only ask for what changed since then
+  const since = state.connectionStatus === 'live' && state.version !== null
+    ? `?since=${state.version}` : '';
   try {
-    const res = await fetch(`${API_URL}/api/state`, {
+    const res = await fetch(`${API_URL}/api/state${since}`, {
       headers: { 'X-API-Key': API_KEY },
     });
+    if (res.status === 304) {  // nothing changed
+      setConnectionStatus('live');
+      return;
+    }
+    if (res.status === 429) return;  // server is shedding load; try again next tick
     if (!res.ok) throw new Error(res.status);
     const data = await res.json();
     applyState(data);
     setConnectionStatus('live');
+    connectStream();
   } catch (_) {
+    state.version = null;
     setConnectionStatus('demo');
   }
 }
 
+const toTask = t => ({
+  ...t,
+  currentStep: t.current_step || 'Waiting in queue',
+  stepIdx: t.step_idx || 0,
+  tags: t.tags || [],
+  steps: t.steps || [],
+});
+
+const toScheduled = s => ({
+  ...s,
+  enabled: Boolean(s.enabled),
+  next_run: s.next_run ? new Date(s.next_run) : new Date(Date.now() + 86400000),
+});
+
+// Replace items with the same id, add new ones
+const mergeById = (items, changed) => {
+  const byId = new Map(items.map(i => [i.id, i]));
+  changed.forEach(i => byId.set(i.id, i));
+  return [...byId.values()];
+};
+
+// Same window as the server's snapshot (get_state_tasks): active tasks plus
+// the newest finished ones, so merged deltas don't pile up over a session
+// and archived tasks age out.
+const ACTIVE_STATUSES = ['pending', 'running', 'waiting_input'];
+const STATE_ACTIVE_LIMIT = 200;
+const STATE_RECENT_LIMIT = 100;
+
+const windowTasks = tasks => {
+  let active = 0, recent = 0;
+  return tasks
+    .sort((a, b) => b.created_at - a.created_at || (a.id < b.id ? 1 : a.id > b.id ? -1 : 0))
+    .filter(t => ACTIVE_STATUSES.includes(t.status)
+      ? ++active <= STATE_ACTIVE_LIMIT
+      : ++recent <= STATE_RECENT_LIMIT);
+};
+
 function applyState(data) {
-  // Tasks: convert DB fields to frontend shape
-  state.tasks = (data.tasks || []).map(t => ({
-    ...t,
-    currentStep: t.current_step || 'Waiting in queue',
-    stepIdx: t.step_idx || 0,
-    tags: t.tags || [],
-    steps: t.steps || [],
-  }));
+  if (data.full === false) {
+    // Delta: merge changed rows into what we already hold
+    state.tasks = windowTasks(mergeById(state.tasks, (data.tasks || []).map(toTask)));
+    state.logs = mergeById(state.logs, data.logs || [])
+      .sort((a, b) => b.ts - a.ts)
+      .slice(0, 60);
+    state.scheduled = mergeById(state.scheduled, (data.scheduled || []).map(toScheduled));
+  } else {
+    // Tasks: convert DB fields to frontend shape
+    state.tasks = (data.tasks || []).map(toTask);
 
-  // Logs: already in the right shape
-  state.logs = data.logs || [];
+    // Logs: already in the right shape
+    state.logs = data.logs || [];
 
-  // Scheduled: convert next_run int (ms) → Date object
-  state.scheduled = (data.scheduled || []).map(s => ({
-    ...s,
-    enabled: Boolean(s.enabled),
-    next_run: s.next_run ? new Date(s.next_run) : new Date(Date.now() + 86400000),
-  }));
+    // Scheduled: convert next_run int (ms) → Date object
+    state.scheduled = (data.scheduled || []).map(toScheduled);
+  }
+  state.version = data.version ?? null;
 
   // Analytics
   if (data.analytics) {
@@ -895,6 +945,59 @@ function applyState(data) {
   else if (state.activeTab === 'analytics') renderAnalytics();
 }
 
+/* ── Push channel (Server-Sent Events) ──────────────── */
+let stream = null;
+let streamConnecting = false;
+const streamOpen = () => stream && stream.readyState === EventSource.OPEN;
+
+async function connectStream() {
+  if (stream || streamConnecting || typeof EventSource === 'undefined') return;
+  // The stream URL carries a short-lived token rather than the API key, so
+  // the key stays out of server and proxy logs
+  streamConnecting = true;
+  let token;
+  try {
+    const res = await fetch(`${API_URL}/api/stream/token`, {
+      method: 'POST',
+      headers: { 'X-API-Key': API_KEY },
+    });
+    if (!res.ok) return;
+    ({ token } = await res.json());
+  } catch (_) {
+    return;
+  } finally {
+    streamConnecting = false;
+  }
+  stream = new EventSource(`${API_URL}/api/stream?token=${encodeURIComponent(token)}`);
+  // A reconnect after the token expired is refused and closes the stream;
+  // polling takes over until the next fetch opens it with a fresh token
+  stream.addEventListener('error', e => {
+    if (e.target === stream && stream.readyState === EventSource.CLOSED) stream = null;
+  });
+  // Catch up on anything written between our last snapshot and the subscribe
+  stream.addEventListener('open', () => fetchState());
+  stream.addEventListener('delta', e => {
+    // Each row is its latest state, so it's always merged. The delta's
+    // version is only the newest one this stream has seen, not a cursor
+    // for /api/state?since=, so keep the one from our last fetch.
+    const { version, ...rows } = JSON.parse(e.data);
+    applyState({ ...rows, version: state.version });
+  });
+  // We fell too far behind; the server dropped our queue
+  stream.addEventListener('resync', () => fetchState());
+}
+
+async function fetchAnalytics() {
+  try {
+    const res = await fetch(`${API_URL}/api/analytics`, {
+      headers: { 'X-API-Key': API_KEY },
+    });
+    if (!res.ok) return;
+    state.analytics = await res.json();
+    if (state.activeTab === 'analytics') renderAnalytics();
+  } catch (_) { /* next tick */ }
+}
+
 /* ── Connection status indicator ────────────────────── */
 function setConnectionStatus(status) {
   if (state.connectionStatus === status) return;
@@ -962,9 +1065,11 @@ function init() {
   setupFilters();
   setupRefresh();
 
-  // Try to connect to backend immediately, then poll every 3s
+  // Try to connect to backend immediately, then switch to the push stream.
+  // Polling every 3s only runs while the stream is down.
   fetchState();
-  setInterval(fetchState, 3000);
+  setInterval(() => { if (!streamOpen()) fetchState(); }, 3000);
+  setInterval(() => { if (streamOpen()) fetchAnalytics(); }, 30000);
 
   // Demo simulation still runs but is gated (no-op when live)
   setInterval(simulateProgress, 1700);